@@ -16,19 +16,211 @@ import six
 import hashlib
 import base64
 import itertools
+import collections
+import functools
+import bisect
 import pickle
+import sqlite3
+import threading
+import concurrent.futures
+import urllib.parse
+import email.utils
 import store
 import logging
+import heapq
+import queue
+import atexit
+import http.server
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 crt_cod = [{"name":"Afghanistan","code":"af"},{"name":"Albania","code":"al"},{"name":"Algeria","code":"dz"},{"name":"American Samoa","code":"as"},{"name":"Andorra","code":"ad"},{"name":"Angola","code":"ao"},{"name":"Anguilla","code":"ai"},{"name":"Antarctica","code":"aq"},{"name":"Antigua and Barbuda","code":"ag"},{"name":"Argentina","code":"ar"},{"name":"Armenia","code":"am"},{"name":"Aruba","code":"aw"},{"name":"Australia","code":"au"},{"name":"Austria","code":"at"},{"name":"Azerbaijan","code":"az"},{"name":"Bahamas","code":"bs"},{"name":"Bahrain","code":"bh"},{"name":"Bangladesh","code":"bd"},{"name":"Barbados","code":"bb"},{"name":"Belarus","code":"by"},{"name":"Belgium","code":"be"},{"name":"Belize","code":"bz"},{"name":"Benin","code":"bj"},{"name":"Bermuda","code":"bm"},{"name":"Bhutan","code":"bt"},{"name":"Bolivia, Plurinational State of","code":"bo"},{"name":"Bosnia and Herzegovina","code":"ba"},{"name":"Botswana","code":"bw"},{"name":"Bouvet Island","code":"bv"},{"name":"Brazil","code":"br"},{"name":"British Indian Ocean Territory","code":"io"},{"name":"Brunei Darussalam","code":"bn"},{"name":"Bulgaria","code":"bg"},{"name":"Burkina Faso","code":"bf"},{"name":"Burundi","code":"bi"},{"name":"Cabo Verde","code":"cv"},{"name":"Cambodia","code":"kh"},{"name":"Cameroon","code":"cm"},{"name":"Canada","code":"ca"},{"name":"Cayman Islands","code":"ky"},{"name":"Central African Republic","code":"cf"},{"name":"Chad","code":"td"},{"name":"Chile","code":"cl"},{"name":"China","code":"cn"},{"name":"Christmas Island","code":"cx"},{"name":"Colombia","code":"co"},{"name":"Comoros","code":"km"},{"name":"Congo","code":"cg"},{"name":"Congo, The Democratic Republic of the","code":"cd"},{"name":"Cook Islands","code":"ck"},{"name":"Costa Rica","code":"cr"},{"name":"Croatia","code":"hr"},{"name":"Cuba","code":"cu"},{"name":"Cyprus","code":"cy"},{"name":"Czechia","code":"cz"},{"name":"C\xc3\xb4te d\'Ivoire","code":"ci"},{"name":"Denmark","code":"dk"},{"name":"Djibouti","code":"dj"},{"name":"Dominica","code":"dm"},{"name":"Dominican Republic","code":"do"},{"name":"Ecuador","code":"ec"},{"name":"Egypt","code":"eg"},{"name":"El Salvador","code":"sv"},{"name":"Equatorial Guinea","code":"gq"},{"name":"Eritrea","code":"er"},{"name":"Estonia","code":"ee"},{"name":"Eswatini","code":"sz"},{"name":"Ethiopia","code":"et"},{"name":"Falkland Islands (Malvinas)","code":"fk"},{"name":"Faroe Islands","code":"fo"},{"name":"Fiji","code":"fj"},{"name":"Finland","code":"fi"},{"name":"France","code":"fr"},{"name":"French Guiana","code":"gf"},{"name":"French Polynesia","code":"pf"},{"name":"French Southern Territories","code":"tf"},{"name":"Gabon","code":"ga"},{"name":"Gambia","code":"gm"},{"name":"Georgia","code":"ge"},{"name":"Germany","code":"de"},{"name":"Ghana","code":"gh"},{"name":"Gibraltar","code":"gi"},{"name":"Greece","code":"gr"},{"name":"Greenland","code":"gl"},{"name":"Grenada","code":"gd"},{"name":"Guadeloupe","code":"gp"},{"name":"Guam","code":"gu"},{"name":"Guatemala","code":"gt"},{"name":"Guinea","code":"gn"},{"name":"Guinea-Bissau","code":"gw"},{"name":"Guyana","code":"gy"},{"name":"Haiti","code":"ht"},{"name":"Holy See (Vatican City State)","code":"va"},{"name":"Honduras","code":"hn"},{"name":"Hong Kong","code":"hk"},{"name":"Hungary","code":"hu"},{"name":"Iceland","code":"is"},{"name":"India","code":"in"},{"name":"Indonesia","code":"id"},{"name":"Iran, Islamic Republic of","code":"ir"},{"name":"Iraq","code":"iq"},{"name":"Ireland","code":"ie"},{"name":"Israel","code":"il"},{"name":"Italy","code":"it"},{"name":"Jamaica","code":"jm"},{"name":"Japan","code":"jp"},{"name":"Jordan","code":"jo"},{"name":"Kazakhstan","code":"kz"},{"name":"Kenya","code":"ke"},{"name":"Kiribati","code":"ki"},{"name":"Korea, Democratic People\'s Republic of","code":"kp"},{"name":"Korea, Republic of","code":"kr"},{"name":"Kuwait","code":"kw"},{"name":"Kyrgyzstan","code":"kg"},{"name":"Lao People\'s Democratic Republic","code":"la"},{"name":"Latvia","code":"lv"},{"name":"Lebanon","code":"lb"},{"name":"Lesotho","code":"ls"},{"name":"Liberia","code":"lr"},{"name":"Libya","code":"ly"},{"name":"Liechtenstein","code":"li"},{"name":"Lithuania","code":"lt"},{"name":"Luxembourg","code":"lu"},{"name":"Macao","code":"mo"},{"name":"Madagascar","code":"mg"},{"name":"Malawi","code":"mw"},{"name":"Malaysia","code":"my"},{"name":"Maldives","code":"mv"},{"name":"Mali","code":"ml"},{"name":"Malta","code":"mt"},{"name":"Marshall Islands","code":"mh"},{"name":"Martinique","code":"mq"},{"name":"Mauritania","code":"mr"},{"name":"Mauritius","code":"mu"},{"name":"Mayotte","code":"yt"},{"name":"Mexico","code":"mx"},{"name":"Micronesia, Federated States of","code":"fm"},{"name":"Moldova, Republic of","code":"md"},{"name":"Monaco","code":"mc"},{"name":"Mongolia","code":"mn"},{"name":"Montenegro","code":"me"},{"name":"Montserrat","code":"ms"},{"name":"Morocco","code":"ma"},{"name":"Mozambique","code":"mz"},{"name":"Myanmar","code":"mm"},{"name":"Namibia","code":"na"},{"name":"Nauru","code":"nr"},{"name":"Nepal","code":"np"},{"name":"Netherlands","code":"nl"},{"name":"New Caledonia","code":"nc"},{"name":"New Zealand","code":"nz"},{"name":"Nicaragua","code":"ni"},{"name":"Niger","code":"ne"},{"name":"Nigeria","code":"ng"},{"name":"Norfolk Island","code":"nf"},{"name":"North Macedonia","code":"mk"},{"name":"Northern Mariana Islands","code":"mp"},{"name":"Norway","code":"no"},{"name":"Oman","code":"om"},{"name":"Pakistan","code":"pk"},{"name":"Palau","code":"pw"},{"name":"Palestine, State of","code":"ps"},{"name":"Panama","code":"pa"},{"name":"Papua New Guinea","code":"pg"},{"name":"Paraguay","code":"py"},{"name":"Peru","code":"pe"},{"name":"Philippines","code":"ph"},{"name":"Pitcairn","code":"pn"},{"name":"Poland","code":"pl"},{"name":"Portugal","code":"pt"},{"name":"Puerto Rico","code":"pr"},{"name":"Qatar","code":"qa"},{"name":"Romania","code":"ro"},{"name":"Russia","code":"ru"},{"name":"Rwanda","code":"rw"},{"name":"R\xc3\xa9union","code":"re"},{"name":"Saint Helena, Ascension and Tristan da Cunha","code":"sh"},{"name":"Saint Kitts and Nevis","code":"kn"},{"name":"Saint Lucia","code":"lc"},{"name":"Saint Vincent and the Grenadines","code":"vc"},{"name":"Samoa","code":"ws"},{"name":"San Marino","code":"sm"},{"name":"Sao Tome and Principe","code":"st"},{"name":"Saudi Arabia","code":"sa"},{"name":"Senegal","code":"sn"},{"name":"Serbia","code":"rs"},{"name":"Seychelles","code":"sc"},{"name":"Sierra Leone","code":"sl"},{"name":"Singapore","code":"sg"},{"name":"Slovakia","code":"sk"},{"name":"Slovenia","code":"si"},{"name":"Solomon Islands","code":"sb"},{"name":"Somalia","code":"so"},{"name":"South Africa","code":"za"},{"name":"South Sudan","code":"ss"},{"name":"Spain","code":"es"},{"name":"Sri Lanka","code":"lk"},{"name":"Sudan","code":"sd"},{"name":"Suriname","code":"sr"},{"name":"Sweden","code":"se"},{"name":"Switzerland","code":"ch"},{"name":"Syrian Arab Republic","code":"sy"},{"name":"Taiwan","code":"tw"},{"name":"Tajikistan","code":"tj"},{"name":"Tanzania, United Republic of","code":"tz"},{"name":"Thailand","code":"th"},{"name":"Timor-Leste","code":"tl"},{"name":"Togo","code":"tg"},{"name":"Tokelau","code":"tk"},{"name":"Tonga","code":"to"},{"name":"Trinidad and Tobago","code":"tt"},{"name":"Tunisia","code":"tn"},{"name":"Turkey","code":"tr"},{"name":"Turkmenistan","code":"tm"},{"name":"Turks and Caicos Islands","code":"tc"},{"name":"Tuvalu","code":"tv"},{"name":"Uganda","code":"ug"},{"name":"Ukraine","code":"ua"},{"name":"United Arab Emirates","code":"ae"},{"name":"United Kingdom","code":"gb"},{"name":"United States","code":"us"},{"name":"United States Minor Outlying Islands","code":"um"},{"name":"Uruguay","code":"uy"},{"name":"Uzbekistan","code":"uz"},{"name":"Vanuatu","code":"vu"},{"name":"Venezuela, Bolivarian Republic of","code":"ve"},{"name":"Vietnam","code":"vn"},{"name":"Virgin Islands, British","code":"vg"},{"name":"Virgin Islands, U.S.","code":"vi"},{"name":"Wallis and Futuna","code":"wf"},{"name":"Western Sahara","code":"eh"},{"name":"Yemen","code":"ye"},{"name":"Zambia","code":"zm"},{"name":"Zimbabwe","code":"zw"}]
 lan_ctr = [['ps', ['af', 'pk']], ['fa', ['af', 'ir']], ['uz', ['af', 'uz']], ['sv', ['ax', 'fi', 'se']], ['sq', ['al', 'xk', 'mk']], ['en', ['us','gb','nz','ca','au']], ['ar', ['dz', 'bh', 'td', 'km', 'dj', 'eg', 'er', 'iq', 'il', 'jo', 'kw', 'lb', 'ly', 'mr', 'ma', 'om', 'ps', 'qa', 'sa', 'so', 'ss', 'sd', 'sy', 'tn', 'ae', 'eh', '001', 'ye']], ['fr', ['fr']], ['kab', ['dz']], ['ca', ['ad', 'fr', 'it', 'es']], ['ln', ['ao', 'cf', 'cg', 'cd']], ['pt', ['ao', 'br', 'cv', 'gq', 'fr', 'gw', 'lu', 'mo', 'mz', 'pt', 'st', 'ch', 'tl']], ['es', ['ai', 'ag', 'ar', 'aw', 'bs', 'bb', 'bz', 'bm', 'bo', 'br', 'vg', 'ca', 'ic', 'bq', 'ky', 'ea', 'cl', 'co', 'cr', 'cu', 'cw', 'dm', 'do', 'ec', 'sv', 'gq', 'fk', 'gf', 'gl', 'gd', 'gp', 'gt', 'gy', 'ht', 'hn', '419', 'mq', 'mx', 'ms', 'ni', 'pa', 'py', 'pe', 'ph', 'pr', 'sx', 'es', 'bl', 'kn', 'lc', 'mf', 'pm', 'vc', 'sr', 'tt', 'tc', 'vi', 'us', 'uy', 've']], ['hy', ['am']], ['nl', ['aw', 'be', 'bq', 'cw', 'nl', 'sx', 'sr']], ['de', ['de']], ['az', ['az']], ['bn', ['bd', 'in']], ['ccp', ['bd', 'in']], ['be', ['by']], ['ru', ['by', 'kz', 'kg', 'md', 'ru', 'ua']], ['wa', ['be']], ['yo', ['bj', 'ng']], ['dz', ['bt']], ['qu', ['bo', 'ec', 'pe']], ['bs', ['ba']], ['hr', ['ba', 'hr']], ['sr', ['ba', 'xk', 'me', 'rs']], ['tn', ['bw', 'za']], ['ms', ['bn', 'my', 'sg']], ['bg', ['bg']], ['ff', ['bf', 'cm', 'gm', 'gh', 'gw', 'gn', 'lr', 'mr', 'ne', 'ng', 'sn', 'sl']], ['rn', ['bi']], ['km', ['kh']], ['agq', ['cm']], ['ksf', ['cm']], ['bas', ['cm']], ['dua', ['cm']], ['ewo', ['cm']], ['kkj', ['cm']], ['nmg', ['cm']], ['mgo', ['cm']], ['mua', ['cm']], ['nnh', ['cm']], ['jgo', ['cm']], ['yav', ['cm']], ['iu', ['ca']], ['moh', ['ca']], ['kea', ['cv']], ['sg', ['cf']], ['arn', ['cl']], ['yue', ['cn', 'hk']], ['zh', ['cn', 'hk', 'mo', 'sg', 'tw']], ['ii', ['cn']], ['bo', ['cn', 'in']], ['ug', ['cn']], ['lu', ['cd']], ['sw', ['cd', 'ke', 'tz', 'ug']], ['el', ['cy', 'gr']], ['tr', ['cy', 'tr']], ['cs', ['cz']], ['da', ['dk', 'gl']], ['fo', ['dk', 'fo']], ['so', ['dj', 'et', 'ke', 'so']], ['byn', ['er']], ['gez', ['er', 'et']], ['tig', ['er']], ['ti', ['er', 'et']], ['et', ['ee']], ['ss', ['sz', 'za']], ['am', ['et']], ['om', ['et', 'ke']], ['wal', ['et']], ['fi', ['fi']], ['smn', ['fi']], ['se', ['fi', 'no', 'se']], ['br', ['fr']], ['co', ['fr']], ['oc', ['fr']], ['gsw', ['fr', 'li', 'ch']], ['ka', ['ge']], ['os', ['ge', 'ru']], ['ksh', ['de']], ['nds', ['de', 'nl']], ['dsb', ['de']], ['hsb', ['de']], ['ak', ['gh']], ['ee', ['gh', 'tg']], ['gaa', ['gh']], ['ha', ['gh', 'ne', 'ng']], ['kl', ['gl']], ['kpe', ['gn', 'lr']], ['nqo', ['gn']], ['hu', ['hu']], ['is', ['is']], ['as', ['in']], ['brx', ['in']], ['gu', ['in']], ['hi', ['in']], ['kn', ['in']], ['ks', ['in']], ['kok', ['in']], ['ml', ['in']], ['mni', ['in']], ['mr', ['in']], ['ne', ['in', 'np']], ['or', ['in']], ['pa', ['in', 'pk']], ['sa', ['in']], ['sat', ['in']], ['ta', ['in', 'my', 'sg', 'lk']], ['te', ['in']], ['ur', ['in', 'pk']], ['id', ['id']], ['jv', ['id']], ['ckb', ['ir', 'iq']], ['mzn', ['ir']], ['lrc', ['ir', 'iq']], ['syr', ['iq', 'sy']], ['ga', ['ie']], ['gv', ['im']], ['he', ['il']], ['fur', ['it']], ['it', ['it', 'sm', 'ch', 'va']], ['sc', ['it']], ['scn', ['it']], ['ja', ['jp']], ['kk', ['kz']], ['ebu', ['ke']], ['guz', ['ke']], ['kln', ['ke']], ['kam', ['ke']], ['ki', ['ke']], ['luo', ['ke']], ['luy', ['ke']], ['mas', ['ke', 'tz']], ['mer', ['ke']], ['saq', ['ke']], ['dav', ['ke']], ['teo', ['ke', 'ug']], ['ky', ['kg']], ['lo', ['la']], ['lv', ['lv']], ['st', ['ls', 'za']], ['vai', ['lr']], ['lt', ['lt']], ['lb', ['lu']], ['mg', ['mg']], ['ny', ['mw']], ['dv', ['mv']], ['bm', ['ml']], ['khq', ['ml']], ['ses', ['ml']], ['mt', ['mt']], ['mfe', ['mu']], ['ro', ['md', 'ro']], ['mn', ['mn']], ['tzm', ['ma']], ['zgh', ['ma']], ['shi', ['ma']], ['mgh', ['mz']], ['seh', ['mz']], ['my', ['mm']], ['af', ['na', 'za']], ['naq', ['na']], ['fy', ['nl']], ['mi', ['nz']], ['twq', ['ne']], ['dje', ['ne']], ['ig', ['ng']], ['kaj', ['ng']], ['kcg', ['ng']], ['ko', ['kp', 'kr']], ['mk', ['mk']], ['nb', ['no', 'sj']], ['nn', ['no']], ['sd', ['pk']], ['gn', ['py']], ['ceb', ['ph']], ['fil', ['ph']], ['pl', ['pl']], ['ba', ['ru']], ['ce', ['ru']], ['cv', ['ru']], ['myv', ['ru']], ['sah', ['ru']], ['tt', ['ru']], ['rw', ['rw']], ['dyo', ['sn']], ['wo', ['sn']], ['sk', ['sk']], ['sl', ['si']], ['nso', ['za']], ['nr', ['za']], ['ts', ['za']], ['ve', ['za']], ['xh', ['za']], ['zu', ['za']], ['nus', ['ss']], ['ast', ['es']], ['eu', ['es']], ['gl', ['es']], ['si', ['lk']], ['rm', ['ch']], ['wae', ['ch']], ['trv', ['tw']], ['tg', ['tj']], ['asa', ['tz']], ['bez', ['tz']], ['lag', ['tz']], ['jmc', ['tz']], ['kde', ['tz']], ['rof', ['tz']], ['rwk', ['tz']], ['sbp', ['tz']], ['ksb', ['tz']], ['vun', ['tz']], ['th', ['th']], ['to', ['to']], ['ku', ['tr']], ['tk', ['tm']], ['cgg', ['ug']], ['lg', ['ug']], ['nyn', ['ug']], ['xog', ['ug']], ['uk', ['ua']], ['kw', ['gb']], ['gd', ['gb']], ['cy', ['gb']], ['chr', ['us']], ['haw', ['us']], ['lkt', ['us']], ['vi', ['vn']], ['eo', ['001']], ['io', ['001']], ['ia', ['001']], ['jbo', ['001']], ['bem', ['zm']], ['nd', ['zw']], ['sn', ['zw']]]
 
 logger = logging.getLogger(__name__)
 
-class custom_session(requests.Session):
-    """Custom session class inheriting from requests.Session.
+class token_bucket:
+    """Thread-safe token bucket used to budget requests against a single host.
+
+    Attributes:
+        rate (float): Tokens added per second, None for an unlimited host.
+        burst (int): Maximum number of tokens that can be saved up.
+        tokens (float): Tokens currently available.
+        paused_until (float): Timestamp before which no request may be sent.
+    """
+
+    def __init__(self, rate=None, burst=1):
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.time()
+        self.paused_until = 0
+
+    def acquire(self):
+        """Take one token, sleeping until it is available. Returns the time waited."""
+        with self.lock:
+            now = time.time()
+            wait = max(0, self.paused_until - now)
+            if self.rate:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                # reserve the token now so concurrent threads queue up behind each other
+                self.tokens -= 1
+                if self.tokens < 0:
+                    wait = max(wait, -self.tokens / self.rate)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """Hold back every request to this host for the given number of seconds."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.time() + seconds)
+
+class http_hosts:
+    """Connection pool, rate limits and metrics shared by every pooled_session.
+
+    Attributes:
+        limits (dict): Host to [requests per second, burst] budget.
+        max_retry_after (int): Upper bound (in seconds) for a Retry-After pause.
+        adapter (HTTPAdapter): Keep-alive connection pool shared by all sessions.
+    """
+
+    limits = {
+        'api.real-debrid.com': [250 / 60, 10],
+        'api.trakt.tv': [1000 / 300, 10],
+    }
+    max_retry_after = 120
+    adapter = requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=16, max_retries=0)
+    buckets = {}
+    metrics = {}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def host(url):
+        return urllib.parse.urlsplit(url).netloc.lower()
+
+    def limit(host, rate, burst=1, default=False):
+        """Set the request budget of a host. With default=True an existing budget is kept."""
+        with http_hosts.lock:
+            if default and (host in http_hosts.limits or host in http_hosts.buckets):
+                return
+            http_hosts.limits[host] = [rate, burst]
+            http_hosts.buckets.pop(host, None)
+
+    def bucket(host):
+        with http_hosts.lock:
+            if not host in http_hosts.buckets:
+                rate, burst = http_hosts.limits.get(host, [None, 1])
+                http_hosts.buckets[host] = token_bucket(rate, burst)
+            return http_hosts.buckets[host]
+
+    def record(host, status, elapsed, waited=0, retried=False):
+        with http_hosts.lock:
+            if not host in http_hosts.metrics:
+                http_hosts.metrics[host] = {'requests': 0, 'errors': 0, 'throttled': 0, 'retries': 0, 'waited': 0.0, 'elapsed': 0.0}
+            metrics = http_hosts.metrics[host]
+            metrics['requests'] += 1
+            metrics['elapsed'] += elapsed
+            metrics['waited'] += waited
+            if status == None or status >= 500:
+                metrics['errors'] += 1
+            if status == 429:
+                metrics['throttled'] += 1
+            if retried:
+                metrics['retries'] += 1
 
-    This class provides per-instance rate limiting, automatic retry for
+    def outcome(failed):
+        """Count the final outcome of a request for the calling thread."""
+        if failed:
+            http_hosts.local.failed = getattr(http_hosts.local, 'failed', 0) + 1
+        else:
+            http_hosts.local.answered = getattr(http_hosts.local, 'answered', 0) + 1
+
+    def outcomes():
+        """Return the number of answered and failed requests of the calling thread."""
+        return getattr(http_hosts.local, 'answered', 0), getattr(http_hosts.local, 'failed', 0)
+
+    def report():
+        """Return one summary line per host, busiest first."""
+        with http_hosts.lock:
+            metrics = sorted(http_hosts.metrics.items(), key=lambda item: -item[1]['requests'])
+        return [host + ": " + str(m['requests']) + " requests, " + str(m['errors']) + " errors, " + str(m['throttled']) + " throttled, " + str(m['retries']) + " retries, " + str(round(m['waited'], 1)) + "s waited, " + str(round(m['elapsed'] / max(1, m['requests']), 3)) + "s avg" for host, m in metrics]
+
+    def retry_after(response):
+        """Parse a Retry-After header given either in seconds or as an http date."""
+        value = response.headers.get('Retry-After')
+        if value == None:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+            except Exception:
+                return None
+        return min(http_hosts.max_retry_after, max(0, seconds))
+
+    def backoff(attempt):
+        return random.uniform(0.5, 1.0) * min(30, 2 ** attempt)
+
+class pooled_session(requests.Session):
+    """Session using the shared keep-alive pool and per-host token buckets.
+
+    Behaves like requests.Session, but waits for the host budget before every request
+    and retries responses with a retry code, honoring their Retry-After header.
+
+    Attributes:
+        RETRY_CODES (list): List of HTTP status codes to be retried.
+        RETRIES (int): Number of retries for a response with a retry code.
+        RETRY_ERRORS (bool): Whether connection errors are retried as well.
+    """
+
+    def __init__(self, retry_codes=[429, 503], retries=2, retry_errors=False):
+        super(pooled_session, self).__init__()
+        self.RETRY_CODES = retry_codes
+        self.RETRIES = retries
+        self.RETRY_ERRORS = retry_errors
+        self.mount('https://', http_hosts.adapter)
+        self.mount('http://', http_hosts.adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        host = http_hosts.host(url)
+        attempt = 0
+        while True:
+            waited = http_hosts.bucket(host).acquire()
+            started = time.time()
+            try:
+                response = super(pooled_session, self).request(method, url, *args, **kwargs)
+            except requests.RequestException:
+                http_hosts.record(host, None, time.time() - started, waited, attempt > 0)
+                if not self.RETRY_ERRORS or attempt >= self.RETRIES:
+                    http_hosts.outcome(True)
+                    raise
+                attempt += 1
+                time.sleep(http_hosts.backoff(attempt))
+                continue
+            http_hosts.record(host, response.status_code, time.time() - started, waited, attempt > 0)
+            if response.status_code in self.RETRY_CODES and attempt < self.RETRIES:
+                attempt += 1
+                delay = http_hosts.retry_after(response)
+                if delay == None:
+                    delay = http_hosts.backoff(attempt)
+                logger.error(f"request error: {response.status_code} - retrying in {round(delay, 1)}s... {url}")
+                # pause the whole host, so other threads dont keep hammering it meanwhile
+                http_hosts.bucket(host).pause(delay)
+                continue
+            http_hosts.outcome(response.status_code >= 400 and response.status_code != 404)
+            return response
+
+class custom_session(pooled_session):
+    """Custom session class inheriting from pooled_session.
+
+    This class provides host rate limiting, automatic retry for
     certain error codes, and a default timeout.
 
     Attributes:
@@ -37,7 +229,6 @@ class custom_session(requests.Session):
         MAX_RETRIES (int): Maximum number of retries.
         GET_RATE_LIMIT (float): Time (in seconds) to wait between GET requests.
         POST_RATE_LIMIT (float): Time (in seconds) to wait between POST requests.
-        last_request_time (float): Timestamp of the last request made.
     """
 
     def __init__(self,
@@ -55,14 +246,12 @@ class custom_session(requests.Session):
             get_rate_limit (float): Time (in seconds) to wait between GET requests.
             post_rate_limit (float): Time (in seconds) to wait between POST requests.
         """
-        super(custom_session, self).__init__()
+        super(custom_session, self).__init__(retry_codes=retry_codes, retries=max_retries - 1, retry_errors=True)
 
         self.DEFAULT_TIMEOUT = timeout
-        self.RETRY_CODES = retry_codes
         self.MAX_RETRIES = max_retries
         self.GET_RATE_LIMIT = get_rate_limit
         self.POST_RATE_LIMIT = post_rate_limit
-        self.last_request_time = 0
 
     def request(self, method, url, **kwargs):
         """Override the request method to include rate limiting, retries, and default timeout.
@@ -79,41 +268,22 @@ class custom_session(requests.Session):
         if 'timeout' not in kwargs:
             kwargs['timeout'] = self.DEFAULT_TIMEOUT
 
-        # Ensure rate limiting
-        elapsed_time = time.time() - self.last_request_time
-        if method == 'GET' and elapsed_time < self.GET_RATE_LIMIT:
-            time.sleep(self.GET_RATE_LIMIT - elapsed_time)
-        elif method == 'POST' and elapsed_time < self.POST_RATE_LIMIT:
-            time.sleep(self.POST_RATE_LIMIT - elapsed_time)
-
-        retries = 0
-        while retries < self.MAX_RETRIES:
-            try:
-                response = super(custom_session, self).request(method, url, **kwargs)
-
-                self.last_request_time = time.time()
+        # Budget the host by the session rate limit, unless the host has its own limit
+        rate_limit = self.POST_RATE_LIMIT if method == 'POST' else self.GET_RATE_LIMIT
+        if rate_limit and rate_limit > 0:
+            http_hosts.limit(http_hosts.host(url), 1.0 / rate_limit, default=True)
 
-                if response.status_code in self.RETRY_CODES:
-                    logger.error(f"request error: {response.status_code} - retrying... {url}")
-                    retries += 1
-                    if method == 'GET':
-                        time.sleep(self.GET_RATE_LIMIT)
-                    elif method == 'POST':
-                        time.sleep(self.POST_RATE_LIMIT)
-                    continue
+        try:
+            response = super(custom_session, self).request(method, url, **kwargs)
+        except requests.RequestException as e:
+            logger.error(f"request error: {e}")
+            response = None
 
-                return response
+        if response == None or response.status_code in self.RETRY_CODES:
+            logger.error(f"failed to fetch URL {url} after {self.MAX_RETRIES} attempts")
+            return None
 
-            except requests.RequestException as e:
-                logger.error(f"request error: {e}")
-                retries += 1
-                if method == 'GET':
-                    time.sleep(self.GET_RATE_LIMIT)
-                elif method == 'POST':
-                    time.sleep(self.POST_RATE_LIMIT)
-
-        logger.error(f"failed to fetch URL {url} after {self.MAX_RETRIES} attempts")
-        return None
+        return response
 
     def get(self, url, **kwargs):
         """Override the GET method to use the custom request method.
@@ -140,3 +310,112 @@ class custom_session(requests.Session):
             response: Response object returned from the POST request.
         """
         return self.request('POST', url, data=data, json=json, **kwargs)
+
+class record:
+    """Base of the typed records JSON objects of hot payloads are decoded into.
+
+    Subclasses list the fields they keep in __slots__, any other field of the object is dropped
+    while decoding. Fields that hold objects can name their own record type in `nested`.
+    Attribute access, hasattr, vars(), equality and pickling behave like SimpleNamespace.
+    """
+
+    __slots__ = ()
+    nested = {}
+
+    def __init__(self, **fields):
+        for key, value in fields.items():
+            setattr(self, key, value)
+
+    @property
+    def __dict__(self):
+        return {key: getattr(self, key) for key in self.__slots__ if hasattr(self, key)}
+
+    def __getstate__(self):
+        return self.__dict__
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    def __eq__(self, other):
+        return type(self) == type(other) and self.__dict__ == other.__dict__
+
+    __hash__ = None
+
+    def __repr__(self):
+        return type(self).__name__ + "(" + ", ".join(key + "=" + repr(value) for key, value in self.__dict__.items()) + ")"
+
+class json_decoder:
+    """Decodes JSON responses into attribute objects, like json.loads with a SimpleNamespace object_hook.
+
+    With record types or skipped fields, the document is parsed into plain dicts (by orjson when it is
+    installed) and converted in a single pass, so dropped fields never become objects.
+
+    Args:
+        types (dict): Maps a field name to the record type its objects are decoded into, wherever it appears.
+        root (type): Record type of the top level object, or of the objects of a top level list.
+        skip (set): Field names dropped from every SimpleNamespace object.
+    """
+
+    def __init__(self, types={}, root=None, skip=()):
+        self.types = types
+        self.root = root
+        self.skip = frozenset(skip)
+
+    def __call__(self, content):
+        if len(self.types) == 0 and self.root == None and len(self.skip) == 0:
+            return json.loads(content, object_hook=lambda d: SimpleNamespace(**d))
+        if orjson != None:
+            try:
+                value = orjson.loads(content)
+            except orjson.JSONDecodeError:
+                # NaN and Infinity are only accepted by the json module
+                value = json.loads(content)
+        else:
+            value = json.loads(content)
+        if type(value) is list:
+            return self.array(value, self.root)
+        if type(value) is dict:
+            return self.object(value) if self.root == None else self.record(value, self.root)
+        return value
+
+    def object(self, value):
+        types = self.types
+        for key in value.keys() & self.skip:
+            del value[key]
+        for key, item in value.items():
+            kind = type(item)
+            if kind is dict:
+                value[key] = self.object(item) if not key in types else self.record(item, types[key])
+            elif kind is list:
+                value[key] = self.array(item, types.get(key, None))
+        return SimpleNamespace(**value)
+
+    def array(self, value, type_):
+        for i, item in enumerate(value):
+            kind = type(item)
+            if kind is dict:
+                value[i] = self.object(item) if type_ == None else self.record(item, type_)
+            elif kind is list:
+                value[i] = self.array(item, type_)
+        return value
+
+    def record(self, value, type_):
+        obj = type_.__new__(type_)
+        nested = type_.nested
+        for key in type_.__slots__:
+            if key in value:
+                item = value[key]
+                kind = type(item)
+                if kind is list:
+                    item = self.array(item, nested.get(key, None))
+                elif kind is dict:
+                    item = self.object(item) if not key in nested else self.record(item, nested[key])
+                setattr(obj, key, item)
+        return obj
+
+def decode(content):
+    """Drop-in for json.loads(content, object_hook=lambda d: SimpleNamespace(**d))."""
+    return json_decoder.default(content)
+
+json_decoder.default = json_decoder()
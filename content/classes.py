@@ -321,9 +321,145 @@ class map:
                     return map.anidb.titles[EID]
 
 
+class library_index:
+    """Hash index over a collected library list.
+
+    Lookups follow the same rules as media.__eq__: movies and shows match by
+    any shared EID (or by guid if either side has no EID), seasons by
+    (show EID, season index) and episodes by (show EID, season index,
+    episode index). When several library items match, the one that comes
+    first in the library list wins, just like next(x for x in list if ...).
+    """
+
+    cache = []
+
+    def __init__(self, items):
+        self.items = items
+        self.length = len(items)
+        self.eids = {}
+        self.guids = {}
+        self.guids_without_eid = {}
+        self.titles = {}
+        self.position = 0
+        for item in items:
+            self.add(item)
+
+    def of(items):
+        # reuse the index of a library list as long as the list was not replaced or resized
+        for index in library_index.cache:
+            if index.items is items and index.length == len(items):
+                return index
+        index = library_index(items)
+        library_index.cache = [index] + library_index.cache[:3]
+        return index
+
+    def _put(table, key, value):
+        try:
+            if not key in table:
+                table[key] = value
+        except TypeError:
+            pass
+
+    def _keys(item):
+        # returns (eid keys, guid key) for an item of any media type
+        type = getattr(item, "type", None)
+        if type in ["movie", "show"]:
+            eids = getattr(item, "EID", None)
+            guid = getattr(item, "guid", None)
+            suffix = ()
+        elif type == "season":
+            eids = getattr(item, "parentEID", None)
+            guid = getattr(item, "parentGuid", None)
+            suffix = (getattr(item, "index", None),)
+        elif type == "episode":
+            eids = getattr(item, "grandparentEID", None)
+            guid = getattr(item, "grandparentGuid", None)
+            suffix = (getattr(item, "parentIndex", None), getattr(item, "index", None))
+        else:
+            return None, None
+        eid_keys = None
+        if not eids is None:
+            if isinstance(eids, str):
+                eids = [eids]
+            eid_keys = [(type, eid) + suffix for eid in eids]
+        return eid_keys, (type, guid) + suffix
+
+    def add(self, item):
+        self._add(item)
+        if getattr(item, "type", None) == "show":
+            title = str(getattr(item, "title", "")).strip().lower()
+            self.titles.setdefault(title, []).append(item)
+            for season in getattr(item, "Seasons", []):
+                self._add(season)
+                for episode in getattr(season, "Episodes", []):
+                    self._add(episode)
+
+    def _add(self, item):
+        eid_keys, guid_key = library_index._keys(item)
+        if guid_key is None:
+            return
+        entry = (self.position, item)
+        self.position += 1
+        if eid_keys is None:
+            library_index._put(self.guids_without_eid, guid_key, entry)
+        else:
+            for key in eid_keys:
+                library_index._put(self.eids, key, entry)
+        library_index._put(self.guids, guid_key, entry)
+
+    def find(self, element):
+        """Return the first library item that equals element, or None."""
+        eid_keys, guid_key = library_index._keys(element)
+        if guid_key is None:
+            return None
+        matches = []
+        try:
+            if eid_keys is None:
+                if guid_key in self.guids:
+                    matches += [self.guids[guid_key]]
+            else:
+                for key in eid_keys:
+                    if key in self.eids:
+                        matches += [self.eids[key]]
+                if guid_key in self.guids_without_eid:
+                    matches += [self.guids_without_eid[guid_key]]
+        except TypeError:
+            return None
+        if len(matches) == 0:
+            return None
+        return min(matches, key=lambda entry: entry[0])[1]
+
+    def __contains__(self, element):
+        return not self.find(element) is None
+
+    def show(self, eids=[], guid=None, title="", year=None):
+        """Return the first library show matching any of eids, then guid, then an unambiguous title/year."""
+        matches = []
+        for eid in eids:
+            if ("show", eid) in self.eids:
+                matches += [self.eids[("show", eid)]]
+        if len(matches) > 0:
+            return min(matches, key=lambda entry: entry[0])[1]
+        if not guid is None and ("show", guid) in self.guids:
+            return self.guids[("show", guid)][1]
+        title = str(title).strip().lower()
+        if title:
+            matches = []
+            for item in self.titles.get(title, []):
+                if year and hasattr(item, "year") and item.year not in (None, ""):
+                    if str(item.year) != str(year):
+                        continue
+                matches.append(item)
+            if len(matches) == 1:
+                return matches[0]
+        return None
+
+
 class media:
 
     ignore_queue = []
+    # the media workers and the scheduler use the ignore queue at the same time
+    ignore_lock = threading.Lock()
     downloaded_versions = []
     pack_in_progress = {}
     show_in_progress = {}  # Track shows with all seasons already sent to debrid
@@ -733,6 +869,18 @@ class media:
                             for episode in season.Episodes:
                                 episode.alternate_titles = self.alternate_titles
 
+    def matching(self, releases_):
+        # releases that match this item's deviation. seasons and episodes only test the candidates of the release index
+        deviation = regex.compile(self.deviation(), regex.I)
+        candidates = releases_
+        if self.type in ["season", "episode"] and not self.isanime():
+            index = releases.index.get(releases_)
+            if self.type == "season":
+                candidates = index.season(self.index)
+            else:
+                candidates = index.episode(self.parentIndex, self.index)
+        return [release for release in candidates if deviation.match(release.title)]
+
     def deviation(self, year=""):
         self.versions()
         if not self.isanime():
@@ -1080,9 +1228,10 @@ class media:
                     )
                 ]
         # update media items ignore count
-        if self in media.ignore_queue:
+        with media.ignore_lock:
             match = next((x for x in media.ignore_queue if self == x), None)
-            self.ignored_count = match.ignored_count
+            if match != None:
+                self.ignored_count = match.ignored_count
         if hasattr(self, "force_retries") and self.force_retries is not None:
             self.ignored_count = self.force_retries
         # remove versions that dont apply
@@ -1249,9 +1398,10 @@ class media:
 
     def version_missing(self):
         all_versions = []
-        if self in media.ignore_queue:
+        with media.ignore_lock:
             match = next((x for x in media.ignore_queue if self == x), None)
-            self.ignored_count = match.ignored_count
+            if match != None:
+                self.ignored_count = match.ignored_count
         for version in releases.sort.versions:
             if not "\u0336" in version[0]:
                 all_versions += [
@@ -1279,63 +1429,28 @@ class media:
             for episode in self.Episodes:
                 episode.set_file_names()
         if self.type in ["episode", "movie"]:
-            for element in plex.current_library:
-                if self.type == "movie":
-                    if self == element:
-                        try:
-                            for Media in element.Media:
-                                res = (
-                                    "2160"
-                                    if Media.videoResolution == "4k"
-                                    else Media.videoResolution
-                                )
-                                for Part in Media.Part:
-                                    self.existing_releases += [
-                                        "(" + res + "p) " + Part.file
-                                    ]
-                            return
-                        except Exception as e:
-                            ui_print(
-                                "error: (file name exception): "
-                                + self.query()
-                                + " "
-                                + str(e),
-                                ui_settings.debug,
-                            )
-                            return
-                elif self.type == "episode":
-                    if element.type == "show":
-                        if any(eid in self.grandparentEID for eid in element.EID):
-                            for season in element.Seasons:
-                                if not hasattr(season, "index"):
-                                    continue
-                                if self.parentIndex == season.index:
-                                    for episode in season.Episodes:
-                                        if self == episode:
-                                            try:
-                                                for Media in episode.Media:
-                                                    res = (
-                                                        "2160"
-                                                        if Media.videoResolution == "4k"
-                                                        else Media.videoResolution
-                                                    )
-                                                    for Part in Media.Part:
-                                                        self.existing_releases += [
-                                                            "("
-                                                            + res
-                                                            + "p) "
-                                                            + Part.file
-                                                        ]
-                                                return
-                                            except Exception as e:
-                                                ui_print(
-                                                    "error: (file name exception): "
-                                                    + self.query()
-                                                    + " "
-                                                    + str(e),
-                                                    ui_settings.debug,
-                                                )
-                                                return
+            element = library_index.of(plex.current_library).find(self)
+            if element == None:
+                return
+            try:
+                for Media in element.Media:
+                    res = (
+                        "2160"
+                        if Media.videoResolution == "4k"
+                        else Media.videoResolution
+                    )
+                    for Part in Media.Part:
+                        self.existing_releases += [
+                            "(" + res + "p) " + Part.file
+                        ]
+            except Exception as e:
+                ui_print(
+                    "error: (file name exception): "
+                    + self.query()
+                    + " "
+                    + str(e),
+                    ui_settings.debug,
+                )
 
     def complete(self, list):
         if self.type in ["movie", "episode"]:
@@ -1349,41 +1464,34 @@ class media:
         elif self.type == "show":
             if self.collected(list):
                 return True
-            Seasons = copy.deepcopy(self.Seasons)
-            for season in Seasons[:]:
+            for season in self.Seasons:
                 if (
                     not season.collected(list)
                     and not season.watched()
                     and season.released()
                     and not season.downloading()
                 ):
-                    for episode in season.Episodes[:]:
-                        if (
+                    for episode in season.Episodes:
+                        if not (
                             episode.collected(list)
                             or episode.watched()
                             or not episode.released()
                             or episode.downloading()
                         ):
-                            season.Episodes.remove(episode)
-                else:
-                    if season in Seasons:
-                        Seasons.remove(season)
-                if len(season.Episodes) == 0 and season in Seasons:
-                    Seasons.remove(season)
-            return len(Seasons) == 0
+                            return False
+            return True
         elif self.type == "season":
             if self.collected(list):
                 return True
-            Episodes = copy.deepcopy(self.Episodes)
-            for episode in Episodes[:]:
-                if (
+            for episode in self.Episodes:
+                if not (
                     episode.collected(list)
                     or episode.watched()
                     or not episode.released()
                     or episode.downloading()
                 ):
-                    Episodes.remove(episode)
-            return len(Episodes) == 0
+                    return False
+            return True
         return False
 
     def watch(self):
@@ -1411,26 +1519,24 @@ class media:
             + "],[".join(names)
             + "]"
         )
-        if not self in media.ignore_queue:
-            self.ignored_count = 1
-            media.ignore_queue += [self]
-            ui_print(
-                message + " - attempt " + str(self.ignored_count) + "/" + str(retries)
-            )
-        else:
+        with media.ignore_lock:
             match = next((x for x in media.ignore_queue if self == x), None)
-            if match.ignored_count < retries:
+            if match == None:
+                self.ignored_count = 1
+                media.ignore_queue += [self]
+                attempt = self.ignored_count
+            elif match.ignored_count < retries:
                 match.ignored_count += 1
-                ui_print(
-                    message
-                    + " - attempt "
-                    + str(match.ignored_count)
-                    + "/"
-                    + str(retries)
-                )
+                attempt = match.ignored_count
             else:
                 media.ignore_queue.remove(match)
-                ignore.add(self)
+                attempt = None
+        if attempt != None:
+            ui_print(
+                message + " - attempt " + str(attempt) + "/" + str(retries)
+            )
+        else:
+            ignore.add(self)
 
     def unwatch(self):
         ignore.remove(self)
@@ -1734,33 +1840,25 @@ class media:
                 )
 
     def collected(self, list):
+        index = library_index.of(list)
         if self.type in ["movie", "show"]:
-            if self in list:
+            match = index.find(self)
+            if not match == None:
                 if self.type == "movie":
                     return True
-                match = next((x for x in list if x == self), None)
                 if not hasattr(match, "leafCount"):
                     return False
                 if match.leafCount == self.leafCount:
                     return True
             return False
         if self.type == "season":
-            for show in list:
-                if show.type == "show":
-                    for season in show.Seasons:
-                        if self == season:
-                            if season.leafCount == self.leafCount:
-                                return True
-                            return False
+            season = index.find(self)
+            if not season == None:
+                if season.leafCount == self.leafCount:
+                    return True
             return False
         if self.type == "episode":
-            for show in list:
-                if show.type == "show":
-                    for season in show.Seasons:
-                        for episode in season.Episodes:
-                            if self == episode:
-                                return True
-            return False
+            return not index.find(self) == None
 
     def uncollected(self, list):
         if self.type == "movie":
@@ -1769,7 +1867,14 @@ class media:
         elif self.type == "show":
             if self.collected(list) and not self.version_missing():
                 return []
-            Seasons = copy.deepcopy(self.Seasons)
+            # the seasons are copied with their own episode lists, the episodes themselves are shared
+            Seasons = []
+            for season in self.Seasons:
+                season = copy.copy(season)
+                season.Episodes = season.Episodes[:]
+                if hasattr(season, "Releases"):
+                    season.Releases = season.Releases[:]
+                Seasons += [season]
             for season in Seasons[:]:
                 if (
                     (not season.collected(list) or season.version_missing())
@@ -1850,40 +1955,21 @@ class media:
     def _find_local_show(self, library):
         if not library:
             return None
+        index = library_index.of(library)
         if hasattr(self, "EID") and self.EID:
-            for item in library:
-                if item.type == "show" and hasattr(item, "EID"):
-                    for eid in self.EID:
-                        if eid in item.EID:
-                            return item
+            match = index.show(eids=self.EID)
+            if not match == None:
+                return match
         tmdb_id = getattr(self, "tmdb_id", None)
         if tmdb_id:
-            tmdb_ids = {f"tmdb://{tmdb_id}", f"themoviedb://{tmdb_id}"}
-            for item in library:
-                if item.type == "show" and hasattr(item, "EID"):
-                    for eid in item.EID:
-                        if eid in tmdb_ids:
-                            return item
-        if hasattr(self, "guid"):
-            for item in library:
-                if item.type == "show" and getattr(item, "guid", None) == self.guid:
-                    return item
-        title = str(getattr(self, "title", "")).strip().lower()
-        year = getattr(self, "year", None)
-        if title:
-            matches = []
-            for item in library:
-                if item.type != "show":
-                    continue
-                if str(getattr(item, "title", "")).strip().lower() != title:
-                    continue
-                if year and hasattr(item, "year") and item.year not in (None, ""):
-                    if str(item.year) != str(year):
-                        continue
-                matches.append(item)
-            if len(matches) == 1:
-                return matches[0]
-        return None
+            match = index.show(eids=[f"tmdb://{tmdb_id}", f"themoviedb://{tmdb_id}"])
+            if not match == None:
+                return match
+        return index.show(
+            guid=getattr(self, "guid", None),
+            title=getattr(self, "title", ""),
+            year=getattr(self, "year", None),
+        )
 
     def _local_episode_count(self, local_show):
         if not local_show or not hasattr(local_show, "Seasons"):
@@ -2001,6 +2087,7 @@ class media:
                                     + imdbID
                                     + ")?",
                                     ids=media_ids,
+                                    stop=self.early_stop(),
                                 )
                                 if (
                                     len(self.Releases) < 20
@@ -2009,7 +2096,7 @@ class media:
                                     and not imdbID == "."
                                 ):
                                     self.Releases += scraper.scrape(
-                                        imdbID, "(.*|" + imdbID + ")", ids=media_ids
+                                        imdbID, "(.*|" + imdbID + ")", ids=media_ids, stop=self.early_stop()
                                     )
                                     imdb_scraped = True
                                 if len(self.Releases) > 0 and release_policy._has_1080_plus(self.Releases):
@@ -2207,7 +2294,7 @@ class media:
                                 if len(self.Releases) > 0:
                                     break
                         debrid.check(self)
-                        parentReleases = copy.deepcopy(self.Releases)
+                        parentReleases = releases.copies(self.Releases)
                         
                         # Look for multi-season releases (lowered threshold from >3 to >=2)
                         if len(self.Seasons) >= 2:
@@ -2419,11 +2506,9 @@ class media:
             debrid_downloaded = False
             retryep = False
             attempt_episodes = False
-            for release in parentReleases:
-                if regex.match(self.deviation(), release.title, regex.I):
-                    self.Releases += [release]
+            self.Releases += self.matching(parentReleases)
             # Set the episodes parent releases to be the seasons parent releases:
-            scraped_releases = copy.deepcopy(parentReleases)
+            scraped_releases = releases.copies(parentReleases)
             self.Releases, _policy = release_policy.apply_release_policy(
                 self, self.Releases
             )
@@ -2601,7 +2686,7 @@ class media:
                     )
                     debrid.check(self)
                     ui_print(f"[SEASON_SCRAPING] Checked debrid cache status")
-                    scraped_releases = copy.deepcopy(self.Releases)
+                    scraped_releases = releases.copies(self.Releases)
                     ui_print(f"[SEASON_SCRAPING] scraped_releases set with {len(scraped_releases)} releases")
             # If there was nothing downloaded, attempt downloading again using the newly scraped releases
             retry = False
@@ -2776,10 +2861,9 @@ class media:
 
             # Check what releases match this episode
             matched_releases = []
-            for release in parentReleases:
-                if regex.match(self.deviation(), release.title, regex.I):
-                    self.Releases += [release]
-                    matched_releases.append(release.title[:80])
+            for release in self.matching(parentReleases):
+                self.Releases += [release]
+                matched_releases.append(release.title[:80])
 
             ui_print(f"[EPISODE_DOWNLOAD] Found {len(matched_releases)} matching releases from parentReleases")
             if matched_releases:
@@ -2831,12 +2915,14 @@ class media:
                                 query.replace(".", " "),
                                 self.deviation() + "(" + imdbID + ")?",
                                 ids=media_ids,
+                                stop=self.early_stop(),
                             )
                         else:
                             new_releases = scraper.scrape(
                                 query,
                                 self.deviation() + "(" + imdbID + ")?",
                                 ids=media_ids,
+                                stop=self.early_stop(),
                             )
 
                         ui_print(f"[EPISODE_DOWNLOAD] Scraping returned {len(new_releases)} releases")
@@ -2953,12 +3039,63 @@ class media:
                     episode.version = self.version
                     episode.downloaded()
 
+    def early_stop(self):
+        # scraper stop condition: a new release that debrid_download would stream for one of the versions.
+        # every batch is checked only once, the scraper passes the whole growing list.
+        checked = [0]
+        hd = [False]
+
+        def stop(found):
+            new = list(found[checked[0]:])
+            if len(new) == 0 or len(self.versions()) == 0:
+                return False
+            # movies keep scraping other titles and years until there is a 1080p+ release,
+            # until then nothing counts as checked
+            if self.type == "movie":
+                hd[0] = hd[0] or release_policy._has_1080_plus(new)
+                if not hd[0]:
+                    return False
+            checked[0] = len(found)
+            releases_ = self.Releases
+            version_ = getattr(self, "version", None)
+            try:
+                self.Releases = new
+                debrid.check(self)
+                new, _policy = release_policy.apply_release_policy(self, new)
+                for version in self.versions():
+                    self.version = version
+                    candidates = releases.sort(releases.copies(new), version, doprint=False, element=self)
+                    for release in candidates:
+                        if self.streamable(release):
+                            ui_print(
+                                "[EARLY_STOP] cached release for version '" + version.name + "' found: " + release.title,
+                                ui_settings.debug,
+                            )
+                            return True
+                return False
+            except Exception as e:
+                ui_print("[EARLY_STOP] error: " + str(e), ui_settings.debug)
+                return False
+            finally:
+                self.Releases = releases_
+                if version_ == None:
+                    if hasattr(self, "version"):
+                        del self.version
+                else:
+                    self.version = version_
+
+        return stop
+
+    def streamable(self, release):
+        # releases that debrid_download sends as a stream: confirmed or possibly cached on a debrid service
+        return len(getattr(release, "cached", [])) > 0 or len(getattr(release, "maybe_cached", [])) > 0
+
     def debrid_download(self, force=False):
         debrid.check(self)
         self.bitrate()
         if len(self.Releases) > 0:
             releases.print_releases(self.Releases, True)
-        scraped_releases = copy.deepcopy(self.Releases)
+        scraped_releases = releases.copies(self.Releases)
         downloaded = []
         active_debrid_services = debrid.services.get()
         alldebrid_only = (
@@ -3001,14 +3138,14 @@ class media:
                     ui_settings.debug,
                 )
                 self.version = version
-                self.Releases = copy.deepcopy(scraped_releases)
+                self.Releases = releases.copies(scraped_releases)
                 releases.sort(self.Releases, self.version, element=self)
                 if len(self.Releases) > 0:
                     releases.print_releases(self.Releases, True)
-                sorted_releases = copy.deepcopy(self.Releases)
+                sorted_releases = releases.copies(self.Releases)
                 ver_dld = False
                 if alldebrid_only and len(sorted_releases) > 0:
-                    self.Releases = copy.deepcopy(sorted_releases)
+                    self.Releases = releases.copies(sorted_releases)
                     if debrid.download(
                         self,
                         stream=True,
@@ -3022,19 +3159,16 @@ class media:
                             f"[DEBRID_DOWNLOAD] No cached AD release found for version '{version.name}', falling back to first sorted release",
                             ui_settings.debug,
                         )
-                        self.Releases = [copy.deepcopy(sorted_releases[0])]
+                        self.Releases = [sorted_releases[0].copy()]
                         if debrid.download(self, stream=False, force=force):
                             _record_download(mark_uncached=True)
                             ver_dld = True
                 else:
-                    for release in copy.deepcopy(self.Releases):
+                    for release in releases.copies(self.Releases):
                         self.Releases = [
                             release,
                         ]
-                        if (hasattr(release, "cached") and len(release.cached) > 0) or (
-                            hasattr(release, "maybe_cached")
-                            and len(release.maybe_cached) > 0
-                        ):
+                        if self.streamable(release):
                             if debrid.download(self, stream=True, force=force):
                                 _record_download()
                                 ver_dld = True
@@ -3130,64 +3264,20 @@ class media:
 
     def _is_season_pack_release(self, title):
         """Check if a release title is a season pack (S01) vs individual episode (S01E01)."""
-        # Season pack: has S01, S02, etc. but NOT S01E01, S02E03, etc.
-        has_season = regex.search(r'\.S\d{1,2}\.', title, regex.I) or regex.search(r'\.S\d{1,2}$', title, regex.I)
-        has_episode = regex.search(r'S\d{1,2}E\d{1,2}', title, regex.I)
-        return has_season and not has_episode
+        return releases.parse(title).season_pack
 
     def _title_quality(self, title):
-        match = regex.search(r"(2160|1080|720|480)(?=p|i)", title, regex.I)
-        if match:
-            return int(match.group())
-        return 0
+        return releases.parse(title).quality
 
     def _is_single_season_title(self, title):
-        if self._is_season_pack_release(title):
-            return True
-        if regex.search(r"\bseason\W*\d+\b", title, regex.I):
-            if regex.search(r"\bseason\W*\d+\W*\d+\b", title, regex.I):
-                return False
-            return True
-        return False
+        return releases.parse(title).single_season
 
     def _is_multi_season_title(self, title):
-        if regex.search(r"\bS\d{1,2}(?:\W|_)+S?\d{1,2}\b", title, regex.I):
-            return True
-        if regex.search(r"\bS\d{1,2}S\d{1,2}\b", title, regex.I):
-            return True
-        if regex.search(r"\bseasons?\W*\d+\W*\d+\b", title, regex.I):
-            return True
-        if regex.search(r"\b(complete|integrale)\b", title, regex.I):
-            return not self._is_single_season_title(title)
-        return False
+        return releases.parse(title).multi_season
 
     def _covered_seasons_from_title(self, title):
-        if regex.search(r"\b(complete|integrale)\b", title, regex.I):
-            return None
-        match = regex.search(
-            r"\bS(\d{1,2})(?:\W|_)+S?(\d{1,2})\b", title, regex.I
-        )
-        if match:
-            start = int(match.group(1))
-            end = int(match.group(2))
-            if start > end:
-                start, end = end, start
-            return set(range(start, end + 1))
-        match = regex.search(r"\bS(\d{1,2})S(\d{1,2})\b", title, regex.I)
-        if match:
-            start = int(match.group(1))
-            end = int(match.group(2))
-            if start > end:
-                start, end = end, start
-            return set(range(start, end + 1))
-        match = regex.search(r"\bseasons?\W*(\d{1,2})\W*(\d{1,2})\b", title, regex.I)
-        if match:
-            start = int(match.group(1))
-            end = int(match.group(2))
-            if start > end:
-                start, end = end, start
-            return set(range(start, end + 1))
-        return set()
+        covered = releases.parse(title).covered_seasons
+        return None if covered is None else set(covered)
 
     def season_pack(self, releases):
         ui_print(f"[SEASON_PACK_CHECK] Entering season_pack() with {len(self.Releases)} self.Releases and {len(releases)} parent releases")
@@ -3217,14 +3307,12 @@ class media:
         for i, episode in enumerate(
             self.Episodes
         ):  # find the highest resolution for each episode
-            ep_match = regex.compile(episode.deviation(), regex.IGNORECASE)
             episode_matches = 0
-            for release in releases:
+            for release in episode.matching(releases):
                 if (
                     len(release.cached) + len(release.maybe_cached) > 0
                     and int(release.resolution) >= season_releases
                     and int(release.resolution) > episode_releases[i]
-                    and ep_match.match(release.title)
                 ):
                     episode_matches += 1
                     episode_releases[i] = int(release.resolution)
@@ -16,29 +16,32 @@ def _load_state():
     global _STATE
     if _STATE is not None:
         return _STATE
-    state = {}
+    state = {"upgrade_queue": store.load("release_policy", "upgrade_queue")}
+    if not isinstance(state["upgrade_queue"], dict):
+        state["upgrade_queue"] = {}
     path = _state_path()
-    if os.path.exists(path) and os.path.getsize(path) > 0:
+    if not state["upgrade_queue"] and os.path.exists(path) and os.path.getsize(path) > 0:
+        # one-time migration of the legacy json state into the state store
         try:
             with open(path, "r") as f:
-                state = json.load(f)
-        except Exception:
-            state = {}
-    state.pop("timers", None)
-    if "upgrade_queue" not in state:
-        state["upgrade_queue"] = {}
+                legacy = json.load(f)
+            if isinstance(legacy.get("upgrade_queue"), dict):
+                state["upgrade_queue"] = legacy["upgrade_queue"]
+            if store.save(state["upgrade_queue"], "release_policy", "upgrade_queue", verbose=False):
+                os.replace(path, path + ".migrated")
+        except Exception as e:
+            ui_print(f"[release_policy] error: couldnt migrate {path}: {e}", ui_settings.debug)
     _STATE = state
     return _STATE
 
 
-def _save_state():
+def _save_state(keys):
+    # only the given queue entries are written, entries that are gone from the queue are deleted
     state = _load_state()
-    path = _state_path()
-    try:
-        with open(path, "w") as f:
-            json.dump(state, f, indent=2)
-    except Exception as e:
-        ui_print(f"[release_policy] error: couldnt write {path}: {e}", ui_settings.debug)
+    queue = state["upgrade_queue"]
+    changes = {key: queue[key] for key in keys if key in queue}
+    removed = [key for key in keys if not key in queue]
+    store.update(changes, "release_policy", "upgrade_queue", removed=removed)
 
 
 def _now():
@@ -125,39 +128,29 @@ def _resolution_from_release(release):
             return res_int
     except Exception:
         pass
-    title = str(getattr(release, "title", ""))
-    match = regex.search(r"(?<![0-9])(2160|1080|720|480)(?=p)", title, regex.I)
-    if match:
-        try:
-            return int(match.group(1))
-        except Exception:
-            return 0
-    return 0
+    return int(releases.parse(str(getattr(release, "title", ""))).resolution)
 
 
 def _is_4k_release(release):
     res = _resolution_from_release(release)
     if res >= 2160:
         return True
-    title = str(getattr(release, "title", ""))
-    return bool(regex.search(r"\b(4k|uhd)\b", title, regex.I))
+    return releases.parse(getattr(release, "title", "")).uhd
 
 
 def _is_1080_release(release):
     res = _resolution_from_release(release)
     if res == 1080:
         return True
-    title = str(getattr(release, "title", ""))
-    return bool(regex.search(r"\b1080p\b", title, regex.I))
+    return releases.parse(getattr(release, "title", "")).p1080
 
 
-def _has_1080_plus(releases):
-    for release in releases:
+def _has_1080_plus(releases_):
+    for release in releases_:
         res = _resolution_from_release(release)
         if res >= 1080:
             return True
-        title = str(getattr(release, "title", ""))
-        if regex.search(r"\b(1080p|2160p|4k|uhd)\b", title, regex.I):
+        if releases.parse(getattr(release, "title", "")).hd:
             return True
     return False
 
@@ -279,7 +272,7 @@ def maybe_queue_upgrade(media, release):
     entry["added"] = now
     entry["last_checked"] = now
     state["upgrade_queue"][key] = entry
-    _save_state()
+    _save_state([key])
     ui_print(
         f"[UPGRADE QUEUE] queued 4K check for '{entry.get('title', '')}'",
         ui_settings.debug,
@@ -291,7 +284,7 @@ def clear_upgrade(media):
     key = media_key(media)
     if key in state["upgrade_queue"]:
         del state["upgrade_queue"][key]
-        _save_state()
+        _save_state([key])
 
 
 def _build_media_from_entry(entry):
@@ -320,7 +313,7 @@ def run_upgrade_checks():
     now = _now()
     if not state["upgrade_queue"]:
         return
-    changed = False
+    changed = []
     for key, entry in list(state["upgrade_queue"].items()):
         last_checked = entry.get("last_checked", 0)
         if now - int(last_checked) < _UPGRADE_CHECK_INTERVAL_SECONDS:
@@ -333,14 +326,14 @@ def run_upgrade_checks():
                 age_days = None
             if age_days is None or age_days > _UPGRADE_MAX_AGE_DAYS:
                 del state["upgrade_queue"][key]
-                changed = True
+                changed += [key]
                 continue
         query = entry.get("query", "")
         altquery = entry.get("altquery", "(.*)")
         if not query:
             entry["last_checked"] = now
             state["upgrade_queue"][key] = entry
-            changed = True
+            changed += [key]
             continue
         try:
             ui_print(
@@ -354,13 +347,13 @@ def run_upgrade_checks():
             ui_print(f"[UPGRADE QUEUE] scrape error: {e}", ui_settings.debug)
             entry["last_checked"] = now
             state["upgrade_queue"][key] = entry
-            changed = True
+            changed += [key]
             continue
         releases_list = [r for r in releases_list if _is_4k_release(r)]
         entry["last_checked"] = now
         if not releases_list:
             state["upgrade_queue"][key] = entry
-            changed = True
+            changed += [key]
             continue
         try:
             media_obj = _build_media_from_entry(entry)
@@ -373,10 +366,10 @@ def run_upgrade_checks():
                 del state["upgrade_queue"][key]
             else:
                 state["upgrade_queue"][key] = entry
-            changed = True
+            changed += [key]
         except Exception as e:
             ui_print(f"[UPGRADE QUEUE] download error: {e}", ui_settings.debug)
             state["upgrade_queue"][key] = entry
-            changed = True
+            changed += [key]
     if changed:
-        _save_state()
+        _save_state(changed)
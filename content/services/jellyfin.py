@@ -5,7 +5,7 @@ from content import classes
 from ui.ui_print import *
 
 name = 'Jellyfin'
-session = requests.Session()
+session = pooled_session()
 api_key = ''
 
 def logerror(response):
@@ -19,7 +19,7 @@ def get(url, timeout=30):
         headers = {"X-MediaBrowser-Token": api_key}
         response = session.get(url, timeout=timeout, headers=headers)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
         return response
     except Exception as e:
         ui_print("jellyfin error: (json exception): " + str(e), debug=ui_settings.debug)
@@ -30,7 +30,7 @@ def post(url, data):
         headers = {"X-MediaBrowser-Token": api_key}
         response = session.post(url, data=data, headers=headers)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
         return response
     except Exception as e:
         ui_print("jellyfin error: (json exception): " + str(e), debug=ui_settings.debug)
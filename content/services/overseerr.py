@@ -12,7 +12,7 @@ users = ['all']
 allowed_movie_status = [['2'], ['3']]
 allowed_show_status = [['2'], ['3'], ['4'], ['5']]
 api_key = ""
-session = requests.Session()
+session = pooled_session()
 last_requests = []
 
 def setup(self):
@@ -179,7 +179,7 @@ def get(url):
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36',
             'Content-type': "application/json", "X-Api-Key": api_key})
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
     except Exception as e:
         ui_print("[overseerr] error: (exception): " + str(e), debug=ui_settings.debug)
         return None
@@ -191,7 +191,7 @@ def post(url, data):
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36',
             'Content-type': "application/json", "X-Api-Key": api_key}, data=data)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
     except Exception as e:
         ui_print("[overseerr] error: (exception): " + str(e), debug=ui_settings.debug)
         return None
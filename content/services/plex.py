@@ -67,6 +67,22 @@ headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
 current_library = []
 WATCHLIST_PAGE_SIZE = 100
 
+class guid(record):
+    __slots__ = ("id",)
+
+class part(record):
+    __slots__ = ("id", "key", "file", "size", "duration", "container")
+
+class media_version(record):
+    __slots__ = ("id", "videoResolution", "bitrate", "width", "height", "videoCodec", "audioCodec", "audioChannels", "container", "Part")
+    nested = {"Part": part}
+
+# library sections and watchlists are decoded with typed guids and media versions, fields nobody reads are dropped
+decoder = json_decoder(
+    types={"Guid": guid, "Media": media_version},
+    skip={"Image", "UltraBlurColors", "Role", "Director", "Writer", "Producer", "Country", "Rating", "Similar", "Field", "Chapter", "Marker", "Stream", "Review", "Mood", "Style"},
+)
+
 def setup(cls, new=False):
     from content.services import setup
     setup(cls,new)
@@ -89,7 +105,7 @@ def get(session: requests.Session, url: str, timeout=60):
     try:
         response = session.get(url, headers=headers, timeout=timeout)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decoder(response.content)
         return response
     except Exception as e:
         ui_print("plex error: (json exception): " + str(e), debug=ui_settings.debug)
@@ -99,7 +115,7 @@ def post(session: requests.Session, url: str, data):
     try:
         response = session.post(url, data=data, headers=headers)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decoder(response.content)
         return response
     except Exception as e:
         ui_print("plex error: (json exception): " + str(e), debug=ui_settings.debug)
@@ -458,6 +474,12 @@ class library(classes.library):
     name = 'Plex Library'
     url = 'http://plex:32400'
     check = []
+    incremental = "false"
+    full_sync_interval = "24"
+    page_size = "1000"
+    # per section: {"mark": highest updatedAt/addedAt seen, "synced": time of the last full sync}
+    sync_state = {}
+    lock = threading.Lock()
 
     def setup(cls, new=False):
         from settings import settings_list
@@ -740,11 +762,11 @@ class library(classes.library):
             try:
                 tags = element.post_tags
                 retries = 0
-                while element not in current_library and retries < 6:
+                while classes.library_index.of(current_library).find(element) == None and retries < 6:
                     time.sleep(10)
                     _ = library(silent=True)
                     retries += 1
-                library_item = next((x for x in current_library if element == x), None)
+                library_item = classes.library_index.of(current_library).find(element)
                 if library_item == None:
                     ui_print('[plex] error: couldnt add labels - item: "' + element.query() + '" could not be found on server.')
                     return
@@ -780,7 +802,7 @@ class library(classes.library):
                     if element.query() in version and not "Version: " +version.split("[")[-1][:-1] in tags:
                         tags += ["Version: " +version.split("[")[-1][:-1]]
                         version_tags = True
-                library_item = next((x for x in current_library if element == x), None)
+                library_item = classes.library_index.of(current_library).find(element)
                 # Return if no version tags and not collected
                 if library_item == None and version_tags == False:
                     return
@@ -933,15 +955,240 @@ class library(classes.library):
                 ui_print("[plex] error: couldnt check ignore status for item: " + str(e), debug=ui_settings.debug)
                 return False
 
+    def high_water_mark(elements, mark=0):
+        for element in elements:
+            for key in ["updatedAt", "addedAt"]:
+                try:
+                    mark = max(mark, int(getattr(element, key)))
+                except:
+                    continue
+        return mark
+
+    def sync_due(section):
+        if not library.incremental == "true":
+            return True
+        if not section in library.sync_state:
+            return True
+        try:
+            interval = float(library.full_sync_interval) * 3600
+        except:
+            interval = 24 * 3600
+        return time.time() - library.sync_state[section]["synced"] >= interval
+
+    def total(section, type):
+        url = library.url + '/library/sections/' + section + '/all?type=' + type + '&X-Plex-Container-Start=0&X-Plex-Container-Size=0&X-Plex-Token=' + users[0][1]
+        response = get(session, url)
+        try:
+            return int(response.MediaContainer.totalSize)
+        except:
+            return None
+
+    def pages(section, type):
+        # yields the MediaContainer of every page of a section, None if a page couldnt be fetched
+        try:
+            size = max(1, int(library.page_size))
+        except:
+            size = 1000
+        start = 0
+        while True:
+            url = library.url + '/library/sections/' + section + '/all?type=' + type + '&X-Plex-Container-Start=' + str(start) + '&X-Plex-Container-Size=' + str(size) + '&X-Plex-Token=' + users[0][1]
+            response = get(session, url)
+            if response is None:
+                yield None
+                return
+            if not hasattr(response, 'MediaContainer'):
+                return
+            container = response.MediaContainer
+            count = len(getattr(container, 'Metadata', []))
+            yield container
+            start += count
+            try:
+                total = int(container.totalSize)
+            except:
+                total = None
+            # a server may return short pages before the end, so the page size is only trusted without a totalSize
+            if total != None:
+                if start >= total or count == 0:
+                    return
+            elif count < size:
+                return
+
+    def assemble(page, movies, shows, seasons):
+        # adds a page of section elements to the show/season/episode tree. shows and seasons are
+        # requested before episodes, so every episode finds its season right away.
+        for item in page:
+            if item.type == "movie":
+                movies.append(item)
+            elif item.type == "show":
+                item.childCount = 0
+                item.leafCount = 0
+                item.Seasons = []
+                shows[item.guid] = item
+            elif item.type == "season":
+                item.leafCount = 0
+                item.Episodes = []
+                seasons[item.guid] = item
+            elif item.type == "episode":
+                if not item.parentGuid in seasons:
+                    continue
+                season = seasons[item.parentGuid]
+                if not season.parentGuid in shows:
+                    continue
+                show = shows[season.parentGuid]
+                season_ = next((x for x in show.Seasons if season == x), None)
+                if season_ != None:
+                    season_.Episodes.append(item)
+                    season_.leafCount += 1
+                    show.leafCount += 1
+                else:
+                    season.Episodes.append(item)
+                    season.leafCount += 1
+                    show.childCount += 1
+                    show.leafCount += 1
+                    show.Seasons.append(season)
+
+    def sync(section, types, changed=None):
+        # returns the items of this section with all changes since the last sync merged in, or None if the
+        # section needs a full sync. the changed items are added to changed.
+        # the cached items are shared with every caller of library(), so the delta is applied to copies of the
+        # touched movies/shows, which only replace the cached ones once the totals check passed.
+        # deletions never show up in a delta and are only noticed through the totals, so a deletion and an
+        # addition in the same window cancel out and the deleted item stays collected until the next full sync.
+        if changed == None:
+            changed = []
+        mark = library.sync_state[section]["mark"]
+        changes = {}
+        for type in types:
+            changes[type] = {}
+            for filter in ['updatedAt>=', 'addedAt>=']:
+                url = library.url + '/library/sections/' + section + '/all?type=' + type + '&' + filter + str(mark) + '&X-Plex-Token=' + users[0][1]
+                response = get(session, url)
+                if not hasattr(response, 'MediaContainer'):
+                    return None
+                if hasattr(response.MediaContainer, 'Metadata'):
+                    for element in response.MediaContainer.Metadata:
+                        changes[type][element.ratingKey] = element
+        items = [item for item in current_library if str(getattr(item, "librarySectionID", "")) == str(section)]
+        movies = {}
+        shows = {}
+        seasons = {}
+        for item in items:
+            if item.type == "movie":
+                movies[item.guid] = item
+            elif item.type == "show":
+                shows[item.guid] = item
+                for season in item.Seasons:
+                    seasons[season.guid] = season
+        copies = {}
+        def own(item):
+            # the copy of a cached movie/show, shows are copied down to their episodes
+            if id(item) in copies:
+                return copies[id(item)]
+            copy_ = copy.copy(item)
+            copies[id(item)] = copy_
+            copies[id(copy_)] = copy_
+            if item.type == "movie":
+                movies[item.guid] = copy_
+                return copy_
+            copy_.Seasons = []
+            for season in item.Seasons:
+                season_ = copy.copy(season)
+                season_.Episodes = [copy.copy(episode) for episode in season.Episodes]
+                copy_.Seasons += [season_]
+                seasons[season_.guid] = season_
+            shows[item.guid] = copy_
+            return copy_
+        touched = []
+        touched_movies = []
+        added = []
+        for type in types:
+            for element in changes[type].values():
+                if not hasattr(element, "librarySectionID"):
+                    element.librarySectionID = section
+                if element.type in ["movie", "show"]:
+                    match = movies.get(element.guid) if element.type == "movie" else shows.get(element.guid)
+                    if match == None:
+                        match = classes.media(element)
+                        added += [match]
+                        copies[id(match)] = match
+                        if match.type == "show":
+                            match.Seasons = []
+                            shows[match.guid] = match
+                        else:
+                            movies[match.guid] = match
+                    else:
+                        match = own(match)
+                        match.__dict__.update(element.__dict__)
+                    if match.type == "show" and not match in touched:
+                        touched += [match]
+                    elif match.type == "movie" and not match in touched_movies:
+                        touched_movies += [match]
+                elif element.type == "season":
+                    if not element.parentGuid in shows:
+                        return None
+                    if element.guid in seasons:
+                        show = own(shows[element.parentGuid])
+                        seasons[element.guid].__dict__.update(element.__dict__)
+                        if not show in touched:
+                            touched += [show]
+                    else:
+                        season = classes.media(element)
+                        season.Episodes = []
+                        seasons[season.guid] = season
+                elif element.type == "episode":
+                    if not element.parentGuid in seasons:
+                        return None
+                    if not seasons[element.parentGuid].parentGuid in shows:
+                        return None
+                    show = own(shows[seasons[element.parentGuid].parentGuid])
+                    season = seasons[element.parentGuid]
+                    match = next((x for x in season.Episodes if x.guid == element.guid), None)
+                    if match == None:
+                        season.Episodes.append(classes.media(element))
+                    else:
+                        match.__dict__.update(element.__dict__)
+                    if not season in show.Seasons:
+                        show.Seasons.append(season)
+                    if not show in touched:
+                        touched += [show]
+        for show in touched:
+            show.childCount = len(show.Seasons)
+            show.leafCount = 0
+            for season in show.Seasons:
+                season.leafCount = len(season.Episodes)
+                show.leafCount += season.leafCount
+        items = [copies.get(id(item), item) for item in items] + added
+        # deletions never show up in a delta, so compare against the server totals
+        if types == ['1']:
+            if not library.total(section, '1') == len(items):
+                return None
+        else:
+            episodes = 0
+            for show in shows.values():
+                for season in show.Seasons:
+                    episodes += len(season.Episodes)
+            if not library.total(section, '2') == len(shows) or not library.total(section, '4') == episodes:
+                return None
+        for type in types:
+            library.sync_state[section]["mark"] = library.high_water_mark(changes[type].values(), library.sync_state[section]["mark"])
+        changed += touched + touched_movies
+        return items
+
     def __new__(self,silent=False):
+        # the label threads and the main loop both refresh the library, one refresh runs at a time
+        with library.lock:
+            return library.fetch(silent)
+
+    def fetch(silent=False):
         global current_library
         list_ = []
         sections = []
         names = []
-        first_load = False
         if len(current_library) == 0:
-            first_load = True
             current_library = store.load("plex","metadata")
+            library.sync_state = store.load("plex","sync") if len(current_library) > 0 else {}
+            if not isinstance(library.sync_state, dict):
+                library.sync_state = {}
         if library.check == [['']]:
             library.check = []
         try:
@@ -961,84 +1208,78 @@ class library(classes.library):
         if not silent:
             ui_print('[plex] getting plex library section/s "' + '","'.join(names) + '" ...')
         section_fetch_errors = False
+        synced = []
+        changed = []
+        movies = []
+        shows = {}
         for section,types in sections:
             if section == '':
                 continue
-            section_response = []
+            if not library.sync_due(section):
+                section_items = library.sync(section, types, changed)
+                if not section_items == None:
+                    synced += section_items
+                    continue
+                ui_print("[plex] library section [" + section + "] looks out of sync, running a full sync ...", debug=ui_settings.debug)
+            # the section is paged through and every page goes straight into the show/season/episode tree,
+            # so only one page of raw metadata is held at a time
+            section_movies = []
+            section_shows = {}
+            section_seasons = {}
+            section_count = 0
+            section_mark = 0
             section_title = ''
             section_had_error = False
             for type in types:
-                url = library.url + '/library/sections/' + section + '/all?type=' + type + '&X-Plex-Token=' + users[0][1]
-                response = get(session, url)
-                if response is None:
-                    section_had_error = True
-                elif hasattr(response, 'MediaContainer'):
-                    if hasattr(response.MediaContainer, 'Metadata'):
-                        for element in response.MediaContainer.Metadata:
-                            section_response += [classes.media(element)]
-                    if hasattr(response.MediaContainer, 'librarySectionTitle'):
-                        section_title = response.MediaContainer.librarySectionTitle
+                for container in library.pages(section, type):
+                    if container is None:
+                        section_had_error = True
+                        break
+                    page = []
+                    for element in getattr(container, 'Metadata', []):
+                        if not hasattr(element, "librarySectionID"):
+                            element.librarySectionID = section
+                        page += [classes.media(element)]
+                    if hasattr(container, 'librarySectionTitle'):
+                        section_title = container.librarySectionTitle
+                    section_count += len(page)
+                    section_mark = library.high_water_mark(page, section_mark)
+                    library.assemble(page, section_movies, section_shows, section_seasons)
             if section_had_error:
                 section_fetch_errors = True
                 ui_print(f"[plex error]: failed to fetch library section [{section}]: {section_title} (network error, keeping cached data)")
                 continue
-            if len(section_response) == 0:
+            if section_count == 0:
                 ui_print(f"[plex error]: local plex library section [{section}]: {section_title} at server address: {library.url} is empty!")
                 continue
             else:
-                list_ += section_response
+                movies += section_movies
+                shows.update(section_shows)
+                changed += section_movies + list(section_shows.values())
+                library.sync_state[section] = {"mark": section_mark, "synced": time.time()}
         if section_fetch_errors and len(current_library) > 0:
             ui_print("[plex] network error fetching one or more sections — using cached library to prevent false re-downloads")
             ui_print('done')
             return current_library
-        if len(list_) == 0:
+        list_ = movies + list(shows.values())
+        if len(list_) == 0 and len(synced) == 0:
             ui_print("[plex error]: No library items were found.")
-        shows = {}
-        seasons = {}
-        for item in list_:
-            if item.type == "show":
-                item.childCount = 0
-                item.leafCount = 0
-                item.Seasons = []
-                shows[item.guid] = item
-            elif item.type == "season":
-                item.leafCount = 0
-                item.Episodes = []
-                seasons[item.guid] = item
-        for episode in list_:
-            if episode.type != "episode" or not episode.parentGuid in seasons:
-                continue
-            season = seasons[episode.parentGuid]
-            if not season.parentGuid in shows:
-                continue
-            show = shows[season.parentGuid]
-            season_ = next((x for x in show.Seasons if season == x), None)
-            if season_ != None:
-                season_.Episodes.append(episode)
-                season_.leafCount += 1
-                show.leafCount += 1
-            else:
-                season.Episodes.append(episode)
-                season.leafCount += 1
-                show.childCount += 1
-                show.leafCount += 1
-                show.Seasons.append(season)
-        list_ = [item for item in list_ if item.type == "movie"]
-        for value in shows.values():
-            list_.append(value)
+        list_ += synced
         if len(list_) - len(current_library) > 0:
             ui_print('done')
             ui_print('[plex] getting metadata for ' + str(len(list_) - len(current_library)) + ' collected movies/shows ...')
-        updated = False
+        current_index = classes.library_index.of(current_library)
         for item in list_:
             try:
-                if not item in current_library:
-                    updated = True
+                match = current_index.find(item)
+                if match is item:
+                    continue
+                if match == None:
+                    changed += [item]
                     url = library.url + '/library/metadata/' + item.ratingKey + '?X-Plex-Token=' + users[0][1]
                     response = get(session, url)
                     item.__dict__.update(response.MediaContainer.Metadata[0].__dict__)
                 else:
-                    match = next((x for x in current_library if item == x), None)
                     if hasattr(match,"Guid"):
                         item.Guid = match.Guid
                     if hasattr(match,"Label"):
@@ -1055,9 +1296,20 @@ class library(classes.library):
                 ui_print('done')
                 ui_print("[plex error]: found incorrectly matched library item : " + item.title + " - this item needs a metadata refresh (open plex webui, find item, open item menu, refresh metadata).")  
         ui_print('done')
-        current_library = copy.deepcopy(list_)
-        if first_load and updated:
-            store.save(current_library,"plex","metadata")       
+        # only the items that were synced are written, items that are gone from plex are deleted
+        kept = set(store.entry_key(item) for item in list_)
+        removed = [key for key in (store.entry_key(item) for item in current_library) if key != None and not key in kept]
+        changes = {}
+        for item in changed:
+            key = store.entry_key(item)
+            if key != None:
+                changes[key] = item
+        # the cached items are never changed after this, incremental syncs swap in updated copies
+        current_library = list(list_)
+        classes.library_index.of(current_library)
+        if len(changes) > 0 or len(removed) > 0:
+            store.update(changes, "plex", "metadata", removed=removed, kind='list')
+            store.update(library.sync_state, "plex", "sync")
         return list_
 
 def search(query, library=[]):
@@ -1,4 +1,4 @@
-from base import requests, json, time, regex, os
+from base import requests, json, time, regex, os, store, pooled_session
 import unicodedata
 import ui.ui_print as ui_print_module
 from ui.ui_print import ui_print, ui_settings
@@ -7,7 +7,7 @@ name = "TMDb"
 api_key = ""
 
 _BASE_URL = "https://api.themoviedb.org/3"
-_SESSION = requests.Session()
+_SESSION = pooled_session()
 
 _CACHE = {}
 _CACHE_LOADED = False
@@ -25,29 +25,29 @@ def _load_cache():
     if _CACHE_LOADED:
         return
     _CACHE_LOADED = True
+    data = store.load("tmdb", "status")
+    if isinstance(data, dict) and data:
+        _CACHE = data
+        return
+    _CACHE = {}
     path = _cache_path()
     if not os.path.exists(path):
-        _CACHE = {}
         return
+    # one-time migration of the legacy json cache into the state store
     try:
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
         if isinstance(data, dict):
             _CACHE = data
-        else:
-            _CACHE = {}
+            if store.save(_CACHE, "tmdb", "status", verbose=False):
+                os.replace(path, path + ".migrated")
     except Exception as e:
         _CACHE = {}
         ui_print(f"[tmdb] cache load failed: {e}", ui_settings.debug)
 
 
-def _save_cache():
-    path = _cache_path()
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(_CACHE, f, indent=2)
-    except Exception as e:
-        ui_print(f"[tmdb] cache save failed: {e}", ui_settings.debug)
+def _save_cache(key):
+    store.update({key: _CACHE[key]}, "tmdb", "status")
 
 
 def _cache_get(key):
@@ -75,7 +75,7 @@ def _cache_put(key, entry):
         return
     _load_cache()
     _CACHE[key] = entry
-    _save_cache()
+    _save_cache(key)
 
 
 def _extract_ids(eids):
@@ -27,7 +27,12 @@ users = []
 current_user = ["", ""]
 current_library = []
 early_releases = "false"
-session = requests.Session()
+session = pooled_session()
+
+class identifiers(record):
+    __slots__ = ("trakt", "slug", "imdb", "tmdb", "tvdb", "tvrage")
+
+decoder = json_decoder(types={"ids": identifiers})
 
 def setup(self, new=False):
     from settings import settings_list
@@ -196,7 +201,7 @@ def get(url):
         
         logerror(response)
         header = response.headers
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decoder(response.content)
     except Exception as e:
         location = get_error_location()
         ui_print("[trakt] error: " + str(e))
@@ -221,7 +226,7 @@ def post(url, data):
             "Authorization": "Bearer " + current_user[1]['access_token']}, data=data)
         
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decoder(response.content)
         time.sleep(1.1)
     except Exception as e:
         location = get_error_location()
@@ -236,7 +241,7 @@ def post2(url, data):
         if response.status_code not in [200, 201]:
             ui_print(f"[trakt] error {response.status_code}: " + str(response.content), ui_settings.debug)
             return None
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decoder(response.content)
         time.sleep(1.1)
     except Exception as e:
         ui_print("[trakt] error: " + str(e), ui_settings.debug)
@@ -2,60 +2,161 @@ from base import *
 #import child modules
 from debrid import services
 from ui.ui_print import *
+import releases
 
 tracker = []
 downloading = []
 uncached = 'true'
+cache_ttl = "1"
+cache_negative_ttl = "0.25"
+concurrency = "4"
+
+class budget:
+    """Caps how many media items talk to the debrid services at the same time."""
+
+    semaphore = None
+    size = 0
+    lock = threading.Lock()
+
+    def slot():
+        with budget.lock:
+            try:
+                size = max(1, int(float(concurrency)))
+            except:
+                size = 4
+            if budget.semaphore == None or budget.size != size:
+                budget.semaphore = threading.BoundedSemaphore(size)
+                budget.size = size
+            return budget.semaphore
+
+class cache:
+    """Process-wide cache of debrid availability per service and infohash.
+
+    Entries keep whether the torrent was cached and the raw file lists the service returned, so the
+    files can be classified again for other items. Cached torrents are kept for cache_ttl hours, torrents
+    that were not cached for cache_negative_ttl hours. The cache lives in the state store and an entry is
+    dropped as soon as a download from that service fails.
+    """
+
+    entries = {}
+    loaded = False
+    lock = threading.Lock()
+
+    def key(service, hash):
+        return service + ":" + str(hash).lower()
+
+    def load():
+        if cache.loaded:
+            return
+        cache.loaded = True
+        entries = store.load("debrid", "availability")
+        if isinstance(entries, dict):
+            cache.entries.update(entries)
+
+    def hours(value, default):
+        try:
+            return float(value) * 3600
+        except:
+            return default * 3600
+
+    def fresh(entry, now):
+        ttl = cache.hours(cache_ttl, 1) if entry["cached"] else cache.hours(cache_negative_ttl, 0.25)
+        return now - entry["time"] <= ttl
+
+    def get(service, hash):
+        with cache.lock:
+            cache.load()
+            entry = cache.entries.get(cache.key(service, hash), None)
+            if entry == None or not cache.fresh(entry, time.time()):
+                return None
+            return entry
+
+    def put(service, results):
+        # results: {hash: (cached, files)}, files being the raw file lists of the versions of the torrent
+        with cache.lock:
+            cache.load()
+            now = time.time()
+            changes = {}
+            for hash, (cached, files) in results.items():
+                changes[cache.key(service, hash)] = {"cached": cached, "files": files, "time": now}
+            cache.entries.update(changes)
+            removed = [key for key, entry in cache.entries.items() if not cache.fresh(entry, now)]
+            for key in removed:
+                del cache.entries[key]
+            store.update(changes, "debrid", "availability", removed=removed)
+
+    def invalidate(service, hash):
+        with cache.lock:
+            cache.load()
+            key = cache.key(service, hash)
+            if key in cache.entries:
+                del cache.entries[key]
+                store.update({}, "debrid", "availability", removed=[key])
 
 def _call_service_download(service, element, stream=True, query='', force=False, cache_mode=None):
-    if cache_mode is not None and getattr(service, "short", None) == "AD":
-        return service.download(
-            element,
-            stream=stream,
-            query=query,
-            force=force,
-            cache_mode=cache_mode,
-        )
-    return service.download(element, stream=stream, query=query, force=force)
+    with budget.slot():
+        if cache_mode is not None and getattr(service, "short", None) == "AD":
+            return service.download(
+                element,
+                stream=stream,
+                query=query,
+                force=force,
+                cache_mode=cache_mode,
+            )
+        return service.download(element, stream=stream, query=query, force=force)
 
 # Download Method:
 def download(element, stream=True, query='', force=False, cache_mode=None):
     downloaded_files = []
     if stream:
-        cached_releases = copy.deepcopy(element.Releases)
-        downloaded = False
-        for release in cached_releases:
-            element.Releases = [release, ]
-            if len(tracker) > 0:
+        cached_releases = releases.copies(element.Releases)
+        downloaded = False
+        if len(tracker) > 0:
+            for release in cached_releases:
                 for t, s in tracker:
                     if regex.search(t, release.source, regex.I):
                         release.cached = s
-            for service in services.get():
-                if service.short in release.cached + release.maybe_cached:
-                    if _call_service_download(
-                        service,
-                        element,
-                        stream=stream,
-                        query=query,
-                        force=force,
-                        cache_mode=cache_mode,
-                    ):
-                        downloaded = True
-                        downloaded_files += element.Releases[0].files
-                        if not hasattr(element,"existing_releases"):
-                            element.existing_releases = []
-                        if not hasattr(element,"downloaded_releases"):
-                            element.downloaded_releases = []
-                        element.existing_releases += [element.Releases[0].title]
-                        element.downloaded_releases += [element.Releases[0].title]
-                        break
-            if downloaded:
-                break
+        # services that can only tell if a release is cached by adding it may try several releases at once
+        for service in services.get():
+            if hasattr(service, "probe"):
+                with budget.slot():
+                    service.probe(element, cached_releases, query=query, force=force)
+        try:
+            for release in cached_releases:
+                element.Releases = [release, ]
+                for service in services.get():
+                    if service.short in release.cached + release.maybe_cached:
+                        if _call_service_download(
+                            service,
+                            element,
+                            stream=stream,
+                            query=query,
+                            force=force,
+                            cache_mode=cache_mode,
+                        ):
+                            downloaded = True
+                            downloaded_files += element.Releases[0].files
+                            if not hasattr(element,"existing_releases"):
+                                element.existing_releases = []
+                            if not hasattr(element,"downloaded_releases"):
+                                element.downloaded_releases = []
+                            element.existing_releases += [element.Releases[0].title]
+                            element.downloaded_releases += [element.Releases[0].title]
+                            break
+                        if service.short in release.cached:
+                            cache.invalidate(service.short, release.hash)
+                if downloaded:
+                    break
+        finally:
+            # torrents a service added while probing, but didnt download, are removed again
+            for service in services.get():
+                if hasattr(service, "discard"):
+                    service.discard(cached_releases)
         if len(element.Releases) > 0:
             element.Releases[0].files = downloaded_files
         return downloaded
     else:
-        scraped_releases = copy.deepcopy(element.Releases)
+        scraped_releases = releases.copies(element.Releases)
         downloaded = False
         for release in scraped_releases:
             element.Releases = [release, ]
@@ -79,6 +180,8 @@ def download(element, stream=True, query='', force=False, cache_mode=None):
                             element.existing_releases += [element.Releases[0].title]
                             element.downloaded_releases += [element.Releases[0].title]
                             break
+                        if service.short in release.cached:
+                            cache.invalidate(service.short, release.hash)
                 else:
                     if _call_service_download(
                         service,
@@ -112,7 +215,8 @@ def check(element, force=False):
     if len(element.Releases) > 0:
         ui_print("checking cache status for scraped releases on: [" + "],[".join(activeservices) + "] ...")
         for service in services.get():
-            service.check(element, force=force)
+            with budget.slot():
+                service.check(element, force=force)
         ui_print("done")
     for release in checked:
         element.Releases += [release]
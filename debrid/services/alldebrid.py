@@ -22,11 +22,11 @@ def logerror(response):
         ui_print("[alldebrid] error "+str(response.status_code)+": " + str(response.content), debug=ui_settings.debug)
     if 'error' in str(response.content):
         try:
-            response2 = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+            response2 = decode(response.content)
             ui_print("[alldebrid] error "+str(response.status_code)+": " + response2.data[0].error.message)
         except:
             try:
-                response2 = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+                response2 = decode(response.content)
                 ui_print("[alldebrid] error "+str(response.status_code)+": " + response2.error.message)
             except:
                 ui_print("[alldebrid] error "+str(response.status_code)+": unknown error")
@@ -42,7 +42,7 @@ def get(url):
         ui_print("[alldebrid] (get): " + url, debug=ui_settings.debug)
         response = session.get(url + '&agent=plex_debrid', headers=headers)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
     except Exception as e:
         ui_print("[alldebrid] error: (json exception): " + str(e), debug=ui_settings.debug)
         response = None
@@ -57,7 +57,7 @@ def post(url, data):
         ui_print("[alldebrid] (post): " + url + " with data " + repr(data), debug=ui_settings.debug)
         response = session.post(url, headers=headers, data=data)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
     except Exception as e:
         ui_print("[alldebrid] error: (json exception): " + str(e), debug=ui_settings.debug)
         response = None
@@ -74,7 +74,7 @@ def post_torrent_file(torrent_bytes):
         ui_print("[alldebrid] (post): uploading .torrent file", debug=ui_settings.debug)
         response = session.post(url, headers=headers, files=files)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
     except Exception as e:
         ui_print("[alldebrid] error: (torrent file upload): " + str(e), debug=ui_settings.debug)
         return None
@@ -181,16 +181,7 @@ def download(element, stream=True, query='', force=False, cache_mode=None):
     # (required) Check Function
 
 def check(element, force=False):
-    if force:
-        wanted = ['.*']
-    else:
-        wanted = element.files()
-    unwanted = releases.sort.unwanted
-    wanted_patterns = list(zip(wanted, [regex.compile(r'(' + key + ')', regex.IGNORECASE) for key in wanted]))
-    unwanted_patterns = list(zip(unwanted, [regex.compile(r'(' + key + ')', regex.IGNORECASE) for key in unwanted]))
     for release in element.Releases[:]:
-        release.wanted_patterns = wanted_patterns
-        release.unwanted_patterns = unwanted_patterns
         # FIX: Initialiser maybe_cached correctement
         if not hasattr(release, 'maybe_cached'):
             release.maybe_cached = []
@@ -9,7 +9,7 @@ short = "DL"
 api_key = ""
 client_id = "0KLCzpbPTCsWZtQ9Ad0aZA"
 # Define Variables
-session = requests.Session()
+session = pooled_session()
 
 def headers():
     return {
@@ -27,7 +27,7 @@ def logerror(response):
         ui_print("[debridlink] error "+str(response.status_code)+": " + str(response.content), debug=ui_settings.debug)
     if 'error' in str(response.content): 
         try:
-            response2 = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+            response2 = decode(response.content)
             if not response2.error == 'authorization_pending':
                 ui_print("[debridlink] error "+str(response.status_code)+": " + response2.error)
         except:
@@ -42,7 +42,7 @@ def get(url):
         ui_print("[debridlink] (get): " + url, debug=ui_settings.debug)
         response = session.get(url, headers=headers())
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
     except Exception as e:
         ui_print("debridlink error: (json exception): " + str(e), debug=ui_settings.debug)
         response = None
@@ -54,7 +54,7 @@ def post(url, data):
         ui_print("[debridlink] (post): " + url + " with data " + repr(data), debug=ui_settings.debug)
         response = session.post(url, headers=headers(), data=data)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
     except Exception as e:
         ui_print("debridlink error: (json exception): " + str(e), debug=ui_settings.debug)
         response = None
@@ -65,7 +65,7 @@ def delete(url):
         ui_print("[debridlink] (delete): " + url, debug=ui_settings.debug)
         response = session.delete(url, headers=headers())
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
     except Exception as e:
         ui_print("debridlink error: (json exception): " + str(e), debug=ui_settings.debug)
         response = None
@@ -136,16 +136,7 @@ def download(element, stream=True, query='', force=False):
     # (required) Check Function
 
 def check(element, force=False):
-    if force:
-        wanted = ['.*']
-    else:
-        wanted = element.files()
-    unwanted = releases.sort.unwanted
-    wanted_patterns = list(zip(wanted, [regex.compile(r'(' + key + ')', regex.IGNORECASE) for key in wanted]))
-    unwanted_patterns = list(zip(unwanted, [regex.compile(r'(' + key + ')', regex.IGNORECASE) for key in unwanted]))
     for release in element.Releases[:]:
-        release.wanted_patterns = wanted_patterns
-        release.unwanted_patterns = unwanted_patterns
         release.maybe_cached += ['DL']  # we won't know if it's cached until we attempt to download it
 
 
@@ -9,7 +9,11 @@ short = "PM"
 # (required) Authentification of the Debrid service, can be oauth aswell. Create a setting for the required variables in the ui.settings_list. For an oauth example check the trakt authentification.
 api_key = ""
 # Define Variables
-session = requests.Session()
+session = pooled_session()
+# cache checks are split into chunks that keep the url short, and spread over a few workers within this request budget
+http_hosts.limit('www.premiumize.me', 5, 5, default=True)
+check_chunk = 100
+check_workers = 4
 
 def setup(cls, new=False):
     from debrid.services import setup
@@ -20,7 +24,7 @@ def logerror(response):
     if not response.status_code == 200:
         ui_print("[premiumize] error: " + str(response.content), debug=ui_settings.debug)
     if 'error' in str(response.content):
-        response2 = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response2 = decode(response.content)
         ui_print("[premiumize] error: " + response2.message)
     if response.status_code == 401:
         ui_print(
@@ -34,7 +38,7 @@ def get(url):
     try:
         response = session.get(url + '&apikey=' + api_key, headers=headers)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
     except Exception as e:
         ui_print("[premiumize] error: (json exception): " + str(e), debug=ui_settings.debug)
         response = None
@@ -49,7 +53,7 @@ def post(url, data):
         response = session.post(url + '?apikey=' + api_key + data,
                                                     headers=headers, data={})
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
     except Exception as e:
         ui_print("[premiumize] error: (json exception): " + str(e), debug=ui_settings.debug)
         response = None
@@ -88,26 +92,44 @@ def download(element, stream=True, query='', force=False):
     # (required) Check Function
 
 def check(element, force=False):
-    if force:
-        wanted = ['.*']
-    else:
-        wanted = element.files()
-    unwanted = releases.sort.unwanted
+    import debrid as db
     hashes = []
+    availability = {}
     for release in element.Releases[:]:
         if len(release.hash) == 40:
-            hashes += [release.hash]
+            entry = db.cache.get(short, release.hash)
+            if entry != None:
+                availability[release.hash.lower()] = entry["cached"]
+            elif not release.hash.lower() in availability:
+                availability[release.hash.lower()] = None
+                hashes += [release.hash.lower()]
         else:
             element.Releases.remove(release)
-    if len(hashes) > 0:
-        response = get(
-            'https://www.premiumize.me/api/cache/check?items[]=' + '&items[]='.join(hashes[:200]))
-        for i, release in enumerate(element.Releases):
-            try:
-                instant = response.response[i]
-                if instant:
-                    release.cached += ['PM']
-                    # release.wanted = 0
-                    # release.unwanted = 0
-            except:
-                continue
\ No newline at end of file
+    chunks = [hashes[offset:offset + check_chunk] for offset in range(0, len(hashes), check_chunk)]
+    def cachecheck(chunk):
+        return get('https://www.premiumize.me/api/cache/check?items[]=' + '&items[]='.join(chunk))
+    responses = []
+    if len(chunks) == 1:
+        responses = [cachecheck(chunks[0])]
+    elif len(chunks) > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(check_workers, len(chunks)), thread_name_prefix="premiumize") as executor:
+            responses = list(executor.map(cachecheck, chunks))
+    results = {}
+    for chunk, response in zip(chunks, responses):
+        # the answers are in the order of the requested hashes
+        try:
+            if len(response.response) != len(chunk):
+                continue
+            for hash, instant in zip(chunk, response.response):
+                results[hash] = (bool(instant), [])
+        except:
+            continue
+    if len(results) > 0:
+        db.cache.put(short, results)
+        for hash in results:
+            availability[hash] = results[hash][0]
+    for release in element.Releases:
+        if availability.get(release.hash.lower(), False) and not 'PM' in release.cached:
+            release.cached += ['PM']
+            # release.wanted = 0
+            # release.unwanted = 0
\ No newline at end of file
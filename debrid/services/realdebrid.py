@@ -15,7 +15,14 @@ media_file_extensions = [
 # (required) Authentification of the Debrid service, can be oauth aswell. Create a setting for the required variables in the ui.settings_list. For an oauth example check the trakt authentification.
 api_key = ""
 # Define Variables
-session = requests.Session()
+session = pooled_session()
+# number of releases that are added at once to find a cached one, if only cached releases are wanted
+probes = "3"
+
+class torrent_file(record):
+    __slots__ = ("id", "path", "bytes", "selected")
+
+decoder = json_decoder(types={"files": torrent_file})
 errors = [
     [202," action already done"],
     [400," bad Request (see error message)"],
@@ -49,7 +56,7 @@ def get(url):
     try:
         response = session.get(url, headers=headers)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decoder(response.content)
     except Exception as e:
         ui_print("[realdebrid] error: (json exception): " + str(e), debug=ui_settings.debug)
         response = None
@@ -65,7 +72,7 @@ def post(url, data):
         response = session.post(url, headers=headers, data=data)
         logerror(response)
         ui_print("[realdebrid] response: " + repr(response), debug=ui_settings.debug)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decoder(response.content)
     except Exception as e:
         if hasattr(response,"status_code"):
             if response.status_code >= 300:
@@ -80,7 +87,7 @@ def delete(url):
     headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36','authorization': 'Bearer ' + api_key}
     try:
         ui_print("[realdebrid] (delete): " + url, debug=ui_settings.debug)
-        response = requests.delete(url, headers=headers)
+        response = session.delete(url, headers=headers)
         logerror(response)
 
     except Exception as e:
@@ -90,27 +97,12 @@ def delete(url):
 
 # Object classes
 class file:
-    def __init__(self, id, name, size, wanted_list, unwanted_list):
+    def __init__(self, id, name, size, matcher):
         self.id = id
         self.name = name
         self.size = size / 1000000000
-        self.match = ''
-        wanted = False
-        unwanted = False
-        for key, wanted_pattern in wanted_list:
-            if wanted_pattern.search(self.name):
-                wanted = True
-                self.match = key
-                break
-
-        if not wanted:
-            for key, unwanted_pattern in unwanted_list:
-                if unwanted_pattern.search(self.name) or self.name.endswith('.exe') or self.name.endswith('.txt'):
-                    unwanted = True
-                    break
-
-        self.wanted = wanted
-        self.unwanted = unwanted
+        self.match, self.unwanted = matcher.match(self.name)
+        self.wanted = self.match != ''
 
     def __eq__(self, other):
         return self.id == other.id
@@ -129,6 +121,131 @@ class version:
             if file.unwanted:
                 self.unwanted += 1
 
+def poll(torrent_id, done, timeout=10):
+    # waits for a torrent to reach a state, checking its info with a growing delay instead of a fixed sleep
+    delay = 0.25
+    deadline = time.time() + timeout
+    while True:
+        response = get('https://api.real-debrid.com/rest/1.0/torrents/info/' + torrent_id)
+        if response == None or not hasattr(response, "status") or done(response) or time.time() + delay > deadline:
+            return response
+        time.sleep(delay)
+        delay = min(delay * 2, 2)
+
+def raw_files(response):
+    # the file list of a torrent info response, the way the debrid cache keeps it
+    return [[vars(file_) for file_ in getattr(response, "files", [])]]
+
+def cached_only(element):
+    if hasattr(element, "version"):
+        for rule in element.version.rules:
+            if (rule[0] == "cache status") and (rule[1] == 'requirement' or rule[1] == 'preference') and (rule[2] == "cached"):
+                return True
+    return False
+
+def probe(element, candidates, query='', force=False):
+    """Add the first few releases that only real debrid could serve at once, and keep the first one that is cached.
+
+    The cached torrent is kept for the following download() of that release, all other torrents are deleted and
+    the releases are no longer tried on real debrid in this download. If download() doesnt take the kept torrent
+    over, discard() deletes it.
+    """
+    from debrid import services
+    import debrid as db
+    try:
+        count = int(probes)
+    except:
+        count = 1
+    if count < 2 or not cached_only(element):
+        return
+    if query == '':
+        query = element.deviation()
+    active = [service.short for service in services.get()]
+    probed = []
+    for release in candidates:
+        if len(release.cached) > 0 or [s for s in release.maybe_cached if s in active] != [short]:
+            break
+        if regex.match(query, release.title, regex.I) or force:
+            probed += [release]
+    if len(probed) < 2:
+        return
+
+    # every torrent that was added, so none of them is left behind whatever happens
+    added = []
+
+    def add(release):
+        # returns [torrent id, info response, files, cached]. cached is None if the torrent never got past the file
+        # selection, or if none of its files are wanted by this item, since that says nothing about the torrent.
+        try:
+            response = post('https://api.real-debrid.com/rest/1.0/torrents/addMagnet', {'magnet': release.download[0]})
+            if not hasattr(response, "id"):
+                return None
+            torrent_id = str(response.id)
+            added.append(torrent_id)
+            response = poll(torrent_id, lambda response: response.status != 'magnet_conversion')
+            if not hasattr(response, "files") or len(response.files) == 0:
+                return [torrent_id, response, [], None]
+            version_files = [file(file_.id, file_.path, file_.bytes, release.matcher) for file_ in response.files]
+            cached_ids = [vf.id for vf in version_files if vf.wanted and not vf.unwanted and vf.name.endswith(tuple(media_file_extensions))]
+            if len(cached_ids) == 0:
+                return [torrent_id, response, version_files, None]
+            post('https://api.real-debrid.com/rest/1.0/torrents/selectFiles/' + torrent_id, {'files': ",".join(map(str, cached_ids))})
+            response = poll(torrent_id, lambda response: response.status not in ['magnet_conversion', 'waiting_files_selection'], timeout=5)
+            if not hasattr(response, "status") or response.status in ['magnet_conversion', 'waiting_files_selection']:
+                return [torrent_id, response, version_files, None]
+            if response.status == 'downloaded':
+                if hasattr(response, "links") and len(response.links) == len(cached_ids):
+                    return [torrent_id, response, version_files, True]
+                return [torrent_id, response, version_files, None]
+            return [torrent_id, response, version_files, False]
+        except Exception as e:
+            ui_print(f'[realdebrid] unexpected error: ' + str(e))
+            return None
+
+    def remove(keep=None):
+        for torrent_id in added[:]:
+            if torrent_id != keep:
+                added.remove(torrent_id)
+                try:
+                    delete('https://api.real-debrid.com/rest/1.0/torrents/delete/' + torrent_id)
+                except Exception:
+                    pass
+
+    kept = None
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=count, thread_name_prefix="realdebrid") as executor:
+            for offset in range(0, len(probed), count):
+                batch = probed[offset:offset + count]
+                ui_print('[realdebrid] adding ' + str(len(batch)) + ' releases at once to find a cached one ...', ui_settings.debug)
+                results = list(executor.map(add, batch))
+                for release, result in zip(batch, results):
+                    if result == None or result[3] == None:
+                        # errors and undecided torrents are left to download()
+                        continue
+                    if result[3] and kept == None:
+                        kept = result[0]
+                        release.probed = result
+                    elif not result[3]:
+                        db.cache.put(short, {release.hash: (False, raw_files(result[1]))})
+                        release.maybe_cached.remove(short)
+                remove(keep=kept)
+                ui_print('done', ui_settings.debug)
+                if kept != None:
+                    break
+    finally:
+        remove(keep=kept)
+
+def discard(candidates):
+    # deletes the torrents probe() kept for releases that download() didnt take over
+    for release in candidates:
+        if hasattr(release, "probed"):
+            torrent_id = release.probed[0]
+            del release.probed
+            try:
+                delete('https://api.real-debrid.com/rest/1.0/torrents/delete/' + torrent_id)
+            except Exception:
+                pass
+
 # (required) Download Function.
 def download(element, stream=True, query='', force=False):
     cached = element.Releases
@@ -136,6 +253,16 @@ def download(element, stream=True, query='', force=False):
         query = element.deviation()
     for release in cached[:]:
         try:  # if release matches query
+            if hasattr(release, "probed"):
+                # added and found cached by probe()
+                torrent_id, response, version_files, cached_ = release.probed
+                del release.probed
+                release.files = [version(version_files)]
+                release.download = response.links
+                ui_print('[realdebrid] added cached release: ' + release.title)
+                if getattr(response, "filename", "") != "":
+                    release.title = response.filename
+                return True
             if regex.match(query, release.title,regex.I) or force:
                 response = post('https://api.real-debrid.com/rest/1.0/torrents/addMagnet', {'magnet': release.download[0]})
                 if hasattr(response, 'error') and response.error == 'infringing_file':
@@ -147,9 +274,8 @@ def download(element, stream=True, query='', force=False):
                 elif not hasattr(response, "id"):
                     ui_print(f'[realdebrid]: unexpected error when adding torrent {release.title}.')
                     continue
-                time.sleep(1.0)
                 torrent_id = str(response.id)
-                response = get('https://api.real-debrid.com/rest/1.0/torrents/info/' + torrent_id)
+                response = poll(torrent_id, lambda response: response.status != 'magnet_conversion', timeout=3)
                 if response.status == 'magnet_error':
                     ui_print( f'[realdebrid]: failed to add torrent {release.title}. Looking for another release.')
                     delete('https://api.real-debrid.com/rest/1.0/torrents/delete/' + torrent_id)
@@ -157,7 +283,7 @@ def download(element, stream=True, query='', force=False):
                 if hasattr(response, "files") and len(response.files) > 0:
                     version_files = []
                     for file_ in response.files:
-                        debrid_file = file(file_.id, file_.path, file_.bytes, release.wanted_patterns, release.unwanted_patterns)
+                        debrid_file = file(file_.id, file_.path, file_.bytes, release.matcher)
                         version_files.append(debrid_file)
                     release.files = [version(version_files)]
                     cached_ids = [vf.id for vf in version_files if vf.wanted and not vf.unwanted and vf.name.endswith(tuple(media_file_extensions))]
@@ -185,6 +311,8 @@ def download(element, stream=True, query='', force=False):
                                     ui_print('[realdebrid] added uncached release: ' + release.title)
                                     return True
                                 else:
+                                    import debrid as db
+                                    db.cache.put(short, {release.hash: (False, raw_files(response))})
                                     ui_print(f'[realdebrid]: {release.title} is in {response.status} status (not cached). Looking for another release.')
                                     delete('https://api.real-debrid.com/rest/1.0/torrents/delete/' + torrent_id)
                                     continue
@@ -226,9 +354,14 @@ def check(element, force=False):
     else:
         wanted = element.files()
     unwanted = releases.sort.unwanted
-    wanted_patterns = list(zip(wanted, [regex.compile(r'(' + key + ')', regex.IGNORECASE) for key in wanted]))
-    unwanted_patterns = list(zip(unwanted, [regex.compile(r'(' + key + ')', regex.IGNORECASE) for key in unwanted]))
+    matcher = releases.matcher.get(tuple(wanted), tuple(unwanted))
+    # releases that recently turned out not to be cached aren't added again, if only cached releases are wanted
+    only = cached_only(element)
+    import debrid as db
     for release in element.Releases[:]:
-        release.wanted_patterns = wanted_patterns
-        release.unwanted_patterns = unwanted_patterns
+        release.matcher = matcher
+        if only:
+            entry = db.cache.get(short, release.hash)
+            if entry != None and not entry["cached"]:
+                continue
         release.maybe_cached += ['RD']  # we won't know if it's cached until we attempt to download it
@@ -7,7 +7,10 @@ short = "TB"
 # (required) Authentification of the Torbox service, can be oauth aswell. Create a setting for the required variables in the ui.settings_list. For an oauth example check the trakt authentification.
 api_key = ""
 # Define Variables
-session = requests.Session()
+session = pooled_session()
+# the torbox api allows about 5 requests per second, chunked cache checks are spread over a few workers within that budget
+http_hosts.limit('api.torbox.app', 5, 5, default=True)
+check_workers = 4
 errors = [
     [202, " action already done"],
     [400, " bad Request (see error message)"],
@@ -44,7 +47,7 @@ def get(url):
         ui_print("[torbox] (get): " + url, debug=ui_settings.debug)
         response = session.get(url, headers=headers)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
         if hasattr(response, "detail"):
             if hasattr(response, "success") and not response.success:
                 ui_print("[torbox] failed: " + response.detail)
@@ -64,7 +67,7 @@ def post(url, data=None, json_data=None):
         ui_print("[torbox] (post): " + url + " with data " + repr(data if data else json_data), debug=ui_settings.debug)
         response = session.post(url, headers=headers, json=json.dumps(json_data)) if json_data else session.post(url, headers=headers, data=data)
         logerror(response)
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
         if hasattr(response, "detail"):
             if hasattr(response, "success") and not response.success:
                 ui_print("[torbox] failed: " + response.detail)
@@ -83,27 +86,12 @@ def post(url, data=None, json_data=None):
 
 # Object classes
 class file:
-    def __init__(self, id, name, size, wanted_list, unwanted_list):
+    def __init__(self, id, name, size, matcher):
         self.id = id
         self.name = name
         self.size = size / 1000000000
-        self.match = ''
-        wanted = False
-        unwanted = False
-        for key, wanted_pattern in wanted_list:
-            if wanted_pattern.search(self.name):
-                wanted = True
-                self.match = key
-                break
-
-        if not wanted:
-            for key, unwanted_pattern in unwanted_list:
-                if unwanted_pattern.search(self.name) or self.name.endswith('.exe') or self.name.endswith('.txt'):
-                    unwanted = True
-                    break
-
-        self.wanted = wanted
-        self.unwanted = unwanted
+        self.match, self.unwanted = matcher.match(self.name)
+        self.wanted = self.match != ''
 
     def __eq__(self, other):
         return self.id == other.id
@@ -206,45 +194,75 @@ def check(element, force=False):
     else:
         wanted = element.files()
     unwanted = releases.sort.unwanted
-    wanted_patterns = list(zip(wanted, [regex.compile(r'(' + key + ')', regex.IGNORECASE) for key in wanted]))
-    unwanted_patterns = list(zip(unwanted, [regex.compile(r'(' + key + ')', regex.IGNORECASE) for key in unwanted]))
+    matcher = releases.matcher.get(tuple(wanted), tuple(unwanted))
 
+    import debrid as db
     hashes = set()
     for release in element.Releases[:]:
         if len(release.hash) == 40:
-            hashes.add(release.hash)
+            hashes.add(release.hash.lower())
         else:
             ui_print("[torbox] error (missing torrent hash): ignoring release '" + release.title + "'")
             element.Releases.remove(release)
 
+    # only ask for hashes that weren't checked recently
+    availability = {}
+    for hash in hashes:
+        entry = db.cache.get(short, hash)
+        if entry != None:
+            availability[hash] = (entry["cached"], entry["files"])
+    hashes = [hash for hash in hashes if not hash in availability]
+
     # we have a hard-limit of 190ish hashes before we get an error for using an overlong URI so split them up if so
-    offset = 0
     hash_limit = 190
+    chunks = [hashes[offset:offset + hash_limit] for offset in range(0, len(hashes), hash_limit)]
     ui_print("[torbox] checking and sorting all release files ...", ui_settings.debug)
-    hashes = list(hashes)  # so we can splice it
-    while offset < len(hashes):
-        response = get('https://api.torbox.app/v1/api/torrents/checkcached?format=list&list_files=true&hash=' + ','.join(hashes[offset:offset + hash_limit]))
-        offset += hash_limit
-        for release in element.Releases:
-            release.files = []
-            release_hash = release.hash.lower()
-            # for each of the releases, collate file details and cache status
-            if hasattr(response, "data") and response.data is not None:
-                for t in response.data:
-                    if t.hash == release_hash and 'TB' not in release.cached:  # ignore duplicates if t appears more than once
-                        version_files = []
-                        for file_ in t.files:
-                            debrid_file = file(file_, file_.name, file_.size, wanted_patterns, unwanted_patterns)
-                            version_files.append(debrid_file)
-                        release.files += [version(version_files), ]
-
-                        # select cached version that has the most needed, most wanted, least unwanted files and most files overall
-                        release.files.sort(key=lambda x: len(x.files), reverse=True)
-                        release.files.sort(key=lambda x: x.wanted, reverse=True)
-                        release.files.sort(key=lambda x: x.unwanted, reverse=False)
-                        release.wanted = release.files[0].wanted
-                        release.unwanted = release.files[0].unwanted
-                        release.size = release.files[0].size
-                        release.cached += ['TB']
-
-        ui_print("done", ui_settings.debug)
+    def checkcached(chunk):
+        return get('https://api.torbox.app/v1/api/torrents/checkcached?format=list&list_files=true&hash=' + ','.join(chunk))
+    responses = []
+    if len(chunks) == 1:
+        responses = [checkcached(chunks[0])]
+    elif len(chunks) > 1:
+        # the chunks are requested concurrently, the session keeps them within the torbox rate limit
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(check_workers, len(chunks)), thread_name_prefix="torbox") as executor:
+            responses = list(executor.map(checkcached, chunks))
+    results = {}
+    for chunk, response in zip(chunks, responses):
+        if not hasattr(response, "data") or response.data is None:
+            continue
+        for t in response.data:
+            if not t.hash.lower() in results:  # ignore duplicates if t appears more than once
+                results[t.hash.lower()] = (True, [[vars(file_) for file_ in t.files]])
+        for hash in chunk:
+            if not hash in results:
+                results[hash] = (False, [])
+    if len(results) > 0:
+        db.cache.put(short, results)
+        availability.update(results)
+
+    # collate file details and cache status for each of the releases
+    for release in element.Releases:
+        if 'TB' in release.cached:
+            continue
+        release.files = []
+        cached, files = availability.get(release.hash.lower(), (False, []))
+        if not cached:
+            continue
+        for files_ in files:
+            version_files = []
+            for file_ in files_:
+                file_ = SimpleNamespace(**file_)
+                debrid_file = file(file_, file_.name, file_.size, matcher)
+                version_files.append(debrid_file)
+            release.files += [version(version_files), ]
+
+        # select cached version that has the most needed, most wanted, least unwanted files and most files overall
+        release.files.sort(key=lambda x: len(x.files), reverse=True)
+        release.files.sort(key=lambda x: x.wanted, reverse=True)
+        release.files.sort(key=lambda x: x.unwanted, reverse=False)
+        release.wanted = release.files[0].wanted
+        release.unwanted = release.files[0].unwanted
+        release.size = release.files[0].size
+        release.cached += ['TB']
+
+    ui_print("done", ui_settings.debug)
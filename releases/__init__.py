@@ -13,7 +13,259 @@ def unstrike(text):
         result = result + (c if c != '\u0336' else '')
     return result
 
+class title_info:
+    """Metadata parsed from a release title. Get it with parse(title), results are cached per title.
+
+    Attributes:
+        resolution (str): First "2160|1080|720|480" followed by "p", "0" if there is none.
+        quality (int): First resolution followed by "p" or "i", 0 if there is none.
+        hd, uhd, p1080 (bool): 1080p/2160p/4k/uhd, 4k/uhd and 1080p tags.
+        hdr, dv (bool): HDR and Dolby Vision tags.
+        codec (str): Video codec tag, "" if there is none.
+        year (int): Release year, 0 if there is none.
+        languages (tuple): Language tags, e.g. ("FRENCH", "MULTI").
+        episodes (tuple): (season, first episode, last episode) of an SxxEyy(-Eyy) tag, None otherwise.
+        season_pack (bool): Single season pack like ".S01." without an episode tag.
+        single_season, multi_season (bool): Pack covering one or several seasons.
+        covered_seasons (frozenset): Seasons covered by a multi season pack, None for complete packs.
+        pack (bool): Any season pack, including complete and multi season packs.
+        seasons (frozenset): All "Sxx" season numbers in the title.
+        low_quality (bool): 720p or lower, or a low quality source without a high resolution tag.
+        season_tags (frozenset): Every season number a season deviation could match, from "season N", "SN" and "NxM" tags.
+        episode_tags (frozenset): Every lower case "sXXeYY" an episode deviation could match.
+    """
+
+    __slots__ = ('resolution', 'quality', 'hd', 'uhd', 'p1080', 'hdr', 'dv', 'codec', 'year', 'languages', 'episodes',
+                 'season_pack', 'single_season', 'multi_season', 'covered_seasons', 'pack', 'seasons', 'low_quality',
+                 'season_tags', 'episode_tags')
+
+    # every tag that is a whole word is found in one pass: resolution, hdr, dolby vision, codec, year, language,
+    # complete pack and low quality source tags. the season and episode structure is matched separately below.
+    tags = regex.compile(r'\b(?:(?P<hd>1080p|2160p|4k|uhd)|(?P<hdr>HDR(?:10)?\+?)|(?P<dv>DV|DOVI|DoVi|Dolby\W?Vision)|(?P<codec>[xh]\.?26[45]|HEVC|AVC|AV1|XviD|VC-?1)|(?P<year>(?:19|20)\d\d)|(?P<lang>MULTI|VF[FQI2]?|TRUEFRENCH|FRENCH|VOSTFR|GERMAN|ITALIAN|SPANISH|LATINO|RUSSIAN|HINDI|JAPANESE|KOREAN|DUAL|ENG(?:LISH)?)|(?P<complete>complete|integrale)|(?P<low>DVDRip|DVDScr|HDTV|PDTV|TVRip|CAM|TS|TC|R5))\b', regex.I)
+    # resolutions anywhere in the title, no suffix of one resolution is another, so a single scan finds the first of each
+    resolutions = regex.compile(r'(2160|1080|720|480)([pi])', regex.I)
+
+    def __init__(self, title):
+        title = str(title)
+        self.resolution = "0"
+        self.quality = 0
+        for match in title_info.resolutions.finditer(title):
+            if self.quality == 0:
+                self.quality = int(match.group(1))
+            if match.group(2) in 'pP':
+                self.resolution = match.group(1)
+                break
+        self.hd = False
+        self.uhd = False
+        self.p1080 = False
+        self.hdr = False
+        self.dv = False
+        self.codec = ""
+        self.year = 0
+        complete = False
+        low_source = False
+        languages = []
+        for match in title_info.tags.finditer(title):
+            if match.group('hd'):
+                self.hd = True
+                self.uhd = self.uhd or match.group('hd').lower() in ['4k', 'uhd']
+                self.p1080 = self.p1080 or match.group('hd').lower() == '1080p'
+            elif match.group('hdr'):
+                self.hdr = True
+            elif match.group('dv'):
+                self.dv = True
+            elif match.group('codec'):
+                if self.codec == "":
+                    self.codec = match.group('codec').upper().replace('.', '')
+            elif match.group('year'):
+                self.year = int(match.group('year'))
+            elif match.group('complete'):
+                complete = True
+            elif match.group('low'):
+                low_source = True
+            elif not match.group('lang').upper() in languages:
+                languages += [match.group('lang').upper()]
+        self.languages = tuple(languages)
+        match = regex.search(r'S(\d{1,2})E(\d{1,3})(?:-?E(\d{1,3}))?', title, regex.I)
+        self.episodes = (int(match.group(1)), int(match.group(2)), int(match.group(3) or match.group(2))) if match else None
+        # season pack checks, as used to pick packs for seasons and shows
+        has_season = regex.search(r'\.S\d{1,2}(?:\.|$)', title, regex.I)
+        self.season_pack = bool(has_season and not regex.search(r'S\d{1,2}E\d{1,2}', title, regex.I))
+        self.single_season = self.season_pack or (bool(regex.search(r"\bseason\W*\d+\b", title, regex.I)) and not regex.search(r"\bseason\W*\d+\W*\d+\b", title, regex.I))
+        self.covered_seasons = None if complete else frozenset()
+        self.multi_season = False
+        for pattern in [r"\bS(\d{1,2})(?:\W|_)+S?(\d{1,2})\b", r"\bS(\d{1,2})S(\d{1,2})\b", r"\bseasons?\W*(\d{1,2})\W*(\d{1,2})\b"]:
+            match = regex.search(pattern, title, regex.I)
+            if match:
+                self.multi_season = True
+                if not complete and len(self.covered_seasons) == 0:
+                    start, end = sorted([int(match.group(1)), int(match.group(2))])
+                    self.covered_seasons = frozenset(range(start, end + 1))
+        if not self.multi_season and regex.search(r"\bseasons?\W*\d+\W*\d+\b", title, regex.I):
+            self.multi_season = True
+        if not self.multi_season and complete:
+            self.multi_season = not self.single_season
+        # season pack checks, as used to filter prowlarr results before resolving them
+        self.pack = complete or bool(regex.search(r'\bS\d{1,2}\W*S?\d{1,2}\b', title, regex.I)) or bool(has_season and not regex.search(r'\.S\d{1,2}E\d{1,2}', title, regex.I))
+        seasons = set(int(season) for season in regex.findall(r'S(\d{1,2})', title, regex.I))
+        match = regex.search(r'\.S(\d{1,2})\.', title, regex.I)
+        if match:
+            seasons.add(int(match.group(1)))
+        self.seasons = frozenset(seasons)
+        self.low_quality = bool(
+            regex.search(r'(?<![0-9])(720|480|360|240)p', title, regex.I)
+            or (low_source and not regex.search(r'(?i)(1080|2160|4K)', title))
+        )
+        # season and episode coverage, a superset of what the season and episode deviations can match
+        title = title.lower()
+        season_tags = set()
+        for match in regex.finditer(r'season.(\d+)|s(\d+)', title, overlapped=True):
+            season_tags.add(int(match.group(1) or match.group(2)))
+        for match in regex.finditer(r'(\d+)x\d', title, overlapped=True):
+            season_tags.add(int(match.group(1)))
+        self.season_tags = frozenset(season_tags)
+        episode_tags = set()
+        for match in regex.finditer(r's(\d+)e(\d+)', title, overlapped=True):
+            for length in range(2, len(match.group(2)) + 1):
+                episode_tags.add('s' + match.group(1) + 'e' + match.group(2)[:length])
+        self.episode_tags = frozenset(episode_tags)
+
+@functools.lru_cache(maxsize=20000)
+def parse(title):
+    return title_info(title)
+
+class index:
+    """Season and episode coverage of a list of releases, so seasons and episodes only look at their candidates.
+
+    Releases without an episode tag are candidates for every episode, since episodes can also match by air date.
+    """
+
+    cache = collections.OrderedDict()
+    lock = threading.Lock()
+
+    def __init__(self, releases_):
+        self.releases = releases_
+        self.ids = list(map(id, releases_))
+        self.seasons = {}
+        self.episodes = {}
+        self.untagged = []
+        for position, release_ in enumerate(releases_):
+            info = parse(str(release_.title))
+            for season in info.season_tags:
+                self.seasons.setdefault(season, []).append(position)
+            for episode in info.episode_tags:
+                self.episodes.setdefault(episode, []).append(position)
+            if len(info.episode_tags) == 0:
+                self.untagged.append(position)
+
+    def get(releases_):
+        # the same release list is handed to every season or episode, so its index is kept for the next ones
+        with index.lock:
+            key = id(releases_)
+            if key in index.cache:
+                index_ = index.cache[key]
+                if index_.releases is releases_ and index_.ids == list(map(id, releases_)):
+                    index.cache.move_to_end(key)
+                    return index_
+            index_ = index(releases_)
+            index.cache[key] = index_
+            while len(index.cache) > 16:
+                index.cache.popitem(last=False)
+            return index_
+
+    def season(self, season):
+        return [self.releases[position] for position in self.seasons.get(season, [])]
+
+    def episode(self, season, episode):
+        positions = self.episodes.get('s' + "{:02d}".format(season) + 'e' + "{:02d}".format(episode), [])
+        return [self.releases[position] for position in sorted(positions + self.untagged)]
+
+def copies(releases_):
+    """Copies of a list of releases for another item or version, see release.copy()."""
+    return [release_.copy() if isinstance(release_, release) else copy.deepcopy(release_) for release_ in releases_]
+
+class matcher:
+    """Classifies debrid file names against the wanted and unwanted file patterns of a check.
+
+    All patterns are compiled into a single alternation, so a file is searched once instead of once per pattern.
+    The wanted key that is reported is still the first one in the given order that matches the file name.
+    Results are remembered per file name, since the same files show up in many releases.
+    """
+
+    def __init__(self, wanted, unwanted):
+        self.wanted = list(wanted)
+        self.unwanted = list(unwanted)
+        self.names = {}
+        self.wanted_patterns, self.wanted_groups = matcher.compile(self.wanted)
+        self.unwanted_patterns, self.unwanted_groups = matcher.compile(self.unwanted)
+
+    @functools.lru_cache(maxsize=16)
+    def get(wanted, unwanted):
+        return matcher(wanted, unwanted)
+
+    def compile(keys):
+        # returns the combined pattern and the group number that opens each alternative, or the single patterns if
+        # the keys can't be combined (e.g. clashing group names or inline flags)
+        patterns = [regex.compile(r'(' + key + ')', regex.IGNORECASE) for key in keys]
+        groups = []
+        number = 1
+        for pattern in patterns:
+            groups += [number]
+            number += pattern.groups
+        if len(patterns) < 2:
+            return patterns, groups
+        try:
+            return regex.compile('|'.join(r'(' + key + ')' for key in keys), regex.IGNORECASE), groups
+        except Exception:
+            return patterns, None
+
+    def first(patterns, groups, name):
+        # index of the first pattern that matches anywhere in name, or -1
+        if isinstance(patterns, list):
+            for index, pattern in enumerate(patterns):
+                if pattern.search(name):
+                    return index
+            return -1
+        first = -1
+        for match in patterns.finditer(name, overlapped=True):
+            index = bisect.bisect_right(groups, match.lastindex) - 1
+            if first < 0 or index < first:
+                first = index
+            if first == 0:
+                break
+        return first
+
+    def match(self, name):
+        # returns the matched wanted key ('' if there is none) and whether the file is unwanted
+        if name in self.names:
+            return self.names[name]
+        index = matcher.first(self.wanted_patterns, self.wanted_groups, name)
+        key = self.wanted[index] if index >= 0 else ''
+        unwanted = False
+        if index < 0 and len(self.unwanted) > 0:
+            unwanted = matcher.first(self.unwanted_patterns, self.unwanted_groups, name) >= 0 or name.endswith('.exe') or name.endswith('.txt')
+        if len(self.names) > 100000:
+            self.names = {}
+        self.names[name] = (key, unwanted)
+        return key, unwanted
+
+    # matchers are shared between the releases of a check, copies keep pointing to the same matcher
+    def __deepcopy__(self, memo):
+        return self
+
+    def __getstate__(self):
+        return (self.wanted, self.unwanted)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
 class release:
+    # every attribute a release can carry, including the ones set by the sort rules, the debrid services and
+    # print_releases, so releases dont need a __dict__
+    __slots__ = ('source', 'type', 'title', 'files', 'size', 'download', 'hash', 'cached', 'maybe_cached', 'checked',
+                 'wanted', 'unwanted', 'seeders', 'resolution', 'bitrate', 'torrent_bytes', 'matcher', 'probed',
+                 'file_name_sorting', 'file_size_sorting', 'printsize', 'printbit', 'file', '__weakref__')
+
     # Define release attributes
     def __init__(self, source, type, title, files, size, download, seeders=0):
         self.source = source
@@ -24,17 +276,40 @@ class release:
         self.download = download
         self.hash = ''
         if len(self.download) > 0:
-            if regex.search(r'(?<=btih:).*?(?=&|$)', str(self.download[0]), regex.I):
-                self.hash = regex.findall(r'(?<=btih:).*?(?=&|$)', str(self.download[0]), regex.I)[0]
+            match = regex.search(r'(?<=btih:).*?(?=&|$)', str(self.download[0]), regex.I)
+            if match:
+                self.hash = match.group()
         self.cached = []
         self.maybe_cached = []  # services where cached state can only be determined at time of download
         self.checked = False
         self.wanted = 0
         self.unwanted = 0
         self.seeders = seeders
-        self.resolution = "0"
-        if regex.search(r'(2160|1080|720|480)(?=p)', str(self.title), regex.I):
-            self.resolution = regex.findall(r'(2160|1080|720|480)(?=p)', str(self.title), regex.I)[0]
+        self.resolution = parse(str(self.title)).resolution
+
+    @property
+    def info(self):
+        return parse(str(self.title))
+
+    def copy(self):
+        # copy that can be changed on its own: its lists are new, the file versions and everything else are shared
+        new = release.__new__(release)
+        for attribute in release.__slots__[:-1]:
+            if hasattr(self, attribute):
+                setattr(new, attribute, getattr(self, attribute))
+        for attribute in ['files', 'download', 'cached', 'maybe_cached']:
+            if isinstance(getattr(new, attribute, None), list):
+                setattr(new, attribute, list(getattr(new, attribute)))
+        return new
+
+    def __setstate__(self, state):
+        # accepts both pickles of the slotted class and older pickles that kept everything in __dict__,
+        # attributes that releases no longer carry are dropped
+        if isinstance(state, tuple):
+            state = dict(state[0] or {}, **(state[1] or {}))
+        for key, value in state.items():
+            if key in release.__slots__:
+                setattr(self, key, value)
 
     # Define when releases are Equal
     def __eq__(self, other):
@@ -65,8 +340,9 @@ class release:
         # Helper to extract btih from a link
         def extract_btih(link: str) -> str:
             try:
-                if regex.search(r'(?<=btih:).*?(?=&|$)', str(link), regex.I):
-                    return regex.findall(r'(?<=btih:).*?(?=&|$)', str(link), regex.I)[0].lower()
+                match = regex.search(r'(?<=btih:).*?(?=&|$)', str(link), regex.I)
+                if match:
+                    return match.group().lower()
             except:
                 pass
             return ''
@@ -1040,12 +1316,14 @@ class sort:
                             return scraped_releases
                     elif self.weight == "preference":
                         if self.operator == "include":
+                            # release.copy() shares the file versions between items, so they are ranked by a local score instead of an attribute
+                            score = {}
                             for release in scraped_releases:
                                 release.file_name_sorting = 0
                                 if not hasattr(release,"files"):
                                     continue
                                 for version in release.files:
-                                    version.file_name_sorting = 0
+                                    score[id(version)] = 0
                                     if hasattr(version,"name"):
                                         if bool(regex.search(self.value, version.name, regex.I)):
                                             release.file_name_sorting = 1
@@ -1053,17 +1331,18 @@ class sort:
                                         for file in version.files:
                                             if bool(regex.search(self.value, file.name, regex.I)):
                                                 release.file_name_sorting = 1
-                                                version.file_name_sorting = 1
-                                release.files.sort(key=lambda s: s.file_name_sorting, reverse=True)
+                                                score[id(version)] = 1
+                                release.files.sort(key=lambda s: score[id(s)], reverse=True)
                             scraped_releases.sort(key=lambda s: s.file_name_sorting, reverse=True)
                             return scraped_releases
                         elif self.operator == "exclude":
+                            score = {}
                             for release in scraped_releases:
                                 release.file_name_sorting = 1
                                 if not hasattr(release,"files"):
                                     continue
                                 for version in release.files:
-                                    version.file_name_sorting = 1
+                                    score[id(version)] = 1
                                     if hasattr(version,"name"):
                                         if bool(regex.search(self.value, version.name, regex.I)):
                                             release.file_name_sorting = 0
@@ -1071,8 +1350,8 @@ class sort:
                                         for file in version.files:
                                             if bool(regex.search(self.value, file.name, regex.I)):
                                                 release.file_name_sorting = 0
-                                                version.file_name_sorting = 0
-                                release.files.sort(key=lambda s: s.file_name_sorting, reverse=True)
+                                                score[id(version)] = 0
+                                release.files.sort(key=lambda s: score[id(s)], reverse=True)
                             scraped_releases.sort(key=lambda s: s.file_name_sorting, reverse=True)
                             return scraped_releases
                     return scraped_releases
@@ -1154,12 +1433,13 @@ class sort:
                             return scraped_releases
                     elif self.weight == "preference":
                         if ">=" in self.operator:
+                            score = {}
                             for release in scraped_releases:
                                 release.file_size_sorting = 0
                                 if not hasattr(release,"files"):
                                     continue
                                 for version in release.files:
-                                    version.file_size_sorting = 0
+                                    score[id(version)] = 0
                                     if hasattr(version,"name"):
                                         if self.operator.startswith("video") and not regex.search(video_formats,version.name,regex.I):
                                             continue
@@ -1171,17 +1451,18 @@ class sort:
                                                 continue
                                             if file.size >= float(self.value):
                                                 release.file_size_sorting = 1
-                                                version.file_size_sorting = 1
-                                release.files.sort(key=lambda s: s.file_size_sorting, reverse=True)
+                                                score[id(version)] = 1
+                                release.files.sort(key=lambda s: score[id(s)], reverse=True)
                             scraped_releases.sort(key=lambda s: s.file_size_sorting, reverse=True)
                             return scraped_releases
                         elif "<=" in self.operator:
+                            score = {}
                             for release in scraped_releases:
                                 release.file_size_sorting = 0
                                 if not hasattr(release,"files"):
                                     continue
                                 for version in release.files:
-                                    version.file_size_sorting = 0
+                                    score[id(version)] = 0
                                     if hasattr(version,"name"):
                                         if self.operator.startswith("video") and not regex.search(video_formats,version.name,regex.I):
                                             continue
@@ -1193,8 +1474,8 @@ class sort:
                                                 continue
                                             if file.size <= float(self.value):
                                                 release.file_size_sorting = 1
-                                                version.file_size_sorting = 1
-                                release.files.sort(key=lambda s: s.file_size_sorting, reverse=True)
+                                                score[id(version)] = 1
+                                release.files.sort(key=lambda s: score[id(s)], reverse=True)
                             scraped_releases.sort(key=lambda s: s.file_size_sorting, reverse=True)
                             return scraped_releases
                     return scraped_releases
@@ -1585,20 +1866,236 @@ class sort:
     ]
     always_on_rules = [version.rule("wanted", "preference", "highest", ""),version.rule("unwanted", "preference", "lowest", "")]
 
-    def __new__(self, scraped_releases: list, version: version, doprint=True, element=None):
-        if len(scraped_releases) > 0:
-            for rule in reversed(sort.always_on_rules):
-                rule.apply(scraped_releases, element=element)
-            for rule in reversed(version.rules):
+    compiled = {}
+
+    class step:
+        # a compiled rule. kind is one of:
+        # "filter" (keep releases where function is true), "key" (stable sort by function),
+        # "top" (keep the releases with the highest/lowest function value), "exclude" (title/source exclude,
+        # depends on the media element), "rule" (call the rules own apply), "undefined" or "noop"
+        def __init__(self, kind, rule=None, function=None, reverse=False, pattern=None):
+            self.kind = kind
+            self.rule = rule
+            self.function = function
+            self.reverse = reverse
+            self.pattern = pattern
+
+    def compile_rule(rule):
+        if isinstance(rule, list):
+            return sort.step("undefined")
+        attribute, weight, operator, value = rule.attribute, rule.weight, rule.operator, rule.value
+        apply = type(rule).apply
+        if apply is sort.version.cache_status.apply:
+            if weight == "requirement":
+                if operator == "cached":
+                    return sort.step("filter", rule, lambda r: not len(getattr(r, attribute)) == 0)
+                if operator == "uncached":
+                    return sort.step("filter", rule, lambda r: not len(getattr(r, attribute)) > 0)
+            elif weight == "preference":
+                if operator == "cached":
+                    return sort.step("key", rule, lambda r: len(getattr(r, attribute)), True)
+                if operator == "uncached":
+                    return sort.step("key", rule, lambda r: len(getattr(r, attribute)), False)
+            return sort.step("noop", rule)
+        if not apply in [sort.version.rule.apply, sort.version.size.apply]:
+            return sort.step("rule", rule)
+        if not weight in ["requirement", "preference"]:
+            return sort.step("noop", rule)
+        if operator in ["highest", "lowest"]:
+            if apply is sort.version.size.apply:
+                number = lambda r: 5 * round(float(getattr(r, attribute)) / 5)
+            else:
+                number = lambda r: float(getattr(r, attribute))
+            return sort.step("top" if weight == "requirement" else "key", rule, number, operator == "highest")
+        if operator in ["include", "exclude"]:
+            if apply is sort.version.size.apply:
+                return sort.step("noop", rule)
+            try:
+                pattern = regex.compile(value, regex.I)
+            except Exception:
+                # let the rule report its own error
+                return sort.step("rule", rule)
+            if operator == "exclude":
+                return sort.step("exclude", rule, pattern=pattern)
+            if weight == "requirement":
+                return sort.step("filter", rule, lambda r: bool(pattern.search(getattr(r, attribute))))
+            return sort.step("key", rule, lambda r: bool(pattern.search(getattr(r, attribute))), True)
+        if operator == "==":
+            if weight == "requirement":
+                return sort.step("filter", rule, lambda r: getattr(r, attribute) == value)
+            return sort.step("key", rule, lambda r: (getattr(r, attribute) == value), True)
+        if operator == ">=":
+            if weight == "requirement":
+                return sort.step("filter", rule, lambda r: float(getattr(r, attribute)) >= float(value))
+            return sort.step("key", rule, lambda r: (float(getattr(r, attribute)) >= float(value)), True)
+        if operator == "<=":
+            if weight == "requirement":
+                return sort.step("filter", rule, lambda r: float(getattr(r, attribute)) <= float(value))
+            return sort.step("key", rule, lambda r: (float(getattr(r, attribute)) <= float(value)), True)
+        return sort.step("noop", rule)
+
+    def compile(rules):
+        # version rules are compiled once and applied in reverse order
+        key = json.dumps(rules, default=str)
+        if not key in sort.compiled:
+            steps = []
+            for rule in reversed(rules):
                 for subrule in sort.version.rule.__subclasses__():
                     if subrule.name == rule[0]:
                         rule = subrule(rule[0], rule[1], rule[2], rule[3])
                         break
+                steps += [sort.compile_rule(rule)]
+            if len(sort.compiled) > 64:
+                sort.compiled.clear()
+            sort.compiled[key] = steps
+        return sort.compiled[key]
+
+    def skip_exclude(rule, element):
+        # title excludes that match "complete" are not applied to movies with "complete" in their title
+        if not (rule.attribute == "title" and rule.operator == "exclude" and element is not None and getattr(element, "type", None) == "movie"):
+            return False
+        try:
+            media_title = getattr(element, "title", "") or ""
+            media_has_complete = bool(regex.search(r"\bcomplete\b", media_title, regex.I))
+            pattern_matches_complete = False
+            if rule.value is not None:
                 try:
-                    scraped_releases = rule.apply(scraped_releases, element=element)
-                except:
-                    ui_print('error: there seems to be an undefined rule in your version settings. skipping this rule.')
+                    pattern_matches_complete = bool(regex.search(rule.value, "complete", regex.I))
+                except Exception:
+                    pattern_matches_complete = "complete" in str(rule.value).lower()
+            return media_has_complete and pattern_matches_complete
+        except Exception:
+            return False
+
+    def unique(scraped_releases):
+        # list.remove() in the rules removes the first *equal* release, so only lists without
+        # equal releases can be filtered by identity
+        titles = set()
+        hashes = set()
+        for item in scraped_releases:
+            if not type(item) is release:
+                return False
+            if item.title in titles:
+                return False
+            titles.add(item.title)
+            if item.type == 'torrent' and getattr(item, 'hash', ''):
+                if item.hash.lower() in hashes:
+                    return False
+                hashes.add(item.hash.lower())
+        return True
+
+    def run(steps, scraped_releases, element=None):
+        items = scraped_releases[:]
+        keys = []
+        filters = []
+
+        def order():
+            # apply all pending stable sorts at once: the sort applied last is the primary key
+            if len(keys) > 0:
+                composite = list(reversed(keys))
+                items.sort(key=lambda r: tuple(-values[id(r)] if reverse else values[id(r)] for values, reverse in composite))
+                keys.clear()
+
+        def legacy(rule):
+            order()
+            scraped_releases[:] = items
+            rule.apply(scraped_releases, element=element)
+            items[:] = scraped_releases
+
+        def flush():
+            # apply all pending filters in a single pass, in the order the rules are applied
+            if len(filters) == 0:
+                return
+            pending = filters[:]
+            filters.clear()
+            try:
+                items[:] = [r for r in items if all(function(r) for function, rule in pending)]
+            except Exception:
+                # a filter failed on some release, replay the rules one by one so it fails like it always did
+                for function, rule in pending:
+                    try:
+                        kept = [r for r in items if function(r)]
+                    except Exception:
+                        legacy(rule)
+                        continue
+                    items[:] = kept
+
+        for step in steps:
+            function = step.function
+            if step.kind == "noop":
+                continue
+            if step.kind == "exclude":
+                skip = sort.skip_exclude(step.rule, element)
+                pattern, attribute = step.pattern, step.rule.attribute
+                if step.rule.weight == "requirement":
+                    if skip:
+                        function = lambda r, pattern=pattern, attribute=attribute: pattern.search(getattr(r, attribute)) is None or True
+                    else:
+                        function = lambda r, pattern=pattern, attribute=attribute: not bool(pattern.search(getattr(r, attribute)))
+                else:
+                    def function(r):
+                        try:
+                            match = bool(pattern.search(getattr(r, attribute)))
+                        except Exception:
+                            return False
+                        return match and not skip
+                    flush()
+                    keys.append(({id(r): function(r) for r in items}, False))
                     continue
+            if step.kind in ["filter", "exclude"]:
+                filters.append((function, step.rule))
+                continue
+            flush()
+            if step.kind == "undefined":
+                ui_print('error: there seems to be an undefined rule in your version settings. skipping this rule.')
+                continue
+            if step.kind == "rule":
+                legacy(step.rule)
+                continue
+            try:
+                values = {id(r): function(r) for r in items}
+                if step.kind == "top" and step.reverse and type(step.rule).apply is sort.version.size.apply:
+                    # the size rule compares against the first release with a slightly different expression
+                    for r in items:
+                        if not type(getattr(r, step.rule.attribute)) in [int, float]:
+                            raise TypeError
+            except Exception:
+                legacy(step.rule)
+                continue
+            if step.kind == "key":
+                keys.append((values, step.reverse))
+            elif len(items) > 0:
+                extreme = max(values.values()) if step.reverse else min(values.values())
+                items[:] = [r for r in items if values[id(r)] == extreme]
+        flush()
+        order()
+        scraped_releases[:] = items
+        return scraped_releases
+
+    def legacy(scraped_releases: list, version: version, element=None):
+        for rule in reversed(sort.always_on_rules):
+            rule.apply(scraped_releases, element=element)
+        for rule in reversed(version.rules):
+            for subrule in sort.version.rule.__subclasses__():
+                if subrule.name == rule[0]:
+                    rule = subrule(rule[0], rule[1], rule[2], rule[3])
+                    break
+            try:
+                scraped_releases = rule.apply(scraped_releases, element=element)
+            except:
+                ui_print('error: there seems to be an undefined rule in your version settings. skipping this rule.')
+                continue
+        return scraped_releases
+
+    def __new__(self, scraped_releases: list, version: version, doprint=True, element=None):
+        if len(scraped_releases) > 0:
+            if not sort.unique(scraped_releases):
+                sort.legacy(scraped_releases, version, element=element)
+            else:
+                if not "always" in sort.compiled:
+                    sort.compiled["always"] = [sort.compile_rule(rule) for rule in reversed(sort.always_on_rules)]
+                sort.run(sort.compiled["always"], scraped_releases, element=element)
+                sort.run(sort.compile(version.rules), scraped_releases, element=element)
             if doprint:
                 ui_print('sorting releases for version [' + version.name + '] ... done - found ' + str(len(scraped_releases)) + ' releases')
         return scraped_releases
@@ -1705,15 +2202,85 @@ class torrent2magnet:
         torrent2magnet.encode_func[type(x)](x, r)
         return b"".join(r)
 
+    def skip(x, f):
+        # returns the offset right after the bencoded value at f, strings are jumped over without being read
+        depth = 0
+        while True:
+            c = x[f]
+            if c == 100 or c == 108:
+                depth += 1
+                f += 1
+                continue
+            if c == 101:
+                depth -= 1
+                f += 1
+            elif c == 105:
+                f = x.index(b"e", f) + 1
+            elif 48 <= c <= 57:
+                colon = x.index(b":", f)
+                f = colon + 1 + int(x[f:colon])
+            else:
+                raise torrent2magnet.BTFailure("not a valid bencoded string")
+            if depth <= 0:
+                if depth < 0 or f > len(x):
+                    raise torrent2magnet.BTFailure("not a valid bencoded string")
+                return f
+
+    def fields(x, f=0):
+        """Maps the keys of the bencoded dict at f to the (start, end) byte span of their values."""
+        if x[f] != 100:
+            raise torrent2magnet.BTFailure("not a bencoded dict")
+        spans = {}
+        f += 1
+        while x[f] != 101:
+            colon = x.index(b":", f)
+            start = colon + 1 + int(x[f:colon])
+            end = torrent2magnet.skip(x, start)
+            spans[x[colon + 1:start]] = (start, end)
+            f = end
+        return spans
+
+    def value(x, span):
+        return torrent2magnet.decode_func[x[span[0]]](x, span[0])[0]
+
+    def info(x):
+        spans = torrent2magnet.fields(x)
+        if torrent2magnet.skip(x, 0) != len(x):
+            raise torrent2magnet.BTFailure("invalid bencoded value (data after valid prefix)")
+        if not b'info' in spans:
+            raise torrent2magnet.BTFailure("no info dict")
+        return spans
+
+    def infohash(x):
+        # the info dict is hashed exactly as it appears in the file, the pieces blob is never copied
+        start, end = torrent2magnet.info(x)[b'info']
+        return hashlib.sha1(memoryview(x)[start:end]).hexdigest()
+
+    def files(x):
+        """Lazily yields (path, size) for every file of the torrent, without decoding the pieces."""
+        spans = torrent2magnet.info(x)
+        info = torrent2magnet.fields(x, spans[b'info'][0])
+        name = torrent2magnet.value(x, info[b'name']).decode('utf-8', 'ignore') if b'name' in info else ""
+        if not b'files' in info:
+            yield name, torrent2magnet.value(x, info[b'length']) if b'length' in info else 0
+            return
+        f = info[b'files'][0] + 1
+        while x[f] != 101:
+            end = torrent2magnet.skip(x, f)
+            file_ = torrent2magnet.value(x, (f, end))
+            path = [part.decode('utf-8', 'ignore') for part in file_.get(b'path', [])]
+            yield '/'.join([name] + path), file_.get(b'length', 0)
+            f = end
+
     def __new__(cls, x):
-        metadata = torrent2magnet.bdecode(x)
-        subj = metadata[b'info']
-        hashcontents = torrent2magnet.bencode(subj)
-        digest = hashlib.sha1(hashcontents).hexdigest()
+        spans = torrent2magnet.info(x)
+        start, end = spans[b'info']
+        digest = hashlib.sha1(memoryview(x)[start:end]).hexdigest()
+        info = torrent2magnet.fields(x, start)
         return 'magnet:?' \
                 + 'xt=urn:btih:' + digest \
-                + '&dn=' + metadata[b'info'][b'name'].decode() \
-                + '&tr=' + metadata[b'announce'].decode() 
+                + '&dn=' + torrent2magnet.value(x, info[b'name']).decode() \
+                + '&tr=' + torrent2magnet.value(x, spans[b'announce']).decode()
 
 def print_releases(scraped_releases,uiprint=False):
     longest_file = 0
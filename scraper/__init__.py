@@ -5,7 +5,163 @@ import inspect
 #import child modules
 from scraper import services
 
-def scrape(query, altquery="(.*)", required_seasons=None, ids=None):
+workers = "16"
+source_concurrency = "2"
+deadline = "120"
+cache_ttl = "0"
+cache_negative_ttl = "0.5"
+cache_size = "5000"
+
+class pool:
+    """Long-lived worker pool shared by every scrape, with a concurrency cap per source.
+
+    Scrapes wait in a queue per source until one of the source's slots is free, so a slow source
+    never ties up workers that other sources could use.
+    """
+
+    executor = None
+    size = 0
+    queues = {}
+    running = {}
+    lock = threading.Lock()
+
+    def get():
+        with pool.lock:
+            try:
+                size = max(1, int(float(workers)))
+            except:
+                size = 16
+            if pool.executor == None or pool.size != size:
+                if pool.executor != None:
+                    pool.executor.shutdown(wait=False)
+                pool.executor = concurrent.futures.ThreadPoolExecutor(max_workers=size, thread_name_prefix="scraper")
+                pool.size = size
+            return pool.executor
+
+    def limit():
+        try:
+            return max(1, int(float(source_concurrency)))
+        except:
+            return 2
+
+    def submit(name, fn, *args):
+        future = concurrent.futures.Future()
+        with pool.lock:
+            if not name in pool.queues:
+                pool.queues[name] = collections.deque()
+            pool.queues[name].append((future, fn, args))
+        pool.dispatch(name)
+        return future
+
+    def dispatch(name):
+        # hands queued scrapes of this source to the executor while the source has free slots
+        while True:
+            with pool.lock:
+                if pool.running.get(name, 0) >= pool.limit() or len(pool.queues[name]) == 0:
+                    return
+                future, fn, args = pool.queues[name].popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                pool.running[name] = pool.running.get(name, 0) + 1
+            pool.get().submit(pool.run, name, future, fn, args)
+
+    def run(name, future, fn, args):
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with pool.lock:
+                pool.running[name] -= 1
+            pool.dispatch(name)
+
+class answer:
+    """Lets a source mark the answer it is working on as incomplete, e.g. when it ran into a deadline.
+
+    Incomplete answers are never cached. The mark belongs to the thread the source is scraping on.
+    """
+
+    local = threading.local()
+
+    def start():
+        answer.local.incomplete = False
+
+    def incomplete():
+        answer.local.incomplete = True
+
+    def complete():
+        return not getattr(answer.local, "incomplete", False)
+
+class cache:
+    """Persistent LRU cache of scrape results per source, query and altquery.
+
+    The cache is off unless cache_ttl (or the source's own cache_ttl attribute) is set. Results are
+    kept for cache_ttl hours. Empty results are kept for cache_negative_ttl hours, doubling with every
+    consecutive empty result, up to cache_ttl. Incomplete answers and answers with failed requests
+    are never cached, and an empty answer is only cached if the source was actually reached. The
+    cache lives in the state store, only changed entries are written.
+    """
+
+    entries = collections.OrderedDict()
+    loaded = False
+    lock = threading.Lock()
+
+    def key(cls, query, altquery, required_seasons=None, ids=None):
+        return json.dumps([cls.name, query, altquery, required_seasons, ids], sort_keys=True, default=str)
+
+    def load():
+        if cache.loaded:
+            return
+        cache.loaded = True
+        entries = store.load("scraper", "results")
+        if isinstance(entries, dict):
+            for key, entry in sorted(entries.items(), key=lambda item: item[1]["used"]):
+                cache.entries[key] = entry
+
+    def hours(value, default):
+        try:
+            return float(value) * 3600
+        except:
+            return default * 3600
+
+    def enabled(cls):
+        return cache.hours(getattr(cls, "cache_ttl", cache_ttl), 0) > 0
+
+    def get(key):
+        with cache.lock:
+            cache.load()
+            if not key in cache.entries:
+                return None
+            entry = cache.entries[key]
+            if time.time() - entry["time"] > entry["ttl"]:
+                return None
+            entry["used"] = time.time()
+            cache.entries.move_to_end(key)
+            return releases.copies(entry["releases"])
+
+    def put(cls, key, releases_):
+        with cache.lock:
+            cache.load()
+            now = time.time()
+            ttl = cache.hours(getattr(cls, "cache_ttl", cache_ttl), 0)
+            fails = 0
+            if len(releases_) == 0:
+                if key in cache.entries and len(cache.entries[key]["releases"]) == 0:
+                    fails = cache.entries[key]["fails"]
+                fails += 1
+                ttl = min(ttl, cache.hours(cache_negative_ttl, 0.5) * 2 ** (fails - 1))
+            cache.entries[key] = {"releases": releases.copies(releases_), "time": now, "used": now, "ttl": ttl, "fails": fails}
+            cache.entries.move_to_end(key)
+            removed = []
+            try:
+                size = max(0, int(float(cache_size)))
+            except:
+                size = 5000
+            while len(cache.entries) > size:
+                removed += [cache.entries.popitem(last=False)[0]]
+            store.update({key: cache.entries[key]} if key in cache.entries else {}, "scraper", "results", removed=removed)
+
+def scrape(query, altquery="(.*)", required_seasons=None, ids=None, stop=None):
     """
     Scrape for releases.
     
@@ -14,12 +170,31 @@ def scrape(query, altquery="(.*)", required_seasons=None, ids=None):
         altquery: Alternative query pattern for filtering
         required_seasons: Optional list of season numbers for early-stop optimization (prowlarr only)
         ids: Optional dict of ids (imdb/tmdb/tvdb) for exact match filtering
+        stop: Optional callable, receives the releases found so far and returns True once no more sources need to be awaited
+    """
+    scraped_releases = []
+    batches = stream(query, altquery, required_seasons, ids)
+    for batch in batches:
+        scraped_releases += batch
+        if stop != None and stop(scraped_releases):
+            # closing the stream cancels the sources that are still running
+            batches.close()
+            ui_print('done - early stop after ' + str(len(scraped_releases)) + ' releases, remaining sources were cancelled')
+            break
+    return scraped_releases
+
+def stream(query, altquery="(.*)", required_seasons=None, ids=None):
+    """
+    Scrape for releases, yielding each source's new releases as soon as it answers.
+
+    Releases are consolidated by hash on the fly: a torrent that was already yielded by another
+    source is merged into the earlier release object instead of being yielded again.
+    Closing the generator cancels all sources that are still running.
     """
     ui_print('done')
     scrapers = services.sequential()
     if len(scrapers) == 0:
         scrapers = [services.get()]
-    scraped_releases = []
     for sequence in scrapers:
         servicenames = "[" + ",".join(x.name for x in sequence) + "]"
         if regex.search(r'(tt[0-9]+)', query, regex.I):
@@ -28,48 +203,64 @@ def scrape(query, altquery="(.*)", required_seasons=None, ids=None):
             ui_print('scraping sources '+servicenames+' for query "' + query + '" ...')
         ui_print('accepting titles that regex match "' + altquery + '" ...', debug=ui_settings.debug)
         results = [None] * len(sequence)
-        threads = []
+        cancelled = threading.Event()
+        futures = {}
         for index, scraper_ in enumerate(sequence):
-            t = Thread(
-                target=multi_scrape,
-                args=(scraper_, query, altquery, results, index, required_seasons, ids),
-            )
-            threads.append(t)
-            try:
-                t.start()
-            except:
-                ui_print("error starting new thread (perhaps maximum number of threads reached), will retry in 5 seconds and exit if it fails again.")
-                time.sleep(5)
-                t.start()
-        # wait for the threads to complete
-        for t in threads:
-            t.join()
-        for result in results:
-            if not result == [] and not result == None:
-                scraped_releases += result
-        # consolidate duplicate torrent releases by identical hash across sources
-        consolidated = []
+            # cached answers dont wait for a slot of their source
+            if cache.enabled(scraper_):
+                results[index] = cache.get(cache.key(scraper_, query, altquery, required_seasons, ids))
+            if results[index] != None:
+                ui_print('[' + scraper_.name + '] using cached results (' + str(len(results[index])) + ' releases)', debug=ui_settings.debug)
+                future = concurrent.futures.Future()
+                future.set_result(None)
+            else:
+                future = pool.submit(scraper_.name, multi_scrape, scraper_, query, altquery, results, index, required_seasons, ids, cancelled)
+            futures[future] = index
+        try:
+            timeout = float(deadline)
+        except:
+            timeout = None
+        started = time.time()
+        pending = set(futures)
+        found = 0
         index_by_hash = {}
-        for rel in scraped_releases:
-            try:
-                if getattr(rel, 'type', None) == 'torrent' and getattr(rel, 'hash', ''):
-                    key = rel.hash.lower()
-                    if key in index_by_hash:
-                        consolidated[index_by_hash[key]].merge(rel)
-                    else:
-                        index_by_hash[key] = len(consolidated)
-                        consolidated.append(rel)
-                else:
-                    consolidated.append(rel)
-            except:
-                consolidated.append(rel)
-        scraped_releases = consolidated
-        for release in scraped_releases:
-            release.title = ''.join([i if ord(i) < 512 else '' for i in release.title])
-        ui_print('done - found ' + str(len(scraped_releases)) + ' releases')
-        if len(scraped_releases) > 0:
-            break
-    return scraped_releases
+        try:
+            while len(pending) > 0:
+                remaining = None if timeout == None else timeout - (time.time() - started)
+                if remaining != None and remaining <= 0:
+                    ui_print('deadline of ' + str(deadline) + 's reached, skipping sources: [' + ",".join(sequence[futures[future]].name for future in pending) + ']', debug=ui_settings.debug)
+                    break
+                done, pending = concurrent.futures.wait(pending, timeout=remaining, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    result = results[futures[future]]
+                    if result == [] or result == None:
+                        continue
+                    # consolidate duplicate torrent releases by identical hash across sources
+                    new = []
+                    for rel in result:
+                        try:
+                            if getattr(rel, 'type', None) == 'torrent' and getattr(rel, 'hash', ''):
+                                key = rel.hash.lower()
+                                if key in index_by_hash:
+                                    index_by_hash[key].merge(rel)
+                                    continue
+                                index_by_hash[key] = rel
+                        except:
+                            pass
+                        rel.title = ''.join([i if ord(i) < 512 else '' for i in rel.title])
+                        new.append(rel)
+                    found += len(new)
+                    if len(new) > 0:
+                        yield new
+        finally:
+            # dont hold back the sequence for slow sources, their late results are discarded
+            if len(pending) > 0:
+                cancelled.set()
+                for future in pending:
+                    future.cancel()
+        ui_print('done - found ' + str(found) + ' releases')
+        if found > 0:
+            return
 
 def traditional():
     scrapers = services.sequential()
@@ -82,7 +273,11 @@ def traditional():
     return False
 
 # Multiprocessing scrape method
-def multi_scrape(cls, query, altquery, result, index, required_seasons=None, ids=None):
+def multi_scrape(cls, query, altquery, result, index, required_seasons=None, ids=None, cancelled=None):
+    if cancelled != None and cancelled.is_set():
+        return
+    answered, failed = http_hosts.outcomes()
+    answer.start()
     # Check if this scraper's scrape() function accepts optional parameters
     try:
         sig = inspect.signature(cls.scrape)
@@ -97,4 +292,16 @@ def multi_scrape(cls, query, altquery, result, index, required_seasons=None, ids
             result[index] = cls.scrape(query, altquery)
     except Exception:
         # Fallback: call without required_seasons
-        result[index] = cls.scrape(query, altquery)
+        try:
+            result[index] = cls.scrape(query, altquery)
+        except Exception as e:
+            ui_print('[' + cls.name + '] error: scraping failed: ' + str(e), debug=ui_settings.debug)
+            return
+    if not isinstance(result[index], list) or not cache.enabled(cls):
+        return
+    # the sources swallow their request errors, so an answer only counts if none of its requests failed,
+    # and an empty answer only if the source was reached at all
+    answered_, failed_ = http_hosts.outcomes()
+    if not answer.complete() or failed_ > failed or (len(result[index]) == 0 and answered_ == answered):
+        return
+    cache.put(cls, cache.key(cls, query, altquery, required_seasons, ids), result[index])
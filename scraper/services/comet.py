@@ -25,7 +25,7 @@ def request(func, *args):
         return []
 
     try:
-        json_response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        json_response = decode(response.content)
     except Exception as e:
         if hasattr(response, "content"):
             ui_print('[comet] error: unable to parse response:' + response.content.decode("utf-8"))
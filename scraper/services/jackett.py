@@ -8,7 +8,7 @@ api_key = ""
 name = "jackett"
 resolver_timeout = '1'
 filter = "!status:failing,test:passed"
-session = requests.Session()
+session = pooled_session()
 
 def setup(cls, new=False):
     from settings import settings_list
@@ -75,7 +75,7 @@ def scrape(query, altquery):
                 ui_print('[jackett] error '+str(response.status_code)+': it seems jackett is reachable, but jackett returned an internal error.')
             return []
         try:
-            response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+            response = decode(response.content)
         except:
             ui_print('[jackett] error: jackett didnt return any data.')
             return []
@@ -29,7 +29,7 @@ def request(func, *args):
     try:
         if not hasattr(response, "content") or len(response.content) == 0:
             return []
-        json_response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        json_response = decode(response.content)
     except Exception as e:
         ui_print('[mediafusion] error: unable to parse response:' + response.content.decode("utf-8") + " " + str(e))
         return []
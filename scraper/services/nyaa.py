@@ -4,7 +4,7 @@ from ui.ui_print import *
 import releases
 
 name = "nyaa"
-session = requests.Session()
+session = pooled_session()
 params = "&c=1_0&s=seeders&o=desc"
 proxy = 'nyaa.si'
 proxies = ["nyaa.sbs", "nya.iss.one",]
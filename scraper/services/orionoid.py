@@ -16,8 +16,7 @@ session = custom_session()
 def get(url):
     try:
         response = session.get(url, timeout=60)
-        response = json.loads(
-            response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
         return response
     except:
         return None
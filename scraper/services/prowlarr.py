@@ -7,7 +7,7 @@ import releases
 base_url = "http://127.0.0.1:9696"
 api_key = ""
 name = "prowlarr"
-session = requests.Session()
+session = pooled_session()
 max_results = 250
 category_filter_ids = [2000, 5000]
 resolver_timeout = 30
@@ -15,27 +15,24 @@ max_resolve = 50
 resolver_concurrency = 10
 resolver_retries = 1
 resolver_retry_delay = 1
+resolver_cache_size = 5000
+resolver_indexer_concurrency = 3
+resolver_deadline = 45
 
 # Optimization settings
 filter_low_quality = True  # Filter out 720p and below before resolving
 
-# Global rate limiter: prevent API bursts that trigger 429 on indexers like C411
+# Search rate limiter: prevent API bursts that trigger 429 on indexers like C411.
+# Kept apart from the host budget, so that resolving download links is not slowed down.
 _RATE_LIMIT_DELAY = 5  # seconds between consecutive Prowlarr API requests
-_last_request_time = 0
-_rate_limit_lock = Lock()
+_search_bucket = token_bucket(1.0 / _RATE_LIMIT_DELAY)
 
 def _rate_limited_get(url, headers, params, timeout):
     """Wrapper around session.get that enforces a minimum delay between API calls."""
-    global _last_request_time
-    with _rate_limit_lock:
-        now = time.time()
-        elapsed = now - _last_request_time
-        if elapsed < _RATE_LIMIT_DELAY:
-            wait = _RATE_LIMIT_DELAY - elapsed
-            _debug(f'[prowlarr][rate-limit] waiting {wait:.1f}s before next API call')
-            time.sleep(wait)
-        _last_request_time = time.time()
-        return session.get(url, headers=headers, params=params, timeout=timeout)
+    wait = _search_bucket.acquire()
+    if wait > 0:
+        _debug(f'[prowlarr][rate-limit] waited {wait:.1f}s before next API call')
+    return session.get(url, headers=headers, params=params, timeout=timeout)
 
 # Fallback negative cache: avoid spamming indexers when episode isn't available yet
 # Key: base_title (e.g. "pitt"), Value: {"ts": timestamp, "fails": consecutive_fail_count}
@@ -97,6 +94,73 @@ _ALLOWED_EXTRAS = {
 def _debug(msg):
     ui_print(msg, ui_settings.debug)
 
+class category(record):
+    __slots__ = ("id", "name")
+
+class search_result(record):
+    __slots__ = ("guid", "title", "size", "seeders", "protocol", "indexer", "indexerId", "downloadUrl", "magnetUrl",
+                 "infoUrl", "infoHash", "categories", "imdbId", "tmdbId", "tvdbId")
+    nested = {"categories": category}
+
+decoder = json_decoder(root=search_result)
+
+class resolved:
+    """Persistent LRU cache of resolved download links per indexer and guid (or infoUrl).
+
+    Entries keep the magnet and its infohash. Only links that resolved to a magnet are kept, at most
+    resolver_cache_size of them: releases that came as a .torrent file need the file itself for uploads
+    to debrid services (private trackers), so they are resolved again every time. The cache lives in
+    the state store, only changed entries are written.
+    """
+
+    entries = collections.OrderedDict()
+    loaded = False
+    lock = threading.Lock()
+
+    def key(result):
+        indexer = getattr(result, 'indexerId', None)
+        if indexer is None:
+            indexer = getattr(result, 'indexer', None)
+        guid = getattr(result, 'guid', None) or getattr(result, 'infoUrl', None)
+        if indexer is None or not guid:
+            return None
+        return str(indexer) + ":" + str(guid)
+
+    def load():
+        if resolved.loaded:
+            return
+        resolved.loaded = True
+        entries = store.load("prowlarr", "resolved")
+        if isinstance(entries, dict):
+            for key, entry in sorted(entries.items(), key=lambda item: item[1]["time"]):
+                # entries of the first version of the cache may stem from a .torrent file
+                if "files" in entry:
+                    continue
+                resolved.entries[key] = entry
+
+    def get(key):
+        if key is None:
+            return None
+        with resolved.lock:
+            resolved.load()
+            if not key in resolved.entries:
+                return None
+            resolved.entries.move_to_end(key)
+            return resolved.entries[key]
+
+    def put(key, magnet):
+        if key is None or not magnet:
+            return
+        match = regex.search(r'(?<=btih:)[a-z0-9]+', magnet, regex.I)
+        with resolved.lock:
+            resolved.load()
+            resolved.entries[key] = {"magnet": magnet, "hash": match.group(0).lower() if match else None, "time": time.time()}
+            resolved.entries.move_to_end(key)
+            removed = []
+            while len(resolved.entries) > max(0, resolver_cache_size):
+                removed += [resolved.entries.popitem(last=False)[0]]
+            store.update({key: resolved.entries[key]} if key in resolved.entries else {}, "prowlarr", "resolved", removed=removed)
+
 def _id_to_int(value):
     if value is None:
         return None
@@ -285,25 +349,11 @@ def _matches_target_ids(result, target_ids):
 
 def _is_low_quality(title):
     """Check if release is 720p or lower quality (to filter out before resolving)."""
-    # Match 720p, 480p, 360p, etc. but NOT 1080p, 2160p, 4K
-    if regex.search(r'(?<![0-9])720p', title, regex.I):
-        return True
-    if regex.search(r'(?<![0-9])(480|360|240)p', title, regex.I):
-        return True
-    if regex.search(r'(?i)\b(DVDRip|DVDScr|HDTV|PDTV|TVRip|CAM|TS|TC|R5)\b', title) and not regex.search(r'(?i)(1080|2160|4K)', title):
-        return True
-    return False
+    return releases.parse(title).low_quality
 
 def _is_season_pack(title):
     """Check if release is a season pack (S01, S02) vs individual episode (S01E01)."""
-    # Season pack: has S01, S02, etc. but NOT S01E01, S02E03, etc.
-    if regex.search(r'\b(complete|integrale)\b', title, regex.I):
-        return True
-    if regex.search(r'\bS\d{1,2}\W*S?\d{1,2}\b', title, regex.I):
-        return True
-    has_season = regex.search(r'\.S\d{1,2}\.', title, regex.I) or regex.search(r'\.S\d{1,2}$', title, regex.I)
-    has_episode = regex.search(r'\.S\d{1,2}E\d{1,2}', title, regex.I)
-    return has_season and not has_episode
+    return releases.parse(title).pack
 
 def _sort_packs_first(results):
     """Sort results to put season packs first, individual episodes last."""
@@ -312,16 +362,7 @@ def _sort_packs_first(results):
 
 def _extract_season_numbers(title):
     """Extract season number(s) from a release title. Returns a set of integers."""
-    seasons = set()
-    # Match S01, S02, etc. (single season packs)
-    single_match = regex.search(r'\.S(\d{1,2})\.', title, regex.I)
-    if single_match:
-        seasons.add(int(single_match.group(1)))
-    # Match S01-S04, S01.S02.S03, etc. (multi-season packs)
-    multi_match = regex.findall(r'S(\d{1,2})', title, regex.I)
-    for m in multi_match:
-        seasons.add(int(m))
-    return seasons
+    return set(releases.parse(title).seasons)
 
 def _get_with_retry(url, allow_redirects, timeout):
     for attempt in range(resolver_retries + 1):
@@ -373,30 +414,21 @@ def _safe_torrent_to_magnet(torrent_bytes):
         return releases.torrent2magnet(torrent_bytes)
     except Exception:
         try:
-            metadata = releases.torrent2magnet.bdecode(torrent_bytes)
-            info = metadata.get(b'info', None)
-            if not info:
-                return None
-            try:
-                digest = hashlib.sha1(releases.torrent2magnet.bencode(info)).hexdigest()
-            except Exception:
-                return None
+            t2m = releases.torrent2magnet
+            spans = t2m.info(torrent_bytes)
+            start, end = spans[b'info']
+            digest = hashlib.sha1(memoryview(torrent_bytes)[start:end]).hexdigest()
+            info = t2m.fields(torrent_bytes, start)
             dn = ""
             try:
-                name = info.get(b'name', b'')
-                if isinstance(name, bytes):
-                    dn = name.decode('utf-8', 'ignore')
-                elif isinstance(name, str):
-                    dn = name
+                if b'name' in info:
+                    dn = t2m.value(torrent_bytes, info[b'name']).decode('utf-8', 'ignore')
             except Exception:
                 dn = ""
             tr = ""
             try:
-                announce = metadata.get(b'announce', b'')
-                if isinstance(announce, bytes):
-                    tr = announce.decode('utf-8', 'ignore')
-                elif isinstance(announce, str):
-                    tr = announce
+                if b'announce' in spans:
+                    tr = t2m.value(torrent_bytes, spans[b'announce']).decode('utf-8', 'ignore')
             except Exception:
                 tr = ""
             magnet = 'magnet:?xt=urn:btih:' + digest
@@ -458,7 +490,7 @@ def scrape(query, altquery, required_seasons=None, ids=None):
         _debug(f'[prowlarr][api] response status={response.status_code} content_length={len(response.content)}')
         if response.status_code == 200:
             try:
-                response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+                response = decoder(response.content)
             except:
                 ui_print('[prowlarr] error: prowlarr didnt return any data.')
                 return []
@@ -608,28 +640,7 @@ def scrape(query, altquery, required_seasons=None, ids=None):
                     response = response[:max_resolve]
                 _debug(f'[prowlarr][optimizer] NO PACKS: resolving up to {len(response)} episodes')
             
-            # Multiprocess resolving of result.Link for remaining releases
-            results = [None] * len(response)
-            threads = []
-            
-            # start thread for each remaining release in batches
-            for index, result in enumerate(response):
-                t = Thread(target=multi_init, args=(resolve, result, results, index))
-                threads.append(t)
-                t.start()
-                
-                if len(threads) >= resolver_concurrency:
-                    for t in threads:
-                        t.join()
-                    threads = []
-            
-            # wait for any remaining threads to complete
-            for t in threads:
-                t.join()
-            
-            for result in results:
-                if not result == [] and not result == None:
-                    scraped_releases += result
+            scraped_releases += resolver.all(response)
         # FALLBACK: if no results and query contains an episode pattern (S##E##),
         # retry with broader queries since some indexers don't support episode-specific
         # text search. Queries use spaces (like the Prowlarr UI) instead of dots.
@@ -689,7 +700,7 @@ def scrape(query, altquery, required_seasons=None, ids=None):
                     if fb_response.status_code != 200:
                         continue
                     try:
-                        fb_results = json.loads(fb_response.content, object_hook=lambda d: SimpleNamespace(**d))
+                        fb_results = decoder(fb_response.content)
                     except:
                         _debug('[prowlarr][fallback] JSON parse failed')
                         continue
@@ -726,21 +737,7 @@ def scrape(query, altquery, required_seasons=None, ids=None):
                     if len(fb_results) > max_resolve:
                         fb_results = fb_results[:max_resolve]
                     _debug(f'[prowlarr][fallback] resolving {len(fb_results)} releases')
-                    fb_resolve_results = [None] * len(fb_results)
-                    threads = []
-                    for index, result in enumerate(fb_results):
-                        t = Thread(target=multi_init, args=(resolve, result, fb_resolve_results, index))
-                        threads.append(t)
-                        t.start()
-                        if len(threads) >= resolver_concurrency:
-                            for t in threads:
-                                t.join()
-                            threads = []
-                    for t in threads:
-                        t.join()
-                    for result in fb_resolve_results:
-                        if not result == [] and not result == None:
-                            scraped_releases += result
+                    scraped_releases += resolver.all(fb_results)
                     _debug(f'[prowlarr][fallback] total scraped after fallback: {len(scraped_releases)}')
                 if len(scraped_releases) > 0:
                     _fallback_record_success(cache_key)
@@ -748,7 +745,117 @@ def scrape(query, altquery, required_seasons=None, ids=None):
                     _fallback_record_fail(cache_key)
     return scraped_releases
 
+class resolver:
+    """Long-lived pool the download links are resolved on.
+
+    Each scrape keeps at most resolver_concurrency links in flight and starts the next one as soon as
+    any finishes, so a slow redirect only holds its own slot. Every indexer gets at most
+    resolver_indexer_concurrency running links across all scrapes; a link takes its indexer slot only
+    once it runs, so links queued in the pool hold nothing. After resolver_deadline seconds a scrape
+    returns whatever was resolved so far and marks its answer as incomplete; links that already run
+    still end up in the resolved cache, links that didnt start yet are cancelled.
+    """
+
+    executor = None
+    size = 0
+    active = {}
+    lock = threading.Lock()
+    # returned by run() when the indexer was taken by another scrape meanwhile
+    busy = object()
+
+    def pool():
+        with resolver.lock:
+            size = max(1, resolver_concurrency)
+            if resolver.executor == None or resolver.size != size:
+                if resolver.executor != None:
+                    resolver.executor.shutdown(wait=False)
+                resolver.executor = concurrent.futures.ThreadPoolExecutor(max_workers=size, thread_name_prefix="prowlarr")
+                resolver.size = size
+            return resolver.executor
+
+    def indexer(result):
+        indexer = getattr(result, 'indexerId', None)
+        if indexer is None:
+            indexer = getattr(result, 'indexer', None)
+        return indexer
+
+    def free(indexer):
+        with resolver.lock:
+            return resolver.active.get(indexer, 0) < max(1, resolver_indexer_concurrency)
+
+    def run(result):
+        indexer = resolver.indexer(result)
+        with resolver.lock:
+            if resolver.active.get(indexer, 0) >= max(1, resolver_indexer_concurrency):
+                return resolver.busy
+            resolver.active[indexer] = resolver.active.get(indexer, 0) + 1
+        try:
+            return resolve(result)
+        finally:
+            with resolver.lock:
+                resolver.active[indexer] -= 1
+
+    def all(results):
+        executor = resolver.pool()
+        deadline = time.time() + resolver_deadline
+        resolved_ = [None] * len(results)
+        waiting = list(enumerate(results))
+        running = {}
+        while len(waiting) > 0 or len(running) > 0:
+            # fill the window in priority order, skipping indexers that are at their limit
+            for item in waiting[:]:
+                if len(running) >= resolver_concurrency:
+                    break
+                if resolver.free(resolver.indexer(item[1])):
+                    waiting.remove(item)
+                    running[executor.submit(resolver.run, item[1])] = item
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            # with links still waiting, check back soon: other scrapes may free an indexer slot
+            timeout = min(remaining, 0.25) if len(waiting) > 0 else remaining
+            if len(running) == 0:
+                time.sleep(timeout)
+                continue
+            done, _ = concurrent.futures.wait(running, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                item = running.pop(future)
+                try:
+                    value = future.result()
+                except Exception:
+                    continue
+                if value is resolver.busy:
+                    # the link waits for its indexer again, at its place in the priority order
+                    bisect.insort(waiting, item)
+                else:
+                    resolved_[item[0]] = value
+        if len(waiting) > 0 or len(running) > 0:
+            for future in running:
+                future.cancel()
+            _debug(f'[prowlarr][resolver] deadline of {resolver_deadline}s reached, returning {len(results) - len(waiting) - len(running)}/{len(results)} resolved links')
+            import scraper
+            scraper.answer.incomplete()
+        scraped_releases = []
+        for result in resolved_:
+            if result:
+                scraped_releases += result
+        return scraped_releases
+
 def resolve(result):
+    key = resolved.key(result)
+    entry = resolved.get(key)
+    if entry != None:
+        _debug('[prowlarr][resolver] cached title=' + getattr(result, 'title', '<unknown>') + ' hash=' + str(entry["hash"]))
+        scraped_releases = []
+        _add_release(scraped_releases, result, entry["magnet"])
+        return scraped_releases
+    scraped_releases = _resolve(result)
+    if scraped_releases and not getattr(scraped_releases[0], 'torrent_bytes', None):
+        release = scraped_releases[0]
+        resolved.put(key, release.download[0] if release.download else None)
+    return scraped_releases
+
+def _resolve(result):
     scraped_releases = []
     try:
         download_url = result.downloadUrl
@@ -841,7 +948,4 @@ def resolve(result):
         ui_print("[prowlarr] error: resolver couldnt get magnet/torrent for release: " + result.title, ui_settings.debug)
         _debug('[prowlarr][resolver] exception=' + type(e).__name__ + ' msg=' + str(e))
         return scraped_releases
-    
-# Multiprocessing watchlist method
-def multi_init(cls, obj, result, index):
-    result[index] = cls(obj)
+
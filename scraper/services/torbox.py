@@ -7,7 +7,7 @@ import urllib.parse
 name = "torbox"
 timeout_sec = 30
 default_cache_timeout = 120  # TTL cache in seconds when querying torbox
-session = requests.Session()
+session = pooled_session()
 
 
 def setup(cls, new=False):
@@ -122,7 +122,7 @@ def torbox_request(func, param, ttl_hash=None):
         return []
 
     try:
-        json_response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        json_response = decode(response.content)
     except Exception as e:
         ui_print('[torbox] error: unable to parse response:' + response.content.decode("utf-8") + " " + str(e))
         return []
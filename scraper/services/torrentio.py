@@ -20,8 +20,7 @@ def get(url):
         ui_print("done", ui_settings.debug)
         if hasattr(response, "status_code") and response.status_code != 200:
             ui_print(f'[torrentio] error {str(response.status_code)}: failed response from torrentio. {response.content.decode("utf-8")}')
-        response = json.loads(
-            response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
         return response
     except Exception as e:
         ui_print('[torrentio] error: ' + str(e))
@@ -3,7 +3,7 @@ import urllib.parse
 import releases
 
 name = "yts"
-session = requests.Session()
+session = pooled_session()
 
 
 def setup(cls, new=False):
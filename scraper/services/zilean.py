@@ -8,7 +8,7 @@ import re
 base_url = "http://zilean.zilean:8181"
 name = "zilean"
 timeout_sec = 10
-session = requests.Session()
+session = pooled_session()
 
 
 def setup(cls, new=False):
@@ -112,7 +112,7 @@ def scrape(query, altquery):
         return []
 
     try:
-        response = json.loads(response.content, object_hook=lambda d: SimpleNamespace(**d))
+        response = decode(response.content)
     except:
         ui_print('[zilean] error: unable to parse response:' + response.content)
         return []
@@ -370,6 +370,9 @@ settings_list = [
             'Please specify a library section number that should be checked for existing content before download: '],
                 content.services.plex.library, 'check', hidden=True, entry="section",
                 help='By default, your entire library (including plex shares) is checked for existing content before a download is started. This setting allows you limit this check to specific library sections. To find a section number, go to "https://app.plex.tv", open your the library you want to include in the check and look for the "source=" parameter in the url.'),
+        setting('Plex library incremental sync', 'Please enter "true" or "false": ', content.services.plex.library, 'incremental', hidden=True, help="Specify wether or not plex_debrid should only request library items that were added or updated since the last check, instead of downloading your entire plex library every time. This is turned off by default. Deletions are only noticed by comparing item counts with your server, so an item that is deleted while another one is added between two checks stays collected until the next full sync."),
+        setting('Plex library full sync interval', 'Please enter a number of hours (e.g 24 or 0.5): ', content.services.plex.library, 'full_sync_interval', hidden=True, help="Specify how many hours plex_debrid should wait between full syncs of your plex library when incremental sync is turned on."),
+        setting('Plex library page size', 'Please enter a number of items (e.g 1000): ', content.services.plex.library, 'page_size', hidden=True, help="Specify how many library items plex_debrid should request from your plex server at once during a full sync. Smaller pages keep the memory use lower on very large libraries."),
         setting('Plex ignore user', '', content.services.plex.library.ignore, 'user', hidden=True),
         setting('Trakt ignore user', '', content.services.trakt.library.ignore, 'user', hidden=True),
         setting('Local ignore list path', 'Please provide a path where the list ignored media items should be saved: ', content.services.textfile.library.ignore, 'path', hidden=True),
@@ -382,6 +385,12 @@ settings_list = [
         setting('Sources', [''], scraper.services, 'active', entry="source", subclass=True, preflight=True),
         setting('Versions', [], releases.sort, 'versions', special=True, entry="version"),
         setting('Special character renaming', ['Please specify a character or string that should be replaced, or provide a regex using {{regex}}: ','Please specify with what character or string it should be replaced: '],releases.rename, 'replaceChars', entry="rule",help='In this setting you can specify a character or a string that should be replaced by nothing, some other character or a string. You can enter regular expressions using {{regex}}.'),
+        setting('Scraper worker threads', 'Please enter the number of threads that may scrape at the same time (default: "16"): ', scraper, 'workers', hidden=True, help="Specify how many scraping requests plex_debrid may run at the same time, across all sources."),
+        setting('Scraper source concurrency', 'Please enter the number of parallel requests per source (default: "2"): ', scraper, 'source_concurrency', hidden=True, help="Specify how many scraping requests may be sent to a single source at the same time."),
+        setting('Scraper deadline', 'Please enter a number of seconds (default: "120"): ', scraper, 'deadline', hidden=True, help="Specify how many seconds plex_debrid should wait for the sources of a scraping sequence, before continuing with the releases that were found so far."),
+        setting('Scraper cache', 'Please enter a number of hours (default: "0"): ', scraper, 'cache_ttl', hidden=True, help="Specify how many hours the results of a scraping source should be reused for the same query, before the source is asked again. Set to 0 to disable the scraper cache, new releases are then found on the next scrape."),
+        setting('Scraper negative cache', 'Please enter a number of hours (default: "0.5"): ', scraper, 'cache_negative_ttl', hidden=True, help="Specify how many hours an empty scraping result should be reused. This time doubles with every consecutive empty result, up to the scraper cache time. Only answers of sources that were actually reached without errors count as empty."),
+        setting('Scraper cache size', 'Please enter the maximum number of cached scraping results (default: "5000"): ', scraper, 'cache_size', hidden=True, help="Specify how many scraping results may be cached. The least recently used results are dropped first."),
         setting('Rarbg API Key', 'The Rarbg API Key gets refreshed automatically, enter the default value: ',scraper.services.rarbg, 'token', hidden=True),
         setting('Jackett Base URL', 'Please specify your Jackett base URL: ', scraper.services.jackett, 'base_url',hidden=True),
         setting('Jackett API Key', 'Please specify your Jackett API Key: ', scraper.services.jackett, 'api_key',hidden=True),
@@ -446,6 +455,10 @@ settings_list = [
                 debrid.services.putio, 'api_key', hidden=True, oauth=True),
         setting('Torbox API Key', 'Please enter your Torbox API Key: ', debrid.services.torbox, 'api_key',
                 hidden=True),
+        setting('Debrid cache', 'Please enter a number of hours (default: "1"): ', debrid, 'cache_ttl', hidden=True, help="Specify how many hours a cached torrent should be remembered as cached by a debrid service, before the service is asked again."),
+        setting('Debrid negative cache', 'Please enter a number of hours (default: "0.25"): ', debrid, 'cache_negative_ttl', hidden=True, help="Specify how many hours an uncached torrent should be remembered as uncached by a debrid service, before the service is asked again."),
+        setting('Debrid concurrency', 'Please enter the number of media items that may use the debrid services at the same time (default: "4"): ', debrid, 'concurrency', hidden=True, help="Specify how many media items may check or download releases on the debrid services at the same time."),
+        setting('Real Debrid parallel probes', 'Please enter the number of releases to add at once (default: "3"): ', debrid.services.realdebrid, 'probes', hidden=True, help="Real Debrid can only tell if a release is cached by adding it. If only cached releases are wanted, this many releases are added at once and the first cached one is kept. Enter 1 to try one release at a time."),
     ]
         ],
     ['UI Settings', [
@@ -453,6 +466,8 @@ settings_list = [
         setting('Debug printing', 'Please enter "true" or "false": ', ui_settings, 'debug'),
         setting('Log to file', 'Please enter "true" or "false": ', ui_settings, 'log'),
         setting('Watchlist loop interval (sec)', 'Please enter an integer value in seconds: ', ui_settings, 'loop_interval_seconds'),
+        setting('Parallel media items', 'Please enter the number of media items to process at the same time (default: "4"): ', ui_settings, 'item_workers', hidden=True, help="Specify how many monitored media items are scraped and downloaded at the same time. Items of the same show are never processed at the same time."),
+        setting('Webhook port', 'Please enter a port to listen for Plex and Overseerr webhooks on, or leave empty to disable: ', ui_settings, 'webhook_port', hidden=True, help="Plex and Overseerr can notify plex_debrid about new library items and new requests. Point them to http://<host>:<port>/plex and http://<host>:<port>/overseerr."),
         setting('version', 'No snooping around! :D This is for compatability reasons.', ui_settings, 'version',
                 hidden=True),
     ]
@@ -1,33 +1,228 @@
-def load(module,variable):
+import threading
+
+connection = None
+# created at import, so threads that race on the first connect() still share one lock
+lock = threading.RLock()
+digests = {}
+
+def connect():
+    from ui.ui_print import ui_print
+    from ui.ui_print import config_dir
+    from base import sqlite3
+    global connection
+    with lock:
+        if connection != None:
+            return connection
+        db = sqlite3.connect(config_dir + '/plex_debrid.db', check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS store (module TEXT NOT NULL, variable TEXT NOT NULL, key TEXT NOT NULL, position INTEGER NOT NULL DEFAULT 0, digest TEXT NOT NULL, value BLOB NOT NULL, imdb TEXT, tmdb TEXT, tvdb TEXT, PRIMARY KEY (module, variable, key)) WITHOUT ROWID")
+        db.execute("CREATE TABLE IF NOT EXISTS variables (module TEXT NOT NULL, variable TEXT NOT NULL, kind TEXT NOT NULL, PRIMARY KEY (module, variable))")
+        db.execute("CREATE INDEX IF NOT EXISTS store_imdb ON store (imdb) WHERE imdb IS NOT NULL")
+        db.execute("CREATE INDEX IF NOT EXISTS store_tmdb ON store (tmdb) WHERE tmdb IS NOT NULL")
+        db.execute("CREATE INDEX IF NOT EXISTS store_tvdb ON store (tvdb) WHERE tvdb IS NOT NULL")
+        connection = db
+        return connection
+
+def ids(value):
+    # pull imdb/tmdb/tvdb ids out of a stored value, so they can be looked up without unpickling
+    found = {'imdb': None, 'tmdb': None, 'tvdb': None}
+    eids = []
+    if isinstance(value, dict):
+        for service in found:
+            if service in value and value[service] not in [None, '']:
+                found[service] = str(value[service])
+        if 'EID' in value:
+            eids = value['EID']
+    elif hasattr(value, 'EID'):
+        eids = value.EID
+    try:
+        for eid in eids:
+            service, _, id = str(eid).partition('://')
+            if service in found and found[service] == None and not id == '':
+                found[service] = id
+    except:
+        pass
+    return found['imdb'], found['tmdb'], found['tvdb']
+
+def entry_key(value):
+    if hasattr(value, 'ratingKey'):
+        return 'ratingKey:' + str(value.ratingKey)
+    if hasattr(value, 'guid'):
+        return 'guid:' + str(value.guid)
+    return None
+
+def keys(cache):
+    # stable per-entry keys: dict keys, or the plex ratingKey/guid of list entries
+    if isinstance(cache, dict):
+        return 'dict', [(str(key), value) for key, value in cache.items()]
+    if isinstance(cache, list):
+        entries = []
+        seen = set()
+        for position, value in enumerate(cache):
+            key = entry_key(value)
+            if key == None or key in seen:
+                key = 'position:' + str(position)
+            seen.add(key)
+            entries += [(key, value)]
+        return 'list', entries
+    return 'value', [('', cache)]
+
+def migrate(module, variable):
     from ui.ui_print import ui_print
-    from ui.ui_print import ui_settings
     from ui.ui_print import config_dir
     from base import pickle
     from base import os
+    filename = config_dir + '/' + module + "_" + variable + '.pkl'
+    if not os.path.exists(filename):
+        return None
+    try:
+        ui_print("["+module+"] migrating cached "+variable+" file ...")
+        with open(filename, 'rb') as f:
+            cache = pickle.load(f)
+        if save(cache, module, variable, verbose=False):
+            os.replace(filename, filename + '.migrated')
+        ui_print("done")
+        return cache
+    except:
+        ui_print("["+module+"] error: couldnt migrate cached "+variable+" file.")
+        return None
+
+def load(module,variable):
+    from ui.ui_print import ui_print
+    from ui.ui_print import ui_settings
+    from base import pickle
     cache = []
     try:
-        filename = config_dir + '/' + module + "_" + variable + '.pkl'
-        if os.path.exists(filename):
-            ui_print("["+module+"] reading cached "+variable+" file ...")
-            with open(filename, 'rb') as f:
-                cache = pickle.load(f)
-            ui_print("done")
+        db = connect()
+        with lock:
+            kind = db.execute("SELECT kind FROM variables WHERE module=? AND variable=?", (module, variable)).fetchone()
+            if kind == None:
+                migrated = migrate(module, variable)
+                return migrated if migrated != None else cache
+            kind = kind[0]
+            ui_print("["+module+"] reading cached "+variable+" ...")
+            rows = db.execute("SELECT key, digest, value FROM store WHERE module=? AND variable=? ORDER BY position", (module, variable)).fetchall()
+        digests[(module, variable)] = {}
+        for position, (key, digest, value) in enumerate(rows):
+            digests[(module, variable)][key] = (digest, position)
+        if kind == 'dict':
+            cache = {key: pickle.loads(value) for key, _, value in rows}
+        elif kind == 'list':
+            cache = [pickle.loads(value) for _, _, value in rows]
+        elif len(rows) > 0:
+            cache = pickle.loads(rows[0][2])
+        ui_print("done")
     except:
-        ui_print("["+module+"] error: couldnt read cached "+variable+" file.")       
+        ui_print("["+module+"] error: couldnt read cached "+variable+".")       
         cache = []
     return cache
 
-def save(cache,module,variable):
+def save(cache,module,variable,verbose=True):
+    # rewrites a whole variable: every entry is pickled and hashed to find the changed ones, so this is
+    # only meant for migrations and one-off writes. hot paths that touch a few entries must use update().
     from ui.ui_print import ui_print
     from ui.ui_print import ui_settings
-    from ui.ui_print import config_dir
     from base import pickle
-    from base import os
+    from base import hashlib
     try:
-        filename = config_dir + '/' + module + "_" + variable + '.pkl'
-        ui_print("["+module+"] writing cached "+variable+" file ...")    
-        with open(filename, 'wb') as f:
-            pickle.dump(cache, f)
-        ui_print("done")
+        db = connect()
+        kind, entries = keys(cache)
+        if verbose:
+            ui_print("["+module+"] writing cached "+variable+" ...")
+        with lock:
+            if not (module, variable) in digests:
+                digests[(module, variable)] = {key: (digest, position) for position, (key, digest) in enumerate(db.execute("SELECT key, digest FROM store WHERE module=? AND variable=? ORDER BY position", (module, variable)).fetchall())}
+            previous = digests[(module, variable)]
+            current = {}
+            upserts = []
+            moves = []
+            for position, (key, value) in enumerate(entries):
+                blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                digest = hashlib.blake2b(blob, digest_size=16).hexdigest()
+                current[key] = (digest, position)
+                if not key in previous or previous[key][0] != digest:
+                    imdb, tmdb, tvdb = ids(value)
+                    upserts += [(module, variable, key, position, digest, blob, imdb, tmdb, tvdb)]
+                elif previous[key][1] != position:
+                    moves += [(position, module, variable, key)]
+            removed = [(module, variable, key) for key in previous if not key in current]
+            db.execute("BEGIN")
+            try:
+                db.execute("INSERT INTO variables (module, variable, kind) VALUES (?,?,?) ON CONFLICT (module, variable) DO UPDATE SET kind=excluded.kind", (module, variable, kind))
+                db.executemany("INSERT INTO store (module, variable, key, position, digest, value, imdb, tmdb, tvdb) VALUES (?,?,?,?,?,?,?,?,?) ON CONFLICT (module, variable, key) DO UPDATE SET position=excluded.position, digest=excluded.digest, value=excluded.value, imdb=excluded.imdb, tmdb=excluded.tmdb, tvdb=excluded.tvdb", upserts)
+                db.executemany("UPDATE store SET position=? WHERE module=? AND variable=? AND key=?", moves)
+                db.executemany("DELETE FROM store WHERE module=? AND variable=? AND key=?", removed)
+                db.execute("COMMIT")
+            except:
+                db.execute("ROLLBACK")
+                raise
+            digests[(module, variable)] = current
+        if verbose:
+            ui_print("done (" + str(len(upserts)) + " changed, " + str(len(removed)) + " removed)")
+        return True
+    except:
+        ui_print("["+module+"] error: couldnt write cached "+variable+".") 
+        return False
+
+def update(changes,module,variable,removed=[],kind='dict'):
+    from ui.ui_print import ui_print
+    from base import pickle
+    from base import hashlib
+    # upsert and delete single entries of a stored dict (or keyed list), without touching the rest of it
+    try:
+        db = connect()
+        with lock:
+            known = digests.get((module, variable), None)
+            position = db.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM store WHERE module=? AND variable=?", (module, variable)).fetchone()[0]
+            upserts = []
+            for key, value in changes.items():
+                key = str(key)
+                blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                digest = hashlib.blake2b(blob, digest_size=16).hexdigest()
+                if known != None and key in known and known[key][0] == digest:
+                    continue
+                imdb, tmdb, tvdb = ids(value)
+                if known != None and key in known:
+                    upserts += [(module, variable, key, known[key][1], digest, blob, imdb, tmdb, tvdb)]
+                    known[key] = (digest, known[key][1])
+                else:
+                    upserts += [(module, variable, key, position, digest, blob, imdb, tmdb, tvdb)]
+                    if known != None:
+                        known[key] = (digest, position)
+                    position += 1
+            db.execute("BEGIN")
+            try:
+                db.execute("INSERT INTO variables (module, variable, kind) VALUES (?,?,?) ON CONFLICT (module, variable) DO UPDATE SET kind=excluded.kind", (module, variable, kind))
+                db.executemany("INSERT INTO store (module, variable, key, position, digest, value, imdb, tmdb, tvdb) VALUES (?,?,?,?,?,?,?,?,?) ON CONFLICT (module, variable, key) DO UPDATE SET digest=excluded.digest, value=excluded.value, imdb=excluded.imdb, tmdb=excluded.tmdb, tvdb=excluded.tvdb", upserts)
+                db.executemany("DELETE FROM store WHERE module=? AND variable=? AND key=?", [(module, variable, str(key)) for key in removed])
+                db.execute("COMMIT")
+            except:
+                db.execute("ROLLBACK")
+                raise
+            if known != None:
+                for key in removed:
+                    known.pop(str(key), None)
+        return True
+    except:
+        ui_print("["+module+"] error: couldnt update cached "+variable+".")
+        return False
+
+def find(module, variable, imdb=None, tmdb=None, tvdb=None):
+    from base import pickle
+    # look up stored entries by external id through the secondary indexes
+    clauses = []
+    values = [module, variable]
+    for column, id in [('imdb', imdb), ('tmdb', tmdb), ('tvdb', tvdb)]:
+        if id != None:
+            clauses += [column + "=?"]
+            values += [str(id)]
+    if len(clauses) == 0:
+        return []
+    try:
+        db = connect()
+        with lock:
+            rows = db.execute("SELECT value FROM store WHERE module=? AND variable=? AND (" + " OR ".join(clauses) + ") ORDER BY position", values).fetchall()
+        return [pickle.loads(row[0]) for row in rows]
     except:
-        ui_print("["+module+"] error: couldnt write cached "+variable+" file.") 
+        return []
@@ -57,13 +57,17 @@ def ignored():
             back = True
     options()
 
+class scrape_element(releases.release):
+    # stands in for a media item when scraping from the menu, so unlike a release it takes any attribute
+    pass
+
 def scrape():
     ui_cls('Options/Scraper/')
     print('Press Enter to return to the main menu.')
     print()
     print("Please choose a version to scrape for: ")
     print()
-    obj = releases.release('', '', '', [], 0, [])
+    obj = scrape_element('', '', '', [], 0, [])
     indices = []
     for index, version in enumerate(releases.sort.versions):
         print(str(index + 1) + ') ' + version[0] + (' (disabled)' if '\u0336' in version[0] else ''))
@@ -413,6 +417,218 @@ def unique(lst):
             unique_objects.append(obj)
     return unique_objects
 
+class scheduler:
+    """Queue of monitored media items, ordered by the time they are due to be checked again.
+
+    Items are due right away when they are first seen. After a check, an item is due again after the
+    watchlist loop interval, doubled for every failed attempt of the item in the ignore queue. Items
+    that aren't released yet are due at their release date, collected movies once a day. Webhooks and
+    newly watchlisted items wake the watchlist loop through the event.
+    """
+
+    library = []
+    queue = []
+    items = {}
+    due_at = {}
+    triggers = set()
+    event = threading.Event()
+    lock = threading.Lock()
+    counter = itertools.count()
+    locks = {}
+    executor = None
+    size = 0
+
+    def workers():
+        """Long-lived pool the media items are processed on, sized by the 'Parallel media items' setting."""
+        with scheduler.lock:
+            try:
+                size = max(1, int(float(ui_settings.item_workers)))
+            except:
+                size = 1
+            if scheduler.executor == None or scheduler.size != size:
+                if scheduler.executor != None:
+                    scheduler.executor.shutdown(wait=False)
+                scheduler.executor = concurrent.futures.ThreadPoolExecutor(max_workers=size, thread_name_prefix="media")
+                scheduler.size = size
+            return scheduler.executor
+
+    def item_lock(element):
+        # items of the same show share class state like media.pack_in_progress, so they never run at the same time
+        key = element.show_key() if element.type == "show" else None
+        if key == None:
+            key = scheduler.key(element)
+        with scheduler.lock:
+            if not key in scheduler.locks:
+                scheduler.locks[key] = threading.Lock()
+            return scheduler.locks[key]
+
+    def key(element):
+        return element.type + ":" + element.query()
+
+    def interval():
+        try:
+            return max(float(ui_settings.loop_interval_seconds), 5)
+        except:
+            return 30
+
+    def airtime(element):
+        # release time of a movie or episode, None if unknown
+        try:
+            airtime = datetime.datetime.strptime(element.originallyAvailableAt, "%Y-%m-%d")
+            if hasattr(element, "offset_airtime") and len(element.offset_airtime) > 0:
+                airtime += datetime.timedelta(hours=min(float(offset) for offset in element.offset_airtime))
+            return (airtime - datetime.datetime(1970, 1, 1)).total_seconds()
+        except:
+            return None
+
+    def next_due(element, now):
+        interval = scheduler.interval()
+        with content.classes.media.ignore_lock:
+            match = next((x for x in content.classes.media.ignore_queue if x == element), None)
+            count = getattr(match, "ignored_count", 0)
+        interval *= 2 ** min(int(count), 6)
+        due = now + interval
+        if element.type == "movie":
+            airtime = scheduler.airtime(element)
+            if airtime != None and airtime > due:
+                return min(airtime, now + 24 * 3600)
+            try:
+                if element.collected(scheduler.library):
+                    return max(due, now + 24 * 3600)
+            except:
+                None
+        elif element.type == "show":
+            # wake up when the next episode airs, if that is before the regular check
+            for season in getattr(element, "Seasons", []):
+                for episode in getattr(season, "Episodes", []):
+                    airtime = scheduler.airtime(episode)
+                    if airtime != None and now < airtime < due:
+                        due = max(airtime, now + 5)
+        return due
+
+    def push(element, due):
+        key = scheduler.key(element)
+        scheduler.items[key] = element
+        scheduler.due_at[key] = due
+        heapq.heappush(scheduler.queue, (due, next(scheduler.counter), key))
+
+    def sync(elements):
+        """Track the current watchlist items and return the ones that weren't known yet."""
+        with scheduler.lock:
+            added = []
+            keys = set()
+            for element in elements:
+                if not hasattr(element, "download"):
+                    continue
+                key = scheduler.key(element)
+                keys.add(key)
+                if not key in scheduler.items:
+                    added += [element]
+                    scheduler.push(element, 0)
+                else:
+                    scheduler.items[key] = element
+            for key in list(scheduler.items.keys()):
+                if not key in keys:
+                    del scheduler.items[key]
+                    del scheduler.due_at[key]
+            return added
+
+    def first():
+        # drops entries of removed items and entries that were replaced by a later push, returns the first valid one
+        while len(scheduler.queue) > 0:
+            due, _, key = scheduler.queue[0]
+            if key in scheduler.items and scheduler.due_at[key] == due:
+                return scheduler.queue[0]
+            heapq.heappop(scheduler.queue)
+        return None
+
+    def due(now=None):
+        """Remove and return the items that are due, in the order they became due."""
+        now = time.time() if now == None else now
+        with scheduler.lock:
+            elements = []
+            while scheduler.first() != None and scheduler.first()[0] <= now:
+                due, _, key = heapq.heappop(scheduler.queue)
+                elements += [scheduler.items[key]]
+                scheduler.due_at[key] = None
+            return elements
+
+    def pending(now=None):
+        now = time.time() if now == None else now
+        with scheduler.lock:
+            return scheduler.first() != None and scheduler.first()[0] <= now
+
+    def done(element, now=None):
+        now = time.time() if now == None else now
+        with scheduler.lock:
+            if scheduler.key(element) in scheduler.items:
+                scheduler.push(element, scheduler.next_due(element, now))
+
+    def trigger(source):
+        with scheduler.lock:
+            scheduler.triggers.add(source)
+        scheduler.event.set()
+
+    def triggered(source):
+        with scheduler.lock:
+            if source in scheduler.triggers:
+                scheduler.triggers.discard(source)
+                return True
+            return False
+
+    def wait(timeout):
+        scheduler.event.wait(timeout)
+        scheduler.event.clear()
+
+class webhook(http.server.BaseHTTPRequestHandler):
+    """Local listener for Plex and Overseerr webhooks, on the port of the 'Webhook port' setting.
+
+    Point Plex to http://<host>:<port>/plex and Overseerr to http://<host>:<port>/overseerr.
+    A new Plex library item refreshes the library, an Overseerr request refreshes the requests right away.
+    """
+
+    server = None
+
+    def start():
+        if webhook.server != None or str(ui_settings.webhook_port).strip() == "":
+            return
+        try:
+            webhook.server = http.server.ThreadingHTTPServer(("", int(ui_settings.webhook_port)), webhook)
+            Thread(target=webhook.server.serve_forever, daemon=True).start()
+            ui_print("listening for webhooks on port " + str(ui_settings.webhook_port))
+        except Exception as e:
+            webhook.server = None
+            ui_print("error: couldnt listen for webhooks on port " + str(ui_settings.webhook_port) + ": " + str(e))
+
+    def stop():
+        if webhook.server != None:
+            webhook.server.shutdown()
+            webhook.server.server_close()
+            webhook.server = None
+
+    def do_POST(self):
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0) or 0)).decode('utf-8', 'ignore')
+        except:
+            body = ""
+        source = self.path.strip("/").split("/")[0].split("?")[0].lower()
+        if source == "plex":
+            # plex sends multipart form data with a json payload, only new library items are of interest
+            if "library.new" in body:
+                scheduler.trigger("plex")
+        elif source == "overseerr":
+            scheduler.trigger("overseerr")
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        ui_print("[webhook] received " + source + " event", ui_settings.debug)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        return
+
 def threaded(stop):
     ui_cls()
     if service_mode == True:
@@ -421,7 +637,7 @@ def threaded(stop):
         print("Type 'exit' to return to the main menu.")
     timeout = 5
     regular_check = int(ui_settings.loop_interval_seconds)
-    timeout_counter = 0
+    last_check = time.time()
     library = content.classes.library()[0]()
     # get entire plex_watchlist
     plex_watchlist = content.services.plex.watchlist()
@@ -435,106 +651,91 @@ def threaded(stop):
         watchlists.data.sort(key=lambda s: s.watchlistedAt,reverse=True)
     except:
         ui_print("couldnt sort monitored media by newest, using default order.", ui_settings.debug)
-    if len(library) > 0:
-        ui_print('checking new content ...')
-        t0 = time.time()
-        for element in unique(watchlists):
-            if hasattr(element, 'download'):
-                element.download(library=library)
-                t1 = time.time()
-                #if more than 5 seconds have passed, check for newly watchlisted content
-                if t1-t0 >= 5:
-                    if plex_watchlist.update() or overseerr_requests.update() or trakt_watchlist.update():
-                        library = content.classes.library()[0]()
-                        if len(library) == 0:
-                            continue
-                        new_watchlists = plex_watchlist + trakt_watchlist + overseerr_requests
-                        try:
-                            new_watchlists.data.sort(key=lambda s: s.watchlistedAt,reverse=True)
-                        except:
-                            ui_print("couldnt sort monitored media by newest, using default order.", ui_settings.debug)
-                        new_watchlists = unique(new_watchlists)
-                        for element in new_watchlists[:]:
-                            if element in watchlists:
-                                new_watchlists.remove(element)
-                        ui_print('checking new content ...')
-                        for element in new_watchlists:
-                            if hasattr(element, 'download'):
-                                element.download(library=library)
-                        ui_print('done')
-                    t0 = time.time()
-        ui_print('done')
-    while not stop():
-        release_policy.run_upgrade_checks()
-        if plex_watchlist.update() or overseerr_requests.update() or trakt_watchlist.update():
+    webhook.start()
+
+    def update():
+        # poll the watchlists for new items, returns the new items
+        nonlocal library, watchlists
+        if plex_watchlist.update() or overseerr_requests.update() or trakt_watchlist.update():
             library = content.classes.library()[0]()
+            scheduler.library = library
             watchlists = plex_watchlist + trakt_watchlist + overseerr_requests
             try:
                 watchlists.data.sort(key=lambda s: s.watchlistedAt,reverse=True)
             except:
                 ui_print("couldnt sort monitored media by newest, using default order.", ui_settings.debug)
-            ui_print('checking new content ...')
-            for element in unique(watchlists):
-                if hasattr(element, 'download'):
-                    newly_added = True
-                    if element.type == "show":
-                        for season in element.Seasons:
-                            if season in content.classes.media.ignore_queue or not newly_added:
-                                newly_added = False
-                                break
-                            for episode in season.Episodes:
-                                if episode in content.classes.media.ignore_queue:
-                                    newly_added = False
-                                    break
-                    if newly_added:
-                        element.download(library=library)
-            ui_print('done')
-        elif timeout_counter >= regular_check:
-            # get entire plex_watchlist
-            plex_watchlist = content.services.plex.watchlist()
-            # get entire trakt_watchlist
-            trakt_watchlist = content.services.trakt.watchlist()
-            # get all overseerr request, match content to plex media type and add to monitored list
+            return scheduler.sync(unique(watchlists))
+        return []
+
+    def refresh():
+        # full refresh of the watchlists and the library, on its own timer so pending items never hold it back
+        nonlocal library, watchlists, plex_watchlist, trakt_watchlist, overseerr_requests, last_check
+        if time.time() - last_check < regular_check:
+            return False
+        # get entire plex_watchlist
+        plex_watchlist = content.services.plex.watchlist()
+        # get entire trakt_watchlist
+        trakt_watchlist = content.services.trakt.watchlist()
+        # get all overseerr request, match content to plex media type and add to monitored list
+        overseerr_requests = content.services.overseerr.requests()
+        # combine all content, sort by newest
+        watchlists = plex_watchlist + trakt_watchlist + overseerr_requests
+        try:
+            watchlists.data.sort(key=lambda s: s.watchlistedAt,reverse=True)
+        except:
+            ui_print("couldnt sort monitored media by newest, using default order.", ui_settings.debug)
+        library = content.classes.library()[0]()
+        scheduler.library = library
+        scheduler.sync(unique(watchlists))
+        last_check = time.time()
+        return True
+
+    def process(element, library):
+        with scheduler.item_lock(element):
+            element.download(library=library)
+        scheduler.done(element)
+
+    def download(elements):
+        # items run on the media worker pool, scrapers and debrid services keep their own shared concurrency caps.
+        # every item gets the library list of the time it was submitted: refreshes build a new list and never
+        # change the items of an earlier one, so the workers never see a library that is half updated.
+        executor = scheduler.workers()
+        pending = set(executor.submit(process, element, library) for element in elements)
+        while len(pending) > 0:
+            done, pending = concurrent.futures.wait(pending, timeout=5)
+            for future in done:
+                if future.exception() != None:
+                    ui_print("error: media item processing failed: " + str(future.exception()))
+            #every 5 seconds, check for newly watchlisted content
+            new_elements = update()
+            if (refresh() or len(new_elements) > 0) and len(library) > 0:
+                ui_print('checking new content ...')
+                pending |= set(executor.submit(process, element, library) for element in scheduler.due())
+
+    scheduler.library = library
+    scheduler.sync(unique(watchlists))
+    if len(library) > 0:
+        ui_print('checking new content ...')
+        download(scheduler.due())
+        ui_print('done')
+    while not stop():
+        release_policy.run_upgrade_checks()
+        if scheduler.triggered("overseerr"):
             overseerr_requests = content.services.overseerr.requests()
-            # combine all content, sort by newest
             watchlists = plex_watchlist + trakt_watchlist + overseerr_requests
-            try:
-                watchlists.data.sort(key=lambda s: s.watchlistedAt,reverse=True)
-            except:
-                ui_print("couldnt sort monitored media by newest, using default order.", ui_settings.debug)
+            scheduler.sync(unique(watchlists))
+        if scheduler.triggered("plex"):
             library = content.classes.library()[0]()
-            timeout_counter = 0
-            ui_print('checking new content ...')
-            t0 = time.time()
-            for element in unique(watchlists):
-                if hasattr(element, 'download'):
-                    element.download(library=library)
-                    t1 = time.time()
-                    #if more than 5 seconds have passed, check for newly watchlisted content
-                    if t1-t0 >= 5:
-                        if plex_watchlist.update() or overseerr_requests.update() or trakt_watchlist.update():
-                            library = content.classes.library()[0]()
-                            if len(library) == 0:
-                                continue
-                            new_watchlists = plex_watchlist + trakt_watchlist + overseerr_requests
-                            try:
-                                new_watchlists.data.sort(key=lambda s: s.watchlistedAt,reverse=True)
-                            except:
-                                ui_print("couldnt sort monitored media by newest, using default order.", ui_settings.debug)
-                            new_watchlists = unique(new_watchlists)
-                            for element in new_watchlists[:]:
-                                if element in watchlists:
-                                    new_watchlists.remove(element)
-                            ui_print('checking new content ...')
-                            for element in new_watchlists:
-                                if hasattr(element, 'download'):
-                                    element.download(library=library)
-                            ui_print('done')
-                        t0 = time.time()
-            ui_print('done')
-        else:
-            timeout_counter += timeout
-        time.sleep(timeout)
+            scheduler.library = library
+        update()
+        refresh()
+        if scheduler.pending():
+            if len(library) > 0:
+                ui_print('checking new content ...')
+                download(scheduler.due())
+                ui_print('done')
+        scheduler.wait(timeout)
+    webhook.stop()
 
 def download_script_run():
     if preflight():
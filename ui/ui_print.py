@@ -2,8 +2,6 @@ from base import *
 
 from ui import ui_settings
 
-sameline = False
-sameline_log = False
 config_dir = "."
 
 def ui_cls(path='',update=""):
@@ -34,58 +32,141 @@ def set_log_dir(config):
     global config_dir
     config_dir = config
 
+def stamp():
+    return datetime.datetime.now().strftime("%d/%m/%y %H:%M:%S")
+
+def render(state, time_, thread, string):
+    # a "..." line stays open until the same thread prints "done". If another thread prints in between,
+    # the open line is broken off and completed on its own row later, so parallel output never mixes.
+    out = ""
+    pending = state["pending"]
+    if state["owner"] != None and state["owner"] != thread:
+        out += "\n"
+        state["owner"] = None
+    if thread in pending:
+        text = pending.pop(thread)
+        tail = string if string.startswith('done') else 'done'
+        out += (tail if state["owner"] == thread else text + ' ' + tail) + "\n"
+        state["owner"] = None
+    if string.startswith('done'):
+        return out
+    line = '[' + time_ + '] ' + string
+    if string.endswith('...'):
+        pending[thread] = line
+        state["owner"] = thread
+        return out + line + ' '
+    return out + line + "\n"
+
+class console:
+    lock = threading.Lock()
+    state = {"owner": None, "pending": {}}
+
+    def write(time_, thread, string):
+        with console.lock:
+            print(render(console.state, time_, thread, string), end='')
+            sys.stdout.flush()
+
+class sink:
+    """Background writer for plex_debrid.log. Messages are queued by the callers and written in batches."""
+
+    queue = queue.Queue()
+    thread = None
+    lock = threading.Lock()
+    state = {"owner": None, "pending": {}}
+    file = None
+    path = None
+    started = 0
+    batch = 500
+    interval = 0.5
+    max_size = 10 * 1024 * 1024
+    max_age = 24 * 60 * 60
+    backups = 5
+
+    def put(time_, thread, string):
+        if sink.thread == None:
+            with sink.lock:
+                if sink.thread == None:
+                    sink.thread = Thread(target=sink.run, daemon=True, name="log")
+                    sink.thread.start()
+                    atexit.register(sink.flush)
+        sink.queue.put((time_, thread, string))
+
+    def run():
+        while True:
+            records = [sink.queue.get()]
+            try:
+                while len(records) < sink.batch:
+                    records.append(sink.queue.get(timeout=sink.interval))
+            except queue.Empty:
+                pass
+            sink.write(records)
+            for _ in records:
+                sink.queue.task_done()
+
+    def write(records):
+        path = config_dir + '/plex_debrid.log'
+        try:
+            text = "".join(render(sink.state, *record) for record in records)
+            sink.handle(path)
+            sink.file.write(text)
+            sink.file.flush()
+        except:
+            sink.close()
+            console.write(stamp(), None, 'logging error: couldnt write into log file at: ' + path)
+
+    def handle(path):
+        if sink.file != None and sink.path != path:
+            sink.close()
+        if sink.file != None and (sink.file.tell() >= sink.max_size or time.time() - sink.started >= sink.max_age):
+            sink.close()
+            sink.rotate(path)
+        if sink.file == None:
+            sink.file = open(path, 'a')
+            sink.path = path
+            sink.started = sink.birth(path)
+
+    def birth(path):
+        # when the log file was started, taken from the files so that a restart doesnt reset its age: its creation
+        # time where the os keeps one, otherwise the time the previous log was rotated away, or its last change
+        stat = os.stat(path)
+        if hasattr(stat, 'st_birthtime'):
+            return stat.st_birthtime
+        if os.name == 'nt':
+            return stat.st_ctime
+        if os.path.exists(path + '.1'):
+            return os.stat(path + '.1').st_mtime
+        return stat.st_mtime
+
+    def close():
+        if sink.file != None:
+            try:
+                sink.file.close()
+            except:
+                pass
+        sink.file = None
+
+    def rotate(path):
+        # plex_debrid.log -> plex_debrid.log.1 -> ... -> plex_debrid.log.<backups>
+        for i in range(sink.backups - 1, 0, -1):
+            if os.path.exists(path + '.' + str(i)):
+                os.replace(path + '.' + str(i), path + '.' + str(i + 1))
+        if os.path.exists(path):
+            os.replace(path, path + '.1')
+
+    def flush():
+        # used at exit and by callers that need the log on disk right now
+        if sink.thread != None:
+            sink.queue.join()
+
 def ui_print(string: str, debug="true"):
-    global sameline
-    global sameline_log
     try:
+        time_ = stamp()
+        thread = threading.get_ident()
         #log
         if ui_settings.log == "true":
-            try:
-                with open(config_dir + '/plex_debrid.log', 'a') as f:
-                    if string == 'done' and sameline_log:
-                        f.write('done' + '\n')
-                        sameline_log = False
-                    elif sameline_log and string.startswith('done'):
-                        f.write(string + '\n')
-                        sameline_log = False
-                    elif sameline_log and string.endswith('...'):
-                        f.write('done' + '\n')
-                        f.write('[' + str(datetime.datetime.now().strftime("%d/%m/%y %H:%M:%S")) + '] ' + string  + ' ')
-                        sameline_log = True
-                    elif string.endswith('...'):
-                        f.write('[' + str(datetime.datetime.now().strftime("%d/%m/%y %H:%M:%S")) + '] ' + string + ' ')
-                        sameline_log = True
-                    elif not string.startswith('done') and sameline_log:
-                        f.write('done' + '\n')
-                        f.write('[' + str(datetime.datetime.now().strftime("%d/%m/%y %H:%M:%S")) + '] ' + string + '\n')
-                        sameline_log = False
-                    elif not string.startswith('done'):
-                        f.write('[' + str(datetime.datetime.now().strftime("%d/%m/%y %H:%M:%S")) + '] ' + string + '\n')
-                        sameline_log = False
-            except:
-                print('[' + str(datetime.datetime.now().strftime("%d/%m/%y %H:%M:%S")) + '] logging error: couldnt write into log file at: ' + config_dir + '/plex_debrid.log')
+            sink.put(time_, thread, string)
         #ui
         if debug == "true":
-            if string == 'done' and sameline:
-                print('done')
-                sameline = False
-            elif sameline and string.startswith('done'):
-                print(string)
-                sameline = False
-            elif sameline and string.endswith('...'):
-                print('done')
-                print('[' + str(datetime.datetime.now().strftime("%d/%m/%y %H:%M:%S")) + '] ' + string, end=' ')
-                sameline = True
-            elif string.endswith('...'):
-                print('[' + str(datetime.datetime.now().strftime("%d/%m/%y %H:%M:%S")) + '] ' + string, end=' ')
-                sameline = True
-            elif not string.startswith('done') and sameline:
-                print('done')
-                print('[' + str(datetime.datetime.now().strftime("%d/%m/%y %H:%M:%S")) + '] ' + string)
-                sameline = False
-            elif not string.startswith('done'):
-                print('[' + str(datetime.datetime.now().strftime("%d/%m/%y %H:%M:%S")) + '] ' + string)
-                sameline = False
-            sys.stdout.flush()
+            console.write(time_, thread, string)
     except:
         sys.stdout.flush()
@@ -3,3 +3,5 @@ run_directly = "true"
 debug = "true"
 log = "false"
 loop_interval_seconds = 30
+webhook_port = ""
+item_workers = "4"